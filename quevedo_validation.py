@@ -8,54 +8,41 @@ This script validates three key claims from Quevedo's paper:
 3. Line-end words show "filler" patterns (aesthetic constraint)
 """
 
+import argparse
 import json
-import re
 from collections import Counter, defaultdict
 from pathlib import Path
 import statistics
 
-def parse_ivtff_advanced(filepath):
-    """Enhanced parser with line metadata"""
+from voynich_corpus import load_corpus
+from voynich_gallows import gallow_contingency
+from voynich_index import select
+from voynich_metrics import StageMetrics, format_metrics
+from voynich_significance import jaccard_significance
+
+def parse_ivtff_advanced(filepath, subset=None):
+    """Enhanced parser with line metadata
+    
+    subset restricts the result to pages matching a header-variable query
+    such as '$L=B,$I=B' (see voynich_index.select).
+    """
+    return lines_from_records(select(load_corpus(filepath), subset).iter_lines())
+
+def lines_from_records(records):
+    """Line dicts for every IvtffLine record that has words"""
     lines = []
-    current_page = None
     
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            
-            if not line or line.startswith('#'):
-                continue
-            
-            # Page markers
-            page_match = re.match(r'<(f\d+[rv]\d?)>', line)
-            if page_match:
-                current_page = page_match.group(1)
-                continue
-            
-            # Extract text with locus info
-            locus_match = re.match(r'<([^>]+)>\s*(.+)', line)
-            if locus_match:
-                locus = locus_match.group(1)
-                text = locus_match.group(2)
-                
-                # Clean markup
-                text = re.sub(r'<[^>]*>', '', text)
-                text = re.sub(r'\[[^\]]*\]', '', text)
-                text = re.sub(r'\{[^}]*\}', '', text)
-                text = re.sub(r'@\d+;?', '', text)
-                
-                # Split into words
-                words = [w.strip() for w in re.split(r'[.,]', text) if w.strip()]
-                
-                if words:
-                    lines.append({
-                        'page': current_page,
-                        'locus': locus,
-                        'words': words,
-                        'first_word': words[0],
-                        'last_word': words[-1],
-                        'has_gallow': any(w[0] in 'pftk' for w in words if w)
-                    })
+    for record in records:
+        words = record.words
+        if words:
+            lines.append({
+                'page': record.page,
+                'locus': record.locus,
+                'words': words,
+                'first_word': words[0],
+                'last_word': words[-1],
+                'has_gallow': any(w[0] in 'pftk' for w in words)
+            })
     
     return lines
 
@@ -117,6 +104,10 @@ def line_position_entropy(lines):
             first_words[line['first_word']] += 1
             last_words[line['last_word']] += 1
     
+    return position_entropy_summary(first_words, last_words)
+
+def position_entropy_summary(first_words, last_words):
+    """Entropy and top words of line-initial / line-final word counts"""
     # Calculate Shannon entropy
     def shannon_entropy(counter):
         import math
@@ -135,20 +126,59 @@ def line_position_entropy(lines):
         'last_words_top10': last_words.most_common(10)
     }
 
-def main():
-    filepath = Path(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos\voynich_ZL3b.txt")
+def compile_results(jaccard_scores, gallow_vocab, entropy_data, significance=None,
+                    contingency=None):
+    """Assemble the validation results dict"""
+    avg_jaccard = statistics.mean(jaccard_scores)
+    jaccard_analysis = {
+        'average': avg_jaccard,
+        'median': statistics.median(jaccard_scores),
+        'quevedo_claim': 0.08,
+        'natural_language_range': [0.25, 0.35],
+        'validation': 'CONFIRMED' if avg_jaccard < 0.15 else 'PARTIAL'
+    }
+    if significance is not None:
+        jaccard_analysis['significance'] = significance
+    results = {
+        'jaccard_analysis': jaccard_analysis,
+        'gallow_correlation': {
+            mode: dict(vocab.most_common(10)) 
+            for mode, vocab in gallow_vocab.items()
+        },
+        'line_position': entropy_data
+    }
+    if contingency is not None:
+        results['gallow_contingency'] = contingency
+    return results
+
+def main(filepath=None, output_path=None, capture=None, permutations=0, workers=None):
+    """
+    Quevedo validation.
+
+    permutations > 0 adds the Jaccard null models (on `workers` processes)
+    and permutation p-values for the gallow contingency tables.
+    """
+    if filepath is None:
+        filepath = Path(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos\voynich_ZL3b.txt")
+    if output_path is None:
+        output_path = Path(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos\quevedo_validation.json")
+    filepath = Path(filepath)
     
     print("=" * 70)
     print("QUEVEDO WHEEL VALIDATION SUITE")
     print("Testing the Hardware Hypothesis")
     print("=" * 70)
+    metrics = StageMetrics(capture)
     
     # Parse data
+    metrics.step('parse')
     print("\n[1] Parsing manuscript with enhanced metadata...")
-    lines = parse_ivtff_advanced(filepath)
+    corpus = load_corpus(filepath)
+    lines = lines_from_records(corpus.iter_lines())
     print(f"    Parsed {len(lines)} text lines")
     
     # TEST 1: Jaccard Index
+    metrics.step('jaccard')
     print("\n[2] JACCARD INDEX ANALYSIS (Quevedo's Central Claim)")
     print("    Expected (Natural Language): J ≈ 0.25-0.35")
     print("    Expected (Quevedo/Hardware): J ≈ 0.08")
@@ -169,7 +199,19 @@ def main():
     else:
         print(f"    ❌ CONTRADICTS QUEVEDO: Score suggests natural language flow")
     
+    metrics.step('jaccard_significance')
+    significance = None
+    if permutations:
+        print(f"\n    NULL MODELS ({permutations:,} permutations each):")
+        significance = jaccard_significance(corpus, permutations, workers=workers)
+        low, high = significance['observed_ci95']
+        print(f"    Observed 95% CI: {low:.4f} - {high:.4f}")
+        for model, null in significance['null_models'].items():
+            print(f"    {model:<13} null {null['mean']:.4f} (95% {null['ci95'][0]:.4f}-{null['ci95'][1]:.4f})"
+                  f"  p_lower={null['p_lower']:.4f}  p_upper={null['p_upper']:.4f}")
+    
     # TEST 2: Gallow Correlation
+    metrics.step('gallow_correlation')
     print("\n[3] GALLOW CHARACTER ANALYSIS (Mode Selector Hypothesis)")
     gallow_vocab, non_gallow_vocab = analyze_gallow_correlation(lines)
     
@@ -191,7 +233,25 @@ def main():
         else:
             print(f"    ⚠️  HIGH OVERLAP: May contradict strict cartridge theory")
     
+    metrics.step('gallow_contingency')
+    if permutations:
+        print(f"\n    Contingency tables ({permutations:,} label shuffles each):")
+    else:
+        print("\n    Contingency tables (asymptotic chi2 p-values):")
+    contingency = gallow_contingency(corpus, permutations)
+    for position, tables in contingency.items():
+        for target, table in tables.items():
+            if table.get('p_chi2') is not None:
+                p_value = f"p_perm={table['p_chi2']:.4f}"
+            elif table.get('p_asymptotic') is not None:
+                p_value = f"p={table['p_asymptotic']:.3g}"
+            else:
+                continue
+            print(f"    {position:<12} x {target:<9} chi2={table['chi2']:.1f} (dof {table['dof']})"
+                  f"  MI={table['mutual_information']:.3f} bits  {p_value}")
+    
     # TEST 3: Line-End Entropy
+    metrics.step('line_position')
     print("\n[4] LINE POSITION ENTROPY (Filler Word Hypothesis)")
     entropy_data = line_position_entropy(lines)
     
@@ -208,29 +268,31 @@ def main():
         print(f"    ⚠️  INCONCLUSIVE: Last words show similar/higher variation")
     
     # Save results
-    results = {
-        'jaccard_analysis': {
-            'average': avg_jaccard,
-            'median': median_jaccard,
-            'quevedo_claim': 0.08,
-            'natural_language_range': [0.25, 0.35],
-            'validation': 'CONFIRMED' if avg_jaccard < 0.15 else 'PARTIAL'
-        },
-        'gallow_correlation': {
-            mode: dict(vocab.most_common(10)) 
-            for mode, vocab in gallow_vocab.items()
-        },
-        'line_position': entropy_data
-    }
+    metrics.step('compile_results')
+    results = compile_results(jaccard_scores, gallow_vocab, entropy_data, significance,
+                              contingency)
+    results['metrics'] = metrics.finish()
     
-    output_path = Path(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos\quevedo_validation.json")
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     
     print(f"\n[✓] Results saved to: {output_path}")
+    
+    print("\n    Stage costs:")
+    for line in format_metrics(results['metrics']):
+        print(line)
     print("\n" + "=" * 70)
     print("VALIDATION COMPLETE")
     print("=" * 70)
+    
+    return results
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Quevedo wheel validation suite")
+    parser.add_argument('filepath', nargs='?')
+    parser.add_argument('output_path', nargs='?')
+    parser.add_argument('--permutations', type=int, default=0,
+                        help="Jaccard null-model and gallow label permutations, e.g. 1000 (0 = skip)")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    main(args.filepath, args.output_path, permutations=args.permutations, workers=args.workers)
@@ -0,0 +1,164 @@
+"""
+Voynich Affix Rule Engine
+Many prefix/suffix rules matched against every word type in one pass
+
+Rule sets live in a JSON file (affix_rules.json by default), one list of
+rules per set name:
+
+    {"name": "ch_prefix", "prefix": "ch", "not_prefix": ["cho"]}
+    {"name": "ey_suffix", "suffix": "ey", "not_suffix": ["eey"]}
+    {"name": "qo_dy", "prefix": "qo", "suffix": "dy", "min_stem": 1}
+
+A rule needs a prefix, a suffix or both; not_prefix / not_suffix list
+exclusions and min_stem is the number of glyphs that must remain between
+the affixes. Unnamed rules are called 'qo-', '-dy' or 'qo-dy'.
+
+All prefixes and exclusion prefixes of a set go into one trie, all
+suffixes into a trie over reversed words. Affixes are anchored, so a
+plain trie walk plays the part of the Aho-Corasick automaton: matching a
+word reads at most its own length in each trie, whatever the number of
+rules.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from voynich_corpus import load_corpus
+
+DEFAULT_RULES_PATH = Path(__file__).with_name('affix_rules.json')
+
+
+def load_rules(path=None):
+    """Rule sets from a JSON file: {set name: [rule, ...]}"""
+    with open(path or DEFAULT_RULES_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _insert(root, affix, entry):
+    """Add entry to the terminal list of affix in a (children, terminals) trie"""
+    node = root
+    for ch in affix:
+        node = node[0].setdefault(ch, ({}, []))
+    node[1].append(entry)
+
+
+def _walk(root, key):
+    """Yield the terminal entries of every trie node on the path spelled by key"""
+    node = root
+    for ch in key:
+        node = node[0].get(ch)
+        if node is None:
+            return
+        yield from node[1]
+
+
+class AffixMatcher:
+    """
+    Compiled rule set.
+
+    match(word)        names of the rules a word satisfies, in rule order
+    scan(word_freq)    token count, type count and examples per rule
+    """
+
+    def __init__(self, rules):
+        self.names = []
+        self.required = []
+        self.affix_len = []
+        self.min_stem = []
+        self.prefixes = ({}, [])
+        self.suffixes = ({}, [])
+
+        for i, rule in enumerate(rules):
+            prefix = rule.get('prefix', '')
+            suffix = rule.get('suffix', '')
+            if not prefix and not suffix:
+                raise ValueError(f"Affix rule {rule!r} needs a prefix or a suffix")
+            name = rule.get('name') or f"{prefix}-{suffix}"
+            if name in self.names:
+                raise ValueError(f"Duplicate affix rule name {name!r}")
+            self.names.append(name)
+            self.required.append(bool(prefix) + bool(suffix))
+            self.affix_len.append(len(prefix) + len(suffix))
+            self.min_stem.append(rule.get('min_stem', 0))
+            if prefix:
+                _insert(self.prefixes, prefix, (i, True))
+            if suffix:
+                _insert(self.suffixes, suffix[::-1], (i, True))
+            for excluded in rule.get('not_prefix', []):
+                _insert(self.prefixes, excluded, (i, False))
+            for excluded in rule.get('not_suffix', []):
+                _insert(self.suffixes, excluded[::-1], (i, False))
+
+    def match_ids(self, word):
+        """Indices of the rules a word satisfies, ascending"""
+        hits = {}
+        excluded = set()
+        for walk in (_walk(self.prefixes, word), _walk(self.suffixes, reversed(word))):
+            for i, positive in walk:
+                if positive:
+                    hits[i] = hits.get(i, 0) + 1
+                else:
+                    excluded.add(i)
+        n = len(word)
+        return sorted(i for i, parts in hits.items()
+                      if parts == self.required[i] and i not in excluded
+                      and n - self.affix_len[i] >= self.min_stem[i])
+
+    def match(self, word):
+        """Names of the rules a word satisfies, in rule order"""
+        return [self.names[i] for i in self.match_ids(word)]
+
+    def scan(self, word_freq, examples=10):
+        """
+        Match every word type once.
+
+        Returns {rule name: {'count', 'types', 'examples'}} in rule order,
+        with count summed over word frequencies and the first `examples`
+        matching words in word_freq order.
+        """
+        results = [{'count': 0, 'types': 0, 'examples': []} for _ in self.names]
+        for word, freq in word_freq.items():
+            for i in self.match_ids(word):
+                entry = results[i]
+                entry['count'] += freq
+                entry['types'] += 1
+                if len(entry['examples']) < examples:
+                    entry['examples'].append(word)
+        return dict(zip(self.names, results))
+
+
+def compile_rules(rule_sets):
+    """{set name: AffixMatcher} for every rule set"""
+    return {name: AffixMatcher(rules) for name, rules in rule_sets.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match affix rule sets against every word type")
+    parser.add_argument('rules', nargs='?', default=str(DEFAULT_RULES_PATH))
+    parser.add_argument('--file', default=str(Path(__file__).with_name('voynich_ZL3b.txt')))
+    parser.add_argument('--examples', type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH AFFIX RULES")
+    print("=" * 60)
+
+    word_freq = load_corpus(args.file).type_counts()
+    rule_sets = load_rules(args.rules)
+    print(f"\n    {len(word_freq):,} word types, "
+          f"{sum(len(r) for r in rule_sets.values())} rules in {len(rule_sets)} sets")
+
+    results = {}
+    for name, matcher in compile_rules(rule_sets).items():
+        results[name] = matcher.scan(word_freq, args.examples)
+        print(f"\n[{name}]")
+        for rule, data in sorted(results[name].items(), key=lambda x: -x[1]['count']):
+            print(f"    {rule:<16} {data['count']:>7,} tokens  {data['types']:>6,} types  "
+                  f"{data['examples']}")
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
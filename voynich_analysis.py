@@ -3,64 +3,47 @@ Voynich Manuscript Statistical Analysis
 AIDols Finale Challenge - Track A: Statistical Cryptanalysis
 """
 
-import re
 from collections import Counter
 from pathlib import Path
+import argparse
 import json
 import math
 
-def parse_ivtff(filepath):
-    """Parse IVTFF format transcription file"""
+from voynich_corpus import load_corpus
+from voynich_index import select
+from voynich_ngrams import count_ngrams, ngram_counts
+from voynich_entropy import entropy_profile, summarize_profile
+from voynich_zipf import law_fits
+from voynich_metrics import StageMetrics, format_metrics
+
+# Sliding-window entropy profile reported in the results (in words)
+PROFILE_WINDOW = 1000
+PROFILE_STRIDE = 500
+
+def parse_ivtff(filepath, subset=None):
+    """Parse IVTFF format transcription file
+    
+    subset restricts the result to pages matching a header-variable query
+    such as '$L=B,$I=B' (see voynich_index.select).
+    """
     words = []
     lines_data = []
-    current_page = None
-    
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            
-            # Skip comments and empty lines
-            if not line or line.startswith('#'):
-                continue
-            
-            # Extract page markers
-            page_match = re.match(r'<(f\d+[rv]\d?)>', line)
-            if page_match:
-                current_page = page_match.group(1)
-                continue
-            
-            # Extract text content (between locus marker and end)
-            # Format: <f1r.1,@P0>       text.here.with.words
-            locus_match = re.match(r'<([^>]+)>\s*(.+)', line)
-            if locus_match:
-                locus = locus_match.group(1)
-                text = locus_match.group(2)
-                
-                # Remove markup tags like <%>, <$>, <->, <! ... >
-                text = re.sub(r'<[^>]*>', '', text)
-                # Remove uncertain markers [x:y]
-                text = re.sub(r'\[[^\]]*\]', '', text)
-                # Remove curly brace annotations {xxx}
-                text = re.sub(r'\{[^}]*\}', '', text)
-                # Remove @ references
-                text = re.sub(r'@\d+;?', '', text)
-                
-                # Split by word separators (. and ,)
-                line_words = re.split(r'[.,]', text)
-                line_words = [w.strip() for w in line_words if w.strip()]
-                
-                words.extend(line_words)
-                lines_data.append({
-                    'page': current_page,
-                    'locus': locus,
-                    'words': line_words,
-                    'raw': text
-                })
+    
+    for record in select(load_corpus(filepath), subset).iter_lines():
+        words.extend(record.words)
+        lines_data.append({
+            'page': record.page,
+            'locus': record.locus,
+            'words': record.words,
+            'raw': record.raw
+        })
     
     return words, lines_data
 
-def letter_frequency(words):
-    """Calculate letter frequency"""
+def letter_frequency(words, scheme=None):
+    """Calculate letter frequency (glyph frequency under a voynich_glyphs scheme)"""
+    if scheme is not None:
+        return count_ngrams(*scheme.encode_words(words), 1)[1]
     all_letters = ''.join(words)
     return Counter(all_letters)
 
@@ -77,15 +60,11 @@ def calculate_entropy(freq_dict, total):
             entropy -= p * math.log2(p)
     return entropy
 
-def ngram_analysis(words, n=2):
-    """Calculate n-gram frequency"""
-    all_text = '.'.join(words)  # Keep word boundaries
-    ngrams = []
-    for i in range(len(all_text) - n + 1):
-        ngram = all_text[i:i+n]
-        if '.' not in ngram:  # Skip word boundaries
-            ngrams.append(ngram)
-    return Counter(ngrams)
+def ngram_analysis(words, n=2, scheme=None):
+    """Calculate n-gram frequency (windows crossing word boundaries are skipped)"""
+    if scheme is not None:
+        return count_ngrams(*scheme.encode_words(words), n, min_n=n)[n]
+    return ngram_counts(words, n, min_n=n)[n]
 
 def word_length_distribution(words):
     """Analyze word length distribution"""
@@ -107,22 +86,75 @@ def zipf_analysis(word_freq):
         })
     return results
 
-def main():
-    filepath = Path(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos\voynich_ZL3b.txt")
-    output_dir = Path(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos")
+def compile_results(filepath, total_words, letter_freq, word_freq, bigrams, trigrams,
+                    word_lengths, profile, fits=None):
+    """Assemble the Track A results dict from the computed counters"""
+    total_letters = sum(letter_freq.values())
+    letter_entropy = calculate_entropy(letter_freq, total_letters)
+    word_entropy = calculate_entropy(word_freq, total_words)
+    avg_len = total_letters / total_words
+    zipf = zipf_analysis(word_freq)
+    
+    return {
+        'metadata': {
+            'source': str(filepath),
+            'analysis_type': 'Statistical Cryptanalysis',
+            'track': 'A'
+        },
+        'summary': {
+            'total_words': total_words,
+            'unique_words': len(word_freq),
+            'total_letters': total_letters,
+            'unique_letters': len(letter_freq),
+            'average_word_length': round(avg_len, 2),
+            'letter_entropy': round(letter_entropy, 3),
+            'word_entropy': round(word_entropy, 3)
+        },
+        'letter_frequency': dict(letter_freq.most_common(30)),
+        'word_frequency': dict(word_freq.most_common(50)),
+        'bigrams': dict(bigrams.most_common(30)),
+        'trigrams': dict(trigrams.most_common(30)),
+        'word_length_distribution': dict(sorted(word_lengths.items())),
+        'zipf_analysis': zipf[:20],
+        'zipf_fit': fits,
+        'entropy_profile': {
+            'window': PROFILE_WINDOW,
+            'stride': PROFILE_STRIDE,
+            'summary': summarize_profile(profile),
+            'windows': [
+                {'start': int(start), 'page': page,
+                 'letter_entropy': round(float(le), 3), 'word_entropy': round(float(we), 3),
+                 'h2': round(float(c2), 3), 'h3': round(float(c3), 3)}
+                for start, page, le, we, c2, c3 in zip(
+                    profile['start'], profile['page'], profile['letter_entropy'],
+                    profile['word_entropy'], profile['h2'], profile['h3'])
+            ]
+        }
+    }
+
+def main(filepath=None, output_file=None, capture=None, bootstrap=0):
+    """Track A report; bootstrap > 0 adds Zipf CIs from that many resamples"""
+    if filepath is None:
+        filepath = Path(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos\voynich_ZL3b.txt")
+    if output_file is None:
+        output_file = Path(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos") / "voynich_statistics.json"
+    filepath = Path(filepath)
     
     print("=" * 60)
     print("VOYNICH MANUSCRIPT STATISTICAL ANALYSIS")
     print("AIDols Finale - Track A: Statistical Cryptanalysis")
     print("=" * 60)
+    metrics = StageMetrics(capture)
     
     # Parse transcription
+    metrics.step('parse')
     print("\n[1] Parsing IVTFF transcription...")
     words, lines_data = parse_ivtff(filepath)
     print(f"    Total words extracted: {len(words):,}")
     print(f"    Total lines parsed: {len(lines_data):,}")
     
     # Letter frequency analysis
+    metrics.step('letter_frequency')
     print("\n[2] Letter frequency analysis...")
     letter_freq = letter_frequency(words)
     total_letters = sum(letter_freq.values())
@@ -131,6 +163,7 @@ def main():
     print(f"    Top 10 letters: {letter_freq.most_common(10)}")
     
     # Word frequency analysis
+    metrics.step('word_frequency')
     print("\n[3] Word frequency analysis...")
     word_freq = word_frequency(words)
     print(f"    Unique words: {len(word_freq):,}")
@@ -140,6 +173,7 @@ def main():
         print(f"        '{word}': {count} ({pct:.2f}%)")
     
     # Entropy calculation
+    metrics.step('entropy')
     print("\n[4] Entropy analysis...")
     letter_entropy = calculate_entropy(letter_freq, total_letters)
     word_entropy = calculate_entropy(word_freq, len(words))
@@ -147,16 +181,20 @@ def main():
     print(f"    Word entropy: {word_entropy:.3f} bits")
     print(f"    (English: ~4.5 bits/letter, Latin: ~4.0 bits/letter)")
     
-    # N-gram analysis
+    # N-gram analysis: bigrams and trigrams come from one counting pass,
+    # so both are timed under the 'ngrams' step
+    metrics.step('ngrams')
     print("\n[5] Bigram analysis...")
-    bigrams = ngram_analysis(words, 2)
+    ngrams = ngram_counts(words, 3, min_n=2)
+    bigrams = ngrams[2]
     print(f"    Top 10 bigrams: {bigrams.most_common(10)}")
     
     print("\n[6] Trigram analysis...")
-    trigrams = ngram_analysis(words, 3)
+    trigrams = ngrams[3]
     print(f"    Top 10 trigrams: {trigrams.most_common(10)}")
     
     # Word length distribution
+    metrics.step('word_lengths')
     print("\n[7] Word length distribution...")
     word_lengths = word_length_distribution(words)
     print(f"    Distribution: {dict(sorted(word_lengths.items()))}")
@@ -164,42 +202,46 @@ def main():
     print(f"    Average word length: {avg_len:.2f} characters")
     
     # Zipf's law analysis
+    metrics.step('zipf')
     print("\n[8] Zipf's law compliance...")
     zipf = zipf_analysis(word_freq)
     print(f"    Rank 1: '{word_freq.most_common(1)[0][0]}' = {zipf[0]['frequency']}")
     print(f"    Rank 2 ratio: {zipf[1]['ratio']:.2f} (ideal: 1.0)")
     print(f"    Rank 10 ratio: {zipf[9]['ratio']:.2f} (ideal: 1.0)")
     
+    # Maximum-likelihood law fits over the full spectrum
+    corpus = load_corpus(filepath)
+    fits = law_fits(corpus, bootstrap)
+    ci = f" (95% CI {fits['zipf']['s_ci95']})" if 's_ci95' in fits['zipf'] else ""
+    print(f"    Zipf MLE s = {fits['zipf']['s']:.4f}{ci}")
+    print(f"    Zipf-Mandelbrot s = {fits['zipf_mandelbrot']['s']:.4f}, "
+          f"b = {fits['zipf_mandelbrot']['b']:.4f}")
+    print(f"    Heaps beta = {fits['heaps']['beta']:.4f} (K = {fits['heaps']['K']:.3f})")
+    
+    # Entropy along the text
+    metrics.step('entropy_profile')
+    print("\n[9] Sliding-window entropy profile...")
+    profile = entropy_profile(corpus, PROFILE_WINDOW, PROFILE_STRIDE)
+    profile_summary = summarize_profile(profile)
+    print(f"    Windows: {len(profile['start'])} ({PROFILE_WINDOW} words, stride {PROFILE_STRIDE})")
+    for key, stats in profile_summary.items():
+        print(f"    {key}: {stats['min']:.3f} - {stats['max']:.3f} (mean {stats['mean']:.3f})")
+    
     # Compile results
-    results = {
-        'metadata': {
-            'source': str(filepath),
-            'analysis_type': 'Statistical Cryptanalysis',
-            'track': 'A'
-        },
-        'summary': {
-            'total_words': len(words),
-            'unique_words': len(word_freq),
-            'total_letters': total_letters,
-            'unique_letters': len(letter_freq),
-            'average_word_length': round(avg_len, 2),
-            'letter_entropy': round(letter_entropy, 3),
-            'word_entropy': round(word_entropy, 3)
-        },
-        'letter_frequency': dict(letter_freq.most_common(30)),
-        'word_frequency': dict(word_freq.most_common(50)),
-        'bigrams': dict(bigrams.most_common(30)),
-        'trigrams': dict(trigrams.most_common(30)),
-        'word_length_distribution': dict(sorted(word_lengths.items())),
-        'zipf_analysis': zipf[:20]
-    }
+    metrics.step('compile_results')
+    results = compile_results(filepath, len(words), letter_freq, word_freq,
+                              bigrams, trigrams, word_lengths, profile, fits)
+    results['metrics'] = metrics.finish()
     
     # Save results
-    output_file = output_dir / "voynich_statistics.json"
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     print(f"\n[✓] Results saved to: {output_file}")
     
+    print("\n    Stage costs:")
+    for line in format_metrics(results['metrics']):
+        print(line)
+    
     print("\n" + "=" * 60)
     print("ANALYSIS COMPLETE")
     print("=" * 60)
@@ -207,4 +249,10 @@ def main():
     return results
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Track A statistical analysis")
+    parser.add_argument('filepath', nargs='?')
+    parser.add_argument('output_file', nargs='?')
+    parser.add_argument('--bootstrap', type=int, default=0,
+                        help="Zipf bootstrap resamples for confidence intervals (0 = none)")
+    args = parser.parse_args()
+    main(args.filepath, args.output_file, bootstrap=args.bootstrap)
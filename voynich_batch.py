@@ -0,0 +1,241 @@
+"""
+Voynich Multi-Transliteration Batch Runner
+Track A / Track B / Quevedo pipelines over many IVTFF files in parallel
+
+Takes a directory or glob of IVTFF files, runs the selected analyses on a
+process pool (one task per file), writes each script's JSON per input and a
+merged comparison table (JSON + CSV) across all inputs. Text files that do
+not start like IVTFF are skipped, and same-named files from different
+directories get the directory name in their output file names.
+
+    python voynich_batch.py variants/ --analyses statistics,quevedo --workers 8
+"""
+
+import argparse
+import contextlib
+import csv
+import glob
+import io
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import quevedo_validation
+import voynich_analysis
+import voynich_linguistics
+from voynich_tokenizer import page_header_match
+
+ANALYSES = ('statistics', 'linguistics', 'quevedo')
+
+# Columns of the merged comparison table: (column, analysis, path into its JSON)
+COMPARISON_COLUMNS = [
+    ('total_words', 'statistics', ('summary', 'total_words')),
+    ('unique_words', 'statistics', ('summary', 'unique_words')),
+    ('total_letters', 'statistics', ('summary', 'total_letters')),
+    ('unique_letters', 'statistics', ('summary', 'unique_letters')),
+    ('average_word_length', 'statistics', ('summary', 'average_word_length')),
+    ('letter_entropy', 'statistics', ('summary', 'letter_entropy')),
+    ('word_entropy', 'statistics', ('summary', 'word_entropy')),
+    ('root_families', 'linguistics', ('morphology', 'root_families_count')),
+    ('orthographic_families', 'linguistics', ('morphology', 'orthographic_families_count')),
+    ('jaccard_average', 'quevedo', ('jaccard_analysis', 'average')),
+    ('jaccard_median', 'quevedo', ('jaccard_analysis', 'median')),
+    ('first_word_entropy', 'quevedo', ('line_position', 'first_word_entropy')),
+    ('last_word_entropy', 'quevedo', ('line_position', 'last_word_entropy')),
+    ('statistics_seconds', 'statistics', ('metrics', 'wall_seconds')),
+    ('linguistics_seconds', 'linguistics', ('metrics', 'wall_seconds')),
+    ('quevedo_seconds', 'quevedo', ('metrics', 'wall_seconds')),
+]
+
+
+def is_ivtff(path):
+    """True if the first non-comment line is an IVTFF header, page header or locus"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('#=IVTFF'):
+                    return True
+                if not line or line[0] == '#':
+                    continue
+                return bool(page_header_match(line)) or (line[0] == '<' and '.' in line[:line.find('>')])
+    except OSError:
+        pass
+    return False
+
+
+def find_inputs(patterns):
+    """
+    Expand directories and globs into a sorted list of IVTFF files.
+
+    Files picked up by a directory or a wildcard are kept only if they look
+    like IVTFF (e.g. a README.txt next to the transliterations is skipped);
+    files named explicitly are always kept.
+    """
+    files = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            files.update(p for p in path.glob('*.txt') if p.is_file() and is_ivtff(p))
+        elif glob.has_magic(pattern):
+            files.update(Path(p) for p in glob.glob(pattern) if Path(p).is_file() and is_ivtff(p))
+        elif path.is_file():
+            files.add(path)
+    return sorted(files)
+
+
+def output_stems(inputs):
+    """
+    {path: stem for its output files}, unique across inputs.
+
+    Same-named files from different directories get the parent directory
+    name prepended (variants/a/ZL.txt -> a_ZL), then an index if needed.
+    """
+    counts = Counter(path.stem for path in inputs)
+    stems, used = {}, set()
+    for path in inputs:
+        stem = base = path.stem if counts[path.stem] == 1 else f"{path.parent.name}_{path.stem}"
+        n = 1
+        while stem in used:
+            n += 1
+            stem = f"{base}_{n}"
+        used.add(stem)
+        stems[path] = stem
+    return stems
+
+
+def run_file(filepath, analyses, output_dir, verbose=False, permutations=0, stem=None):
+    """
+    Run the selected analyses on one file (executed in a worker process).
+
+    permutations > 0 adds the Quevedo permutation tests; stem names the
+    output files (default: the input's file stem).
+
+    Returns {'file', 'seconds', 'outputs', '<analysis>': results}.
+    """
+    filepath = Path(filepath)
+    output_dir = Path(output_dir)
+    stem = stem or filepath.stem
+    outputs = {}
+    record = {'file': str(filepath)}
+    start = time.perf_counter()
+
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    with contextlib.nullcontext() if verbose else quiet:
+        stats_file = output_dir / f"{stem}_statistics.json"
+        if 'statistics' in analyses or 'linguistics' in analyses:
+            record['statistics'] = voynich_analysis.main(filepath, stats_file)
+            outputs['statistics'] = str(stats_file)
+        if 'linguistics' in analyses:
+            ling_file = output_dir / f"{stem}_linguistics.json"
+            record['linguistics'] = voynich_linguistics.main(stats_file, ling_file)
+            outputs['linguistics'] = str(ling_file)
+        if 'quevedo' in analyses:
+            quevedo_file = output_dir / f"{stem}_quevedo.json"
+            # Already one process per file: keep the permutation tests in-process
+            record['quevedo'] = quevedo_validation.main(filepath, quevedo_file,
+                                                        permutations=permutations, workers=1)
+            outputs['quevedo'] = str(quevedo_file)
+
+    record['seconds'] = round(time.perf_counter() - start, 3)
+    record['outputs'] = outputs
+    return record
+
+
+def comparison_row(record):
+    """Flatten one run record into a comparison-table row"""
+    row = {'file': record.get('label') or Path(record['file']).name, 'seconds': record['seconds']}
+    for column, analysis, path in COMPARISON_COLUMNS:
+        value = record.get(analysis)
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is not None:
+            row[column] = value
+    return row
+
+
+def write_comparison(rows, output_dir):
+    """Write the merged comparison table as JSON and CSV"""
+    output_dir = Path(output_dir)
+    json_file = output_dir / "comparison.json"
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, indent=2, ensure_ascii=False)
+
+    columns = ['file', 'seconds'] + [c for c, _, _ in COMPARISON_COLUMNS
+                                     if any(c in row for row in rows)]
+    csv_file = output_dir / "comparison.csv"
+    with open(csv_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    return json_file, csv_file
+
+
+def run_batch(inputs, analyses=ANALYSES, output_dir='batch_results', workers=None, permutations=0):
+    """Run every file on a process pool and return the comparison rows in input order"""
+    unknown = set(analyses) - set(ANALYSES)
+    if unknown:
+        raise ValueError(f"Unknown analyses: {sorted(unknown)}")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    workers = workers or min(len(inputs), os.cpu_count() or 1) or 1
+    stems = output_stems(inputs)
+    names = Counter(path.name for path in inputs)
+    records = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_file, str(path), tuple(analyses), str(output_dir),
+                               permutations=permutations, stem=stems[path]): path
+                   for path in inputs}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                record = future.result()
+            except Exception as exc:
+                print(f"    ✗ {path.name}: {exc}")
+                continue
+            if names[path.name] > 1:
+                record['label'] = str(path)
+            records[path] = record
+            print(f"    ✓ {path.name} ({record['seconds']:.2f}s)")
+
+    return [comparison_row(records[path]) for path in inputs if path in records]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Voynich analyses over many IVTFF files")
+    parser.add_argument('inputs', nargs='+', help="IVTFF files, directories or glob patterns")
+    parser.add_argument('--analyses', default=','.join(ANALYSES),
+                        help="comma-separated subset of: " + ', '.join(ANALYSES))
+    parser.add_argument('--output-dir', default='batch_results')
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: one per core, at most one per file)")
+    parser.add_argument('--permutations', type=int, default=0,
+                        help="Quevedo Jaccard null-model and gallow label permutations (0 = skip)")
+    args = parser.parse_args()
+
+    analyses = [a.strip() for a in args.analyses.split(',') if a.strip()]
+    inputs = find_inputs(args.inputs)
+
+    print("=" * 60)
+    print("VOYNICH BATCH RUNNER")
+    print("=" * 60)
+    print(f"\n[1] {len(inputs)} transliteration files, analyses: {', '.join(analyses)}")
+
+    print("\n[2] Running...")
+    start = time.perf_counter()
+    rows = run_batch(inputs, analyses, args.output_dir, args.workers, args.permutations)
+    print(f"    {len(rows)} of {len(inputs)} files done in {time.perf_counter() - start:.2f}s")
+
+    print("\n[3] Writing comparison table...")
+    json_file, csv_file = write_comparison(rows, args.output_dir)
+    print(f"\n[✓] Results saved to: {json_file}, {csv_file}")
+
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+"""
+Voynich Benchmark Harness
+Time and memory of every analysis stage on real and scaled corpora
+
+Each (corpus, stage) pair runs in its own child process, so a stage that
+runs out of memory on a huge corpus only loses its own row. Peak RSS is the
+child's high-water mark above its RSS at fork time. The parent never loads
+a corpus: a missing cache is built in a child of its own and corpus sizes
+are read from the cache metadata. Inside the child the stage input is
+prepared untimed, then the stage is timed (wall and CPU, best of a few
+runs) and, optionally, run once more under tracemalloc for the peak of
+Python/NumPy allocations.
+
+Synthetic corpora are the ZL3b transliteration repeated 10x, 100x, 1000x
+with page names renamed per copy - folio numbers shifted (f1r -> f1001r ->
+f2001r ...), other pages suffixed (fRos -> fRos~1 -> fRos~2 ...) - so every
+page and locus stays distinct and the text statistics stay realistic. They are
+generated on first use in benchmark_data/.
+
+    python voynich_benchmark.py --scales 10,100 --output before.json
+    python voynich_benchmark.py --scales 10,100 --compare before.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import re
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from voynich_metrics import rss_difference, current_rss, max_rss
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_FILES = (HERE / 'voynich_ZL3b.txt', HERE / 'voynich_RF1b.txt')
+DEFAULT_SCALES = (10, 100, 1000)
+DATA_DIR = HERE / 'benchmark_data'
+
+# Stop repeating a stage once a single run takes this long
+MAX_REPEAT_SECONDS = 5.0
+
+# Folio number offset between two copies in a synthetic corpus
+FOLIO_STRIDE = 1000
+
+# Page part of a page header or locus at the start of a line: <f1r>, <fRos.3,@Cc>
+NAME_RE = re.compile(r'^<([^\s.<>!][^\s.<>]*)')
+FOLIO_RE = re.compile(r'^f(\d+)')
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpora
+# ---------------------------------------------------------------------------
+
+def synthetic_path(source, scale, directory=DATA_DIR):
+    """Where the scale-times copy of source is kept"""
+    source = Path(source)
+    return Path(directory) / f"{source.stem}_x{scale}{source.suffix}"
+
+
+def shift_page(page, copy):
+    """Page name in the copy-th repetition: f1r -> f1001r, fRos -> fRos~1"""
+    if not copy:
+        return page
+    match = FOLIO_RE.match(page)
+    if match:
+        return f"f{int(match.group(1)) + copy * FOLIO_STRIDE}{page[match.end():]}"
+    return f"{page}~{copy}"
+
+
+def write_scaled_corpus(source, scale, output):
+    """Write source `scale` times, renaming the pages of every copy"""
+    with open(source, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_suffix(output.suffix + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as out:
+        for copy in range(scale):
+            if copy == 0:
+                out.writelines(lines)
+                continue
+            out.writelines(NAME_RE.sub(lambda m: f"<{shift_page(m.group(1), copy)}", line)
+                           for line in lines)
+    tmp.replace(output)
+    return output
+
+
+def scaled_corpus(source, scale, directory=DATA_DIR):
+    """Path of the scaled copy of source, (re)generated when missing or stale"""
+    output = synthetic_path(source, scale, directory)
+    # Renaming the pages is part of the recipe, so an edit to this script also
+    # makes old copies stale
+    newest = max(Path(source).stat().st_mtime, Path(__file__).stat().st_mtime)
+    if not output.exists() or output.stat().st_mtime < newest:
+        write_scaled_corpus(source, scale, output)
+    return output
+
+
+# ---------------------------------------------------------------------------
+# Stages: setup(path) prepares the input untimed, run(data) is measured
+# ---------------------------------------------------------------------------
+
+def _setup_path(path):
+    return path
+
+
+def _setup_corpus(path):
+    from voynich_corpus import load_corpus
+    return load_corpus(path)
+
+
+def _setup_cached_path(path):
+    _setup_corpus(path)
+    return path
+
+
+def _setup_words(path):
+    return _setup_corpus(path).words()
+
+
+def _setup_lines(path):
+    import quevedo_validation
+    _setup_corpus(path)
+    return quevedo_validation.parse_ivtff_advanced(path)
+
+
+def _setup_types(path):
+    return _setup_corpus(path).type_counts()
+
+
+def _run_iter_ivtff(path):
+    from voynich_tokenizer import iter_ivtff
+    for _ in iter_ivtff(path):
+        pass
+
+
+def _run_build_corpus(path):
+    from voynich_corpus import encode_lines
+    from voynich_tokenizer import iter_ivtff
+    page_meta = {}
+    encode_lines(iter_ivtff(path, page_meta), page_meta)
+
+
+def _run_parse_ivtff(path):
+    import voynich_analysis
+    voynich_analysis.parse_ivtff(path)
+
+
+def _run_ngram_analysis(words):
+    import voynich_analysis
+    voynich_analysis.ngram_analysis(words, 2)
+    voynich_analysis.ngram_analysis(words, 3)
+
+
+def _run_jaccard(lines):
+    import quevedo_validation
+    quevedo_validation.calculate_jaccard_index(lines)
+
+
+def _run_gallow_correlation(lines):
+    import quevedo_validation
+    quevedo_validation.analyze_gallow_correlation(lines)
+
+
+def _run_morphology(word_freq):
+    import voynich_linguistics
+    voynich_linguistics.analyze_word_structure(word_freq)
+    voynich_linguistics.detect_grammar_patterns(word_freq)
+
+
+def _run_entropy_profile(corpus):
+    from voynich_entropy import entropy_profile
+    entropy_profile(corpus, 1000, 500)
+
+
+def _run_law_fits(corpus):
+    from voynich_zipf import law_fits
+    law_fits(corpus, bootstrap=100)
+
+
+def _run_jaccard_significance(corpus):
+    from voynich_significance import jaccard_significance
+    jaccard_significance(corpus, permutations=100, workers=1, bootstrap=200)
+
+
+def _run_gallow_contingency(corpus):
+    from voynich_gallows import gallow_contingency
+    gallow_contingency(corpus, permutations=100)
+
+
+def _run_concordance(corpus):
+    from voynich_concordance import Concordance
+    Concordance(corpus)
+
+
+STAGES = {
+    'iter_ivtff': (_setup_path, _run_iter_ivtff),
+    'build_corpus': (_setup_path, _run_build_corpus),
+    'parse_ivtff': (_setup_cached_path, _run_parse_ivtff),
+    'ngram_analysis': (_setup_words, _run_ngram_analysis),
+    'calculate_jaccard_index': (_setup_lines, _run_jaccard),
+    'analyze_gallow_correlation': (_setup_lines, _run_gallow_correlation),
+    'morphology': (_setup_types, _run_morphology),
+    'entropy_profile': (_setup_corpus, _run_entropy_profile),
+    'law_fits': (_setup_corpus, _run_law_fits),
+    'jaccard_significance': (_setup_corpus, _run_jaccard_significance),
+    'gallow_contingency': (_setup_corpus, _run_gallow_contingency),
+    'concordance': (_setup_corpus, _run_concordance),
+}
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def _mib(nbytes):
+    return "     n/a" if nbytes is None else f"{nbytes / 2**20:>8.1f} MiB"
+
+
+def measure_stage(stage, path, repeat=3, trace=True):
+    """
+    Run one stage on one file and return its measurements.
+
+    seconds / cpu_seconds are the best of up to `repeat` runs; peak_rss is
+    the process high-water mark after the stage minus the RSS on entry
+    (rss_at_start, mostly pages shared with the parent), rss_growth the
+    increase over the RSS once the input was prepared; peak_alloc is the
+    tracemalloc peak of one extra run.
+    """
+    setup, run = STAGES[stage]
+    rss_start = current_rss()
+    start = time.perf_counter()
+    data = setup(path)
+    row = {'setup_seconds': round(time.perf_counter() - start, 4)}
+    rss_before = current_rss()
+
+    walls, cpus = [], []
+    for _ in range(max(1, repeat)):
+        wall, cpu = time.perf_counter(), time.process_time()
+        run(data)
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+        if walls[-1] > MAX_REPEAT_SECONDS:
+            break
+    row.update({
+        'seconds': round(min(walls), 5),
+        'cpu_seconds': round(min(cpus), 5),
+        'runs': len(walls),
+        'peak_rss': rss_difference(max_rss(), rss_start),
+        'rss_at_start': rss_start,
+        'rss_growth': rss_difference(max_rss(), rss_before),
+    })
+
+    if trace:
+        tracemalloc.start()
+        run(data)
+        row['peak_alloc'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return row
+
+
+def _child(target, args, conn):
+    try:
+        conn.send(target(*args))
+    except BaseException as exc:
+        conn.send({'error': f"{type(exc).__name__}: {exc}"})
+    finally:
+        conn.close()
+
+
+def call_isolated(target, args, timeout=None):
+    """target(*args) in a fresh child process; failures become an 'error' dict"""
+    ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods()
+                                      else 'spawn')
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(target, args, child))
+    proc.start()
+    child.close()
+    result = None
+    if parent.poll(timeout):
+        try:
+            result = parent.recv()
+        except EOFError:
+            result = None
+    proc.join(5 if result is not None else 0)
+    if proc.is_alive():
+        proc.terminate()
+        proc.join()
+        return result or {'error': f"timed out after {timeout}s"}
+    if result is None:
+        return {'error': f"worker exited with code {proc.exitcode} (out of memory?)"}
+    return result
+
+
+def run_isolated(stage, path, repeat=3, trace=True, timeout=None):
+    """measure_stage in a fresh child process; failures become an 'error' entry"""
+    return call_isolated(measure_stage, (stage, str(path), repeat, trace), timeout)
+
+
+def _build_cache(path):
+    from voynich_corpus import load_corpus
+    corpus = load_corpus(path)
+    return {'tokens': len(corpus.tokens), 'lines': corpus.num_lines}
+
+
+def corpus_size(path, timeout=None):
+    """
+    (tokens, lines) of a transliteration from its corpus cache metadata.
+
+    A missing or stale cache is built in a child process first; returns
+    (None, None) with the child's error if that fails.
+    """
+    from voynich_corpus import cached_size
+    size = cached_size(path)
+    if size is not None:
+        return size
+    built = call_isolated(_build_cache, (str(path),), timeout)
+    if 'error' in built:
+        print(f"    ✗ corpus cache: {built['error']}")
+        return None, None
+    return cached_size(path) or (built['tokens'], built['lines'])
+
+
+def environment():
+    """Interpreter, library and source version of this run"""
+    import scipy
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_benchmarks(files=DEFAULT_FILES, scales=DEFAULT_SCALES, stages=tuple(STAGES),
+                   repeat=3, trace=True, timeout=None, data_dir=DATA_DIR):
+    """
+    Benchmark every stage on the real files and on scaled copies of the first.
+
+    Returns {'environment', 'results': [row, ...]}; rows carry corpus,
+    scale, tokens, lines, stage and the measure_stage fields.
+    """
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+
+    corpora = [(Path(f).name, 1, Path(f)) for f in files]
+    for scale in scales:
+        corpora.append((f"{Path(files[0]).stem}_x{scale}", scale,
+                        scaled_corpus(files[0], scale, data_dir)))
+
+    results = []
+    for name, scale, path in corpora:
+        print(f"\n[{name}]")
+        tokens, lines = corpus_size(path, timeout)
+        if tokens is not None:
+            print(f"    {tokens:,} tokens, {lines:,} lines")
+        for stage in stages:
+            row = {'corpus': name, 'scale': scale, 'tokens': tokens, 'lines': lines,
+                   'stage': stage}
+            row.update(run_isolated(stage, path, repeat, trace, timeout))
+            results.append(row)
+            if 'error' in row:
+                print(f"    {stage:<27} ✗ {row['error']}")
+            else:
+                print(f"    {stage:<27} {row['seconds']:>10.4f}s  cpu {row['cpu_seconds']:>9.4f}s  "
+                      f"peak RSS {_mib(row['peak_rss'])}")
+    return {'environment': environment(), 'results': results}
+
+
+def compare(current, baseline):
+    """Per (corpus, stage) time ratios current / baseline"""
+    old = {(r['corpus'], r['stage']): r for r in baseline['results'] if 'seconds' in r}
+    rows = []
+    for r in current['results']:
+        prev = old.get((r['corpus'], r['stage']))
+        if prev and 'seconds' in r and prev['seconds'] > 0:
+            rows.append({'corpus': r['corpus'], 'stage': r['stage'],
+                         'baseline': prev['seconds'], 'current': r['seconds'],
+                         'ratio': round(r['seconds'] / prev['seconds'], 3)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Voynich analysis stages")
+    parser.add_argument('files', nargs='*', default=[str(f) for f in DEFAULT_FILES],
+                        help="real transliterations; the first one is scaled up")
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help="synthetic corpus sizes as multiples of the first file ('' for none)")
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-tracemalloc', action='store_true')
+    parser.add_argument('--timeout', type=float, default=None, help="seconds per stage")
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--compare', default=None, help="earlier results JSON to compare with")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH BENCHMARKS")
+    print("=" * 60)
+
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    report = run_benchmarks(args.files, scales, stages, args.repeat,
+                            not args.no_tracemalloc, args.timeout)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['comparison'] = {'baseline': baseline.get('environment'),
+                                'stages': compare(report, baseline)}
+        print(f"\n    Compared with {args.compare}:")
+        for row in report['comparison']['stages']:
+            print(f"    {row['corpus']:<24} {row['stage']:<27} x{row['ratio']:.3f}")
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        output = DATA_DIR / f"benchmark_{report['environment']['commit'] or 'results'}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[✓] Results saved to: {output}")
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Voynich Concordance Index
+Suffix-array search over the cleaned glyph stream with KWIC output
+
+The running words of a corpus are laid out as one byte string with a single
+space before and after every word (' daiin chol qokeedy ... '), and a suffix
+array over that string is built once with prefix doubling. A query is then
+two binary searches for the range of suffixes starting with its literal key,
+independent of corpus size apart from the log factor.
+
+Queries match whole words:
+
+    qokeedy   the word itself            key ' qokeedy '
+    qok*      words starting with qok    key ' qok'
+    *aiin     words ending in aiin       key 'aiin '
+    *kee*     words containing kee       key 'kee'
+    qo*dy     wildcard                   longest anchored literal, then
+    ch.dy     ('.' is exactly one glyph) each candidate word is checked
+
+'.' never occurs inside a word (it is the IVTFF word separator) and '?' is a
+real EVA glyph, so '.' is the single-glyph wildcard.
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from voynich_corpus import load_corpus
+from voynich_index import select
+
+WILDCARD_RE = re.compile(r'[*.]')
+
+
+def build_text(corpus):
+    """
+    Glyph stream of a corpus as bytes.
+
+    Returns (text, token_starts) where token_starts[i] is the byte offset of
+    the first glyph of token i; every word is framed by single spaces.
+    """
+    vocab_bytes = [w.encode('utf-8') for w in corpus.vocab]
+    tokens = np.asarray(corpus.tokens)
+    lengths = np.array([len(b) for b in vocab_bytes], dtype=np.int64)[tokens]
+    token_starts = np.concatenate(([1], np.cumsum(lengths + 1)[:-1] + 1)).astype(np.int64)
+    text = b' ' + b' '.join(vocab_bytes[t] for t in tokens.tolist()) + b' '
+    return text, token_starts[:len(tokens)]
+
+
+def suffix_array(text):
+    """Suffix array of a byte string by prefix doubling (O(n log^2 n), vectorized)"""
+    n = len(text)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    rank = np.frombuffer(text, dtype=np.uint8).astype(np.int64)
+    sa = np.argsort(rank, kind='stable')
+    k = 1
+    while True:
+        # Sort by (rank[i], rank[i + k]); suffixes running off the end sort first
+        second = np.zeros(n, dtype=np.int64)
+        second[:n - k] = rank[k:] + 1
+        key = rank * (n + 1) + second
+        sa = np.argsort(key, kind='stable')
+        sorted_key = key[sa]
+        new_rank = np.empty(n, dtype=np.int64)
+        new_rank[sa] = np.concatenate(([0], np.cumsum(sorted_key[1:] != sorted_key[:-1])))
+        rank = new_rank
+        if rank[sa[-1]] == n - 1 or k >= n:
+            return sa
+        k *= 2
+
+
+def compile_pattern(pattern):
+    """
+    Search key and word check for a query.
+
+    Returns (key, regex) where key is the literal byte string looked up in
+    the suffix array (framed by spaces where the pattern is anchored) and
+    regex is None when every key hit is a match, otherwise a compiled regex
+    each candidate word must fully match.
+    """
+    if not pattern or any(ch.isspace() for ch in pattern):
+        raise ValueError(f"Bad concordance query {pattern!r}: expected one word pattern")
+
+    pieces = WILDCARD_RE.split(pattern)
+    keys = []
+    for i, piece in enumerate(pieces):
+        if not piece:
+            continue
+        key = piece
+        if i == 0:
+            key = ' ' + key
+        if i == len(pieces) - 1:
+            key = key + ' '
+        keys.append(key)
+    if not keys:
+        # Pure wildcard: anchor on the word start, check every word
+        keys = [' ']
+    key = max(keys, key=len)
+
+    # Exact word, prefix, suffix and substring queries are settled by the key
+    core = pattern.strip('*')
+    regex = None
+    if '.' in pattern or '*' in core or not core:
+        body = ''.join('.*' if ch == '*' else '.' if ch == '.' else re.escape(ch)
+                       for ch in pattern)
+        regex = re.compile(body, re.DOTALL)
+    return key.encode('utf-8'), regex
+
+
+class Concordance:
+    """
+    Suffix-array index over a corpus for word-pattern lookups.
+
+    find(pattern)   sorted token indices of matching words
+    count(pattern)  number of matching tokens
+    kwic(pattern)   hits with page, locus and in-line context
+    """
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.text, self.token_starts = build_text(corpus)
+        self.sa = suffix_array(self.text)
+        self._tokens = np.asarray(corpus.tokens)
+        self._line_offsets = np.asarray(corpus.line_offsets)
+        # Token owning each byte of the text (a word and the space after it)
+        owner = np.zeros(len(self.text), dtype=np.int32)
+        owner[self.token_starts[1:]] = 1
+        self._byte_token = np.cumsum(owner, dtype=np.int32)
+
+    def _range(self, key):
+        """[lo, hi) range of suffixes starting with key"""
+        text, sa, m = self.text, self.sa, len(key)
+        lo, hi = 0, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = sa[mid]
+            if text[start:start + m] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        first = lo
+        hi = len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = sa[mid]
+            if text[start:start + m] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return first, lo
+
+    def find(self, pattern):
+        """Sorted token indices of the words matching pattern"""
+        key, regex = compile_pattern(pattern)
+        if key == b' ':
+            hits = np.arange(len(self._tokens))
+            return self._check(hits, regex)
+        lo, hi = self._range(key)
+        positions = self.sa[lo:hi]
+        if key.startswith(b' '):
+            positions = positions + 1
+            # The closing space of the text starts no word
+            positions = positions[positions < len(self.text)]
+        hits = np.sort(self._byte_token[positions])
+        if len(hits) > 1:
+            hits = hits[np.concatenate(([True], hits[1:] != hits[:-1]))]
+        return self._check(hits, regex)
+
+    def _check(self, hits, regex):
+        """Keep the candidate tokens whose word fully matches regex (checked once per type)"""
+        if regex is None or not len(hits):
+            return hits
+        vocab = self.corpus.vocab
+        ids = self._tokens[hits]
+        ok = np.zeros(len(vocab), dtype=bool)
+        for i in np.flatnonzero(np.bincount(ids, minlength=len(vocab))).tolist():
+            ok[i] = regex.fullmatch(vocab[i]) is not None
+        return hits[ok[ids]]
+
+    def count(self, pattern):
+        """Number of tokens matching pattern"""
+        return len(self.find(pattern))
+
+    def kwic(self, pattern, width=4, limit=None):
+        """
+        Keyword-in-context hits for pattern.
+
+        Each hit is {'token', 'line', 'page', 'locus', 'word', 'left', 'right'}
+        with up to width words of context from the same line on each side.
+        """
+        hits = self.find(pattern)
+        if limit is not None:
+            hits = hits[:limit]
+        corpus = self.corpus
+        vocab = corpus.vocab
+        offsets = self._line_offsets
+        lines = np.searchsorted(offsets, hits, side='right') - 1
+        results = []
+        for tok, line in zip(hits.tolist(), lines.tolist()):
+            start, end = int(offsets[line]), int(offsets[line + 1])
+            page_idx = int(corpus.line_page[line])
+            results.append({
+                'token': tok,
+                'line': line,
+                'page': corpus.pages[page_idx] if page_idx >= 0 else None,
+                'locus': corpus.loci[line],
+                'word': vocab[self._tokens[tok]],
+                'left': [vocab[t] for t in self._tokens[max(start, tok - width):tok].tolist()],
+                'right': [vocab[t] for t in self._tokens[tok + 1:min(end, tok + 1 + width)].tolist()],
+            })
+        return results
+
+
+def format_kwic(hit, width=30):
+    """One KWIC line: locus, right-aligned left context, [word], right context"""
+    left = ' '.join(hit['left'])[-width:]
+    right = ' '.join(hit['right'])[:width]
+    return f"{hit['locus'] or '':<14} {left:>{width}} [{hit['word']}] {right}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concordance lookups over a transliteration")
+    parser.add_argument('patterns', nargs='+',
+                        help="word patterns: qokeedy, qok*, *aiin, *kee*, qo*dy, ch.dy")
+    parser.add_argument('--file', default=str(Path(__file__).with_name('voynich_ZL3b.txt')))
+    parser.add_argument('--subset', default=None, help="page selection, e.g. '$L=B,$I=H'")
+    parser.add_argument('--width', type=int, default=4, help="context words on each side")
+    parser.add_argument('--limit', type=int, default=20, help="hits shown per pattern")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH CONCORDANCE")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    corpus = select(load_corpus(args.file), args.subset)
+    index = Concordance(corpus)
+    print(f"\n    {len(corpus.tokens):,} tokens, {len(index.text):,} bytes indexed "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    for pattern in args.patterns:
+        start = time.perf_counter()
+        total = index.count(pattern)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n[{pattern}] {total:,} hits ({elapsed:.3f} ms)")
+        for hit in index.kwic(pattern, args.width, args.limit):
+            print("    " + format_kwic(hit))
+
+
+if __name__ == "__main__":
+    main()
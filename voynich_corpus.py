@@ -0,0 +1,322 @@
+"""
+Voynich Pre-tokenized Corpus Cache
+Binary word-ID corpus built once per transliteration and memory-mapped after
+
+The first run over an IVTFF file interns every word into an integer vocabulary
+and writes the token stream plus line/page offsets as .npy arrays in a
+<name>.corpus/ directory next to the source. Later runs memory-map those
+arrays instead of re-reading the transliteration. The cache is keyed on the
+SHA-256 of the source file and on the markup-cleaning patterns, so editing
+the transliteration (or the cleaning rules) rebuilds it automatically.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from voynich_tokenizer import (IvtffLine, iter_ivtff, PAGE_RE, TAG_RE, UNCERTAIN_RE,
+                               LIGATURE_RE, REFERENCE_RE)
+
+# Bump when the on-disk layout changes
+FORMAT_VERSION = 2
+
+CLEANING_OPTIONS = {
+    'pages': PAGE_RE.pattern,
+    'tags': TAG_RE.pattern,
+    'uncertain': UNCERTAIN_RE.pattern,
+    'ligatures': LIGATURE_RE.pattern,
+    'references': REFERENCE_RE.pattern,
+}
+
+
+def file_hash(filepath):
+    """SHA-256 of the raw source bytes"""
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(filepath, options=None):
+    """Cache key combining source hash, cleaning options and format version"""
+    payload = {
+        'source': file_hash(filepath),
+        'cleaning': CLEANING_OPTIONS if options is None else options,
+        'format': FORMAT_VERSION,
+    }
+    blob = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(blob).hexdigest()
+
+
+def cache_dir(filepath):
+    """Directory holding the cache for a transliteration"""
+    filepath = Path(filepath)
+    return filepath.with_name(filepath.name + '.corpus')
+
+
+class Corpus:
+    """
+    Integer-encoded transliteration.
+
+    tokens        word ID per running word (int32)
+    line_offsets  token start of each line, plus a final end offset (int64)
+    line_page     page index of each line, -1 before the first page (int32)
+    page_offsets  first line of each page, plus a final end offset (int64)
+    vocab         word string for each ID
+    pages, loci, raws  page names and per-line locus / cleaned text
+    page_meta     header variables of each page, e.g. {'L': 'B', 'I': 'H'}
+    """
+
+    def __init__(self, vocab, tokens, line_offsets, line_page, pages, loci, raws,
+                 page_meta=None):
+        self.vocab = vocab
+        self.tokens = tokens
+        self.line_offsets = line_offsets
+        self.line_page = line_page
+        self.pages = pages
+        self.loci = loci
+        self.raws = raws
+        self.page_meta = page_meta if page_meta is not None else [{} for _ in pages]
+        self.page_offsets = _page_offsets(line_page, len(pages))
+        self._word_ids = None
+        self._metadata_index = None
+
+    @property
+    def word_ids(self):
+        """Word string to ID mapping"""
+        if self._word_ids is None:
+            self._word_ids = {w: i for i, w in enumerate(self.vocab)}
+        return self._word_ids
+
+    @property
+    def num_lines(self):
+        return len(self.loci)
+
+    @property
+    def metadata_index(self):
+        """Inverted index from 'VAR=value' to page IDs (see voynich_index)"""
+        if self._metadata_index is None:
+            from voynich_index import build_metadata_index
+            self._metadata_index = build_metadata_index(self)
+        return self._metadata_index
+
+    def subset(self, lines):
+        """
+        Corpus restricted to the given line indices (ascending).
+
+        Token ranges are gathered straight from line_offsets; vocabulary,
+        page names and page metadata are shared with the parent corpus.
+        """
+        lines = np.asarray(lines, dtype=np.int64)
+        offsets = np.asarray(self.line_offsets)
+        starts = offsets[lines]
+        lengths = offsets[lines + 1] - starts
+        new_offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        gather = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+
+        corpus = Corpus(self.vocab,
+                        np.asarray(self.tokens)[gather],
+                        new_offsets,
+                        np.asarray(self.line_page)[lines],
+                        self.pages,
+                        [self.loci[i] for i in lines.tolist()],
+                        [self.raws[i] for i in lines.tolist()],
+                        self.page_meta)
+        corpus._word_ids = self._word_ids
+        return corpus
+
+    def type_counts(self):
+        """Counter of the word types present, in vocabulary (first-occurrence) order"""
+        counts = np.bincount(np.asarray(self.tokens), minlength=len(self.vocab))
+        return Counter({w: c for w, c in zip(self.vocab, counts.tolist()) if c})
+
+    def words(self):
+        """Running word list, as returned by parse_ivtff"""
+        vocab = self.vocab
+        return [vocab[i] for i in self.tokens.tolist()]
+
+    def line_words(self, i):
+        """Words of line i"""
+        vocab = self.vocab
+        ids = self.tokens[self.line_offsets[i]:self.line_offsets[i + 1]]
+        return [vocab[t] for t in ids.tolist()]
+
+    def iter_lines(self):
+        """Yield IvtffLine records exactly as iter_ivtff would"""
+        vocab = self.vocab
+        pages = self.pages
+        tokens = self.tokens.tolist()
+        offsets = self.line_offsets.tolist()
+        for i, page_idx in enumerate(self.line_page.tolist()):
+            words = [vocab[t] for t in tokens[offsets[i]:offsets[i + 1]]]
+            page = pages[page_idx] if page_idx >= 0 else None
+            yield IvtffLine(page, self.loci[i], words, self.raws[i])
+
+
+def _page_offsets(line_page, num_pages):
+    """First line of each page from the per-line page index"""
+    offsets = np.searchsorted(np.asarray(line_page), np.arange(num_pages + 1))
+    offsets[-1] = len(line_page)
+    return offsets.astype(np.int64)
+
+
+def encode_lines(records, page_meta=None):
+    """Intern IvtffLine records into a Corpus held in memory"""
+    word_ids = {}
+    vocab = []
+    tokens = []
+    line_offsets = [0]
+    line_page = []
+    page_ids = {}
+    pages = []
+    loci = []
+    raws = []
+
+    for record in records:
+        for w in record.words:
+            wid = word_ids.get(w)
+            if wid is None:
+                wid = word_ids[w] = len(vocab)
+                vocab.append(w)
+            tokens.append(wid)
+        line_offsets.append(len(tokens))
+
+        if record.page is None:
+            line_page.append(-1)
+        else:
+            pid = page_ids.get(record.page)
+            if pid is None:
+                pid = page_ids[record.page] = len(pages)
+                pages.append(record.page)
+            line_page.append(pid)
+        loci.append(record.locus)
+        raws.append(record.raw)
+
+    corpus = Corpus(vocab,
+                    np.array(tokens, dtype=np.int32),
+                    np.array(line_offsets, dtype=np.int64),
+                    np.array(line_page, dtype=np.int32),
+                    pages, loci, raws,
+                    [(page_meta or {}).get(p, {}) for p in pages])
+    corpus._word_ids = word_ids
+    return corpus
+
+
+def save_corpus(corpus, directory, key):
+    """Write a Corpus to directory; meta.json is written last as the commit marker"""
+    directory = Path(directory)
+    tmp = directory.with_name(directory.name + f'.tmp{os.getpid()}')
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    np.save(tmp / 'tokens.npy', corpus.tokens)
+    np.save(tmp / 'line_offsets.npy', corpus.line_offsets)
+    np.save(tmp / 'line_page.npy', corpus.line_page)
+    with open(tmp / 'strings.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'vocab': corpus.vocab,
+            'pages': corpus.pages,
+            'loci': corpus.loci,
+            'raws': corpus.raws,
+            'page_meta': corpus.page_meta,
+        }, f, ensure_ascii=False)
+    with open(tmp / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'format': FORMAT_VERSION,
+                   'tokens': len(corpus.tokens), 'lines': corpus.num_lines}, f)
+
+    if directory.exists():
+        shutil.rmtree(directory)
+    os.replace(tmp, directory)
+
+
+def read_corpus(directory, key):
+    """Memory-map a cached Corpus, or return None if missing or stale"""
+    directory = Path(directory)
+    try:
+        with open(directory / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('key') != key:
+            return None
+        with open(directory / 'strings.json', 'r', encoding='utf-8') as f:
+            strings = json.load(f)
+        return Corpus(strings['vocab'],
+                      np.load(directory / 'tokens.npy', mmap_mode='r'),
+                      np.load(directory / 'line_offsets.npy', mmap_mode='r'),
+                      np.load(directory / 'line_page.npy', mmap_mode='r'),
+                      strings['pages'], strings['loci'], strings['raws'],
+                      strings['page_meta'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def cached_size(filepath):
+    """(tokens, lines) recorded in an up-to-date corpus cache, without loading it, or None"""
+    try:
+        with open(cache_dir(filepath) / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('key') == cache_key(filepath):
+            return meta['tokens'], meta['lines']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def load_corpus(filepath, rebuild=False):
+    """
+    Load the integer-encoded corpus for an IVTFF file.
+
+    Uses the memory-mapped cache when its key matches the current source,
+    otherwise parses the file and (re)writes the cache. If the cache
+    directory cannot be written the in-memory corpus is still returned.
+    """
+    key = cache_key(filepath)
+    directory = cache_dir(filepath)
+
+    if not rebuild:
+        corpus = read_corpus(directory, key)
+        if corpus is not None:
+            return corpus
+
+    page_meta = {}
+    corpus = encode_lines(iter_ivtff(filepath, page_meta), page_meta)
+    try:
+        save_corpus(corpus, directory, key)
+    except OSError:
+        pass
+    return corpus
+
+
+def misfiled_loci(corpus):
+    """Loci whose page prefix (fRos in fRos.1) differs from the page they were filed under"""
+    return [locus for locus, pid in zip(corpus.loci, np.asarray(corpus.line_page).tolist())
+            if locus.partition('.')[0] != (corpus.pages[pid] if pid >= 0 else None)]
+
+
+def main():
+    paths = sys.argv[1:] or [Path(__file__).with_name('voynich_ZL3b.txt')]
+
+    print("=" * 60)
+    print("VOYNICH CORPUS CACHE BUILD")
+    print("=" * 60)
+
+    for path in paths:
+        corpus = load_corpus(path, rebuild=True)
+        print(f"\n    {path}")
+        print(f"    Tokens: {len(corpus.tokens):,}  Types: {len(corpus.vocab):,}  "
+              f"Lines: {corpus.num_lines:,}  Pages: {len(corpus.pages):,}")
+        misfiled = misfiled_loci(corpus)
+        if misfiled:
+            print(f"    Warning: {len(misfiled):,} loci under another page's header, e.g. {misfiled[:3]}")
+        print(f"    Cache: {cache_dir(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Voynich Transliteration Diff
+Locus-aligned glyph and word edit distance between transliterations
+
+Lines of two IVTFF files are joined on their locus ID (f1r.1 from
+<f1r.1,@P0>) and compared twice: as glyph strings (words joined by '.', so
+a misplaced word break costs one edit) and as word sequences. Disagreement
+is reported per line, page, section ($I by default) and overall, as edit
+counts and error rates (edits / length of the longer side).
+
+Distances use Myers' bit-parallel algorithm in Hyyrö's blocked form, run
+for all lines of a pair at once: one uint64 lane (or several 64-row
+blocks) per line, advanced one text symbol at a time with numpy, so a full
+diff is a few hundred vectorized steps. Pattern symbols are numbered per
+line, which keeps the match-mask table small for word alphabets too.
+
+    python voynich_diff.py voynich_ZL3b.txt voynich_RF1b.txt
+    python voynich_diff.py variants/*.txt --output diff_matrix.json
+"""
+
+import argparse
+import itertools
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from voynich_corpus import load_corpus
+
+WORD_SEPARATOR = '.'
+
+BLOCK = 64
+ONE = np.uint64(1)
+HIGH_BIT = np.uint64(1 << (BLOCK - 1))
+
+
+def locus_key(locus):
+    """Locus ID without the locus type, e.g. 'f1r.1,@P0' -> 'f1r.1'"""
+    return locus.split(',', 1)[0] if locus else locus
+
+
+def align_lines(a, b):
+    """
+    Line indices of two corpora sharing a locus ID, in the order of a.
+
+    Returns (ia, ib, only_a, only_b) with the unmatched locus IDs of each side.
+    """
+    keys_b = {}
+    for i, locus in enumerate(b.loci):
+        keys_b.setdefault(locus_key(locus), i)
+    ia, ib, only_a, seen = [], [], [], set()
+    for i, locus in enumerate(a.loci):
+        key = locus_key(locus)
+        j = keys_b.get(key)
+        if j is None or key in seen:
+            only_a.append(key)
+            continue
+        seen.add(key)
+        ia.append(i)
+        ib.append(j)
+    only_b = [k for k in keys_b if k not in seen]
+    return np.array(ia, dtype=np.int64), np.array(ib, dtype=np.int64), only_a, only_b
+
+
+def pad_sequences(sequences):
+    """List of int sequences -> (padded int64 array, lengths)"""
+    lengths = np.array([len(s) for s in sequences], dtype=np.int64)
+    out = np.zeros((len(sequences), max(int(lengths.max(initial=0)), 1)), dtype=np.int64)
+    mask = np.arange(out.shape[1])[None, :] < lengths[:, None]
+    if len(sequences):
+        out[mask] = np.fromiter(itertools.chain.from_iterable(sequences), dtype=np.int64,
+                                count=int(lengths.sum()))
+    return out, lengths
+
+
+def myers_distance(patterns, pattern_len, texts, text_len):
+    """
+    Levenshtein distance of every (pattern, text) row pair.
+
+    patterns / texts are padded int arrays (one sequence per row) with
+    their true lengths; symbols are arbitrary non-negative integers.
+    """
+    lines = len(patterns)
+    distance = np.zeros(lines, dtype=np.int64)
+    if not lines:
+        return distance
+    m = np.asarray(pattern_len, dtype=np.int64)
+    n = np.asarray(text_len, dtype=np.int64)
+    blocks = max(1, -(-int(m.max()) // BLOCK))
+
+    # Number each row's pattern symbols: key = row * alphabet + symbol
+    alphabet = int(max(patterns.max(initial=0), texts.max(initial=0))) + 1
+    rows = np.arange(lines, dtype=np.int64)[:, None]
+    valid = np.arange(patterns.shape[1])[None, :] < m[:, None]
+    keys = np.sort((rows * alphabet + patterns)[valid])
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+
+    # Match masks: peq[id] holds the pattern positions of symbol id (0 = no match)
+    peq = np.zeros((len(keys) + 1, blocks), dtype=np.uint64)
+    for i in range(patterns.shape[1]):
+        live = np.flatnonzero(valid[:, i])
+        ids = np.searchsorted(keys, live * alphabet + patterns[live, i]) + 1
+        peq[ids, i // BLOCK] |= ONE << np.uint64(i % BLOCK)
+    text_keys = rows * alphabet + texts
+    if len(keys):
+        pos = np.minimum(np.searchsorted(keys, text_keys), len(keys) - 1)
+        text_ids = np.where(keys[pos] == text_keys, pos + 1, 0)
+    else:
+        text_ids = np.zeros_like(texts)
+
+    # Process rows by decreasing text length, so the live rows are a prefix
+    order = np.argsort(-n, kind='stable')
+    m_sorted, n_sorted, text_ids = m[order], n[order], text_ids[order]
+    last_block = np.maximum(m_sorted - 1, 0) // BLOCK
+    last_bit = (np.maximum(m_sorted - 1, 0) % BLOCK).astype(np.uint64)
+    score = m_sorted.copy()
+    pv = np.full((lines, blocks), np.iinfo(np.uint64).max, dtype=np.uint64)
+    mv = np.zeros((lines, blocks), dtype=np.uint64)
+    live_counts = np.searchsorted(-n_sorted, -np.arange(int(n.max(initial=0))), side='left')
+    for j, live in enumerate(live_counts.tolist()):
+        eq_all = peq[text_ids[:live, j]]
+        hin = np.ones(live, dtype=np.int8)
+        for b in range(blocks):
+            eq = eq_all[:, b].copy()
+            p, q = pv[:live, b], mv[:live, b]
+            xv = eq | q
+            eq[hin < 0] |= ONE
+            xh = (((eq & p) + p) ^ p) | eq
+            ph = q | ~(xh | p)
+            mh = p & xh
+            ends = np.flatnonzero(last_block[:live] == b)
+            if len(ends):
+                bit = last_bit[ends]
+                score[ends] += ((ph[ends] >> bit) & ONE).astype(np.int64) \
+                    - ((mh[ends] >> bit) & ONE).astype(np.int64)
+            hout = (ph & HIGH_BIT != 0).astype(np.int8) - (mh & HIGH_BIT != 0).astype(np.int8)
+            ph <<= ONE
+            mh <<= ONE
+            mh[hin < 0] |= ONE
+            ph[hin > 0] |= ONE
+            pv[:live, b] = mh | ~(xv | ph)
+            mv[:live, b] = ph & xv
+            hin = hout
+    score = np.where(m_sorted == 0, n_sorted, score)
+    distance[order] = score
+    return distance
+
+
+def _glyph_codes(corpus, lines):
+    return [[ord(ch) for ch in WORD_SEPARATOR.join(corpus.line_words(i))] for i in lines]
+
+
+def line_distances(a, b):
+    """Per aligned line: glyph / word lengths and edit distances between a and b"""
+    ia, ib, only_a, only_b = align_lines(a, b)
+
+    glyphs_a, glyph_len_a = pad_sequences(_glyph_codes(a, ia.tolist()))
+    glyphs_b, glyph_len_b = pad_sequences(_glyph_codes(b, ib.tolist()))
+
+    # Shared word IDs: a's vocabulary first, then b's new words
+    word_ids = dict(a.word_ids)
+    remap_b = np.array([word_ids.setdefault(w, len(word_ids)) for w in b.vocab], dtype=np.int64)
+    tokens_a, tokens_b = np.asarray(a.tokens, dtype=np.int64), remap_b[np.asarray(b.tokens)]
+    off_a, off_b = np.asarray(a.line_offsets), np.asarray(b.line_offsets)
+    words_a, word_len_a = pad_sequences([tokens_a[off_a[i]:off_a[i + 1]] for i in ia.tolist()])
+    words_b, word_len_b = pad_sequences([tokens_b[off_b[i]:off_b[i + 1]] for i in ib.tolist()])
+
+    return {
+        'line_a': ia, 'line_b': ib, 'only_a': only_a, 'only_b': only_b,
+        'glyphs_a': glyph_len_a, 'glyphs_b': glyph_len_b,
+        'glyph_distance': myers_distance(glyphs_a, glyph_len_a, glyphs_b, glyph_len_b),
+        'words_a': word_len_a, 'words_b': word_len_b,
+        'word_distance': myers_distance(words_a, word_len_a, words_b, word_len_b),
+    }
+
+
+def _summary(d, rows):
+    glyph_len = np.maximum(d['glyphs_a'][rows], d['glyphs_b'][rows])
+    word_len = np.maximum(d['words_a'][rows], d['words_b'][rows])
+    glyph_edits = int(d['glyph_distance'][rows].sum())
+    word_edits = int(d['word_distance'][rows].sum())
+    return {
+        'lines': int(len(rows)),
+        'identical_lines': int((d['glyph_distance'][rows] == 0).sum()),
+        'glyph_edits': glyph_edits,
+        'glyph_error_rate': round(glyph_edits / max(int(glyph_len.sum()), 1), 5),
+        'word_edits': word_edits,
+        'word_error_rate': round(word_edits / max(int(word_len.sum()), 1), 5),
+    }
+
+
+def diff_corpora(a, b, section_var='I', top=10):
+    """
+    Disagreement between two corpora.
+
+    Returns {'overall', 'pages', 'sections', 'only_a', 'only_b', 'worst_lines'};
+    pages and sections follow corpus a's page headers.
+    """
+    d = line_distances(a, b)
+    line_page = np.asarray(a.line_page)[d['line_a']]
+
+    pages = {}
+    sections = {}
+    page_section = [meta.get(section_var, '?') for meta in a.page_meta]
+    order = np.argsort(line_page, kind='stable')
+    bounds = np.flatnonzero(np.r_[True, line_page[order][1:] != line_page[order][:-1], True])
+    for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        rows = order[start:end]
+        p = int(line_page[rows[0]])
+        pages[a.pages[p] if p >= 0 else None] = _summary(d, rows)
+    for section in sorted(set(page_section)):
+        pids = [p for p, s in enumerate(page_section) if s == section]
+        rows = np.flatnonzero(np.isin(line_page, pids))
+        if len(rows):
+            sections[section] = _summary(d, rows)
+
+    worst = np.argsort(-d['glyph_distance'], kind='stable')[:top]
+    return {
+        'overall': _summary(d, np.arange(len(d['line_a']))),
+        'section_var': section_var,
+        'sections': sections,
+        'pages': pages,
+        'only_a': d['only_a'],
+        'only_b': d['only_b'],
+        'worst_lines': [
+            {'locus': locus_key(a.loci[int(d['line_a'][r])]),
+             'glyph_distance': int(d['glyph_distance'][r]),
+             'word_distance': int(d['word_distance'][r]),
+             'a': WORD_SEPARATOR.join(a.line_words(int(d['line_a'][r]))),
+             'b': WORD_SEPARATOR.join(b.line_words(int(d['line_b'][r])))}
+            for r in worst.tolist() if d['glyph_distance'][r] > 0
+        ],
+    }
+
+
+def pairwise(paths, section_var='I'):
+    """diff_corpora for every pair of files: {'a|b': report}"""
+    corpora = {str(p): load_corpus(p) for p in paths}
+    return {f"{Path(p).name}|{Path(q).name}": diff_corpora(corpora[p], corpora[q], section_var)
+            for p, q in itertools.combinations(corpora, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Locus-aligned diff of IVTFF transliterations")
+    parser.add_argument('files', nargs='*',
+                        default=[str(Path(__file__).with_name('voynich_ZL3b.txt')),
+                                 str(Path(__file__).with_name('voynich_RF1b.txt'))])
+    parser.add_argument('--section-var', default='I')
+    parser.add_argument('--pages', type=int, default=10, help="most divergent pages to print")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+    if len(args.files) < 2:
+        parser.error("need at least two files")
+
+    print("=" * 60)
+    print("VOYNICH TRANSLITERATION DIFF")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    reports = pairwise(args.files, args.section_var)
+    print(f"\n    {len(reports)} pair(s) in {time.perf_counter() - start:.2f}s")
+
+    for pair, report in reports.items():
+        overall = report['overall']
+        print(f"\n[{pair}]")
+        print(f"    Aligned lines: {overall['lines']:,} ({overall['identical_lines']:,} identical), "
+              f"unmatched {len(report['only_a'])} / {len(report['only_b'])}")
+        print(f"    Glyph error rate: {overall['glyph_error_rate']:.4f} ({overall['glyph_edits']:,} edits)")
+        print(f"    Word error rate:  {overall['word_error_rate']:.4f} ({overall['word_edits']:,} edits)")
+        print(f"    By ${args.section_var}:")
+        for section, s in report['sections'].items():
+            print(f"        {section:<4} glyph {s['glyph_error_rate']:.4f}  word {s['word_error_rate']:.4f}"
+                  f"  ({s['lines']} lines)")
+        print(f"    Most divergent pages:")
+        for page, s in sorted(report['pages'].items(), key=lambda x: -x[1]['glyph_error_rate'])[:args.pages]:
+            print(f"        {page:<8} glyph {s['glyph_error_rate']:.4f}  word {s['word_error_rate']:.4f}")
+        for line in report['worst_lines'][:3]:
+            print(f"    {line['locus']:<10} {line['a']}")
+            print(f"    {'':<10} {line['b']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+        print(f"\n[✓] Results saved to: {args.output}")
+
+    return reports
+
+
+if __name__ == "__main__":
+    main()
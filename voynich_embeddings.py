@@ -0,0 +1,273 @@
+"""
+Voynich Distributional Word Classes
+PPMI co-occurrence vectors, randomized truncated SVD and k-means clusters
+
+Root families from suffix stripping only group words that look alike. Here
+words are grouped by the company they keep:
+
+    co-occurrence   every pair of tokens at most `window` positions apart on
+                    the same line, counted in both directions into a sparse
+                    word x word matrix (one sparse sum per offset)
+    PPMI            max(0, log P(w, c) / (P(w) P_a(c))) on the stored
+                    entries only, with context counts raised to alpha = 0.75
+    SVD             randomized truncated SVD (Halko et al.): a Gaussian
+                    sketch, a few power iterations and an exact SVD of the
+                    small projected matrix; word vectors are U * sqrt(S),
+                    L2-normalised
+    clusters        k-means (k-means++ start) on the vectors of the words
+                    seen at least MIN_COUNT times
+
+Only the sparse matrix and dense (types x (dim + oversampling)) blocks
+are ever held, so memory grows with the vocabulary and the number of
+co-occurring pairs, never with types^2. Several transliterations can be
+pooled: their vocabularies are merged and windows never cross files.
+
+    python voynich_embeddings.py voynich_ZL3b.txt voynich_RF1b.txt --clusters 20
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+from scipy.cluster.vq import kmeans2
+
+from voynich_corpus import load_corpus
+
+WINDOW = 2
+DIMENSIONS = 100
+CLUSTERS = 20
+CONTEXT_ALPHA = 0.75
+OVERSAMPLE = 30
+POWER_ITERATIONS = 4
+
+# Rarer words get vectors but are left out of the clusters and neighbour lists
+MIN_COUNT = 3
+
+# Words whose nearest neighbours are reported by main()
+PROBE_WORDS = ('daiin', 'chedy', 'qokeey', 'ol', 'shey', 'otar')
+
+
+def pooled_tokens(corpora):
+    """
+    Merge the vocabularies of several corpora.
+
+    Returns (vocab, tokens, line_ids): token IDs into the merged vocabulary
+    and a line number per token that is unique across corpora.
+    """
+    word_ids = {}
+    vocab = []
+    tokens, line_ids = [], []
+    line_base = 0
+    for corpus in corpora:
+        remap = np.empty(len(corpus.vocab), dtype=np.int64)
+        for i, w in enumerate(corpus.vocab):
+            wid = word_ids.get(w)
+            if wid is None:
+                wid = word_ids[w] = len(vocab)
+                vocab.append(w)
+            remap[i] = wid
+        tokens.append(remap[np.asarray(corpus.tokens, dtype=np.int64)])
+        lengths = np.diff(np.asarray(corpus.line_offsets))
+        line_ids.append(np.repeat(np.arange(len(lengths)) + line_base, lengths))
+        line_base += len(lengths)
+    if not tokens:
+        return vocab, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return vocab, np.concatenate(tokens), np.concatenate(line_ids)
+
+
+def cooccurrence_matrix(tokens, line_ids, num_types, window=WINDOW):
+    """Symmetric CSR counts of word pairs at most `window` apart on one line"""
+    C = sparse.csr_matrix((num_types, num_types), dtype=np.float64)
+    for d in range(1, window + 1):
+        same_line = line_ids[d:] == line_ids[:-d]
+        left, right = tokens[:-d][same_line], tokens[d:][same_line]
+        ones = np.ones(len(left), dtype=np.float64)
+        pairs = sparse.csr_matrix((ones, (left, right)), shape=(num_types, num_types))
+        C = C + pairs + pairs.T
+    C.sum_duplicates()
+    return C
+
+
+def ppmi(C, alpha=CONTEXT_ALPHA):
+    """Positive PMI of a count matrix, computed on its stored entries only"""
+    C = C.tocoo()
+    rows = np.asarray(C.sum(axis=1)).ravel()
+    cols = np.asarray(C.sum(axis=0)).ravel() ** alpha
+    if not C.nnz:
+        return sparse.csr_matrix(C.shape)
+    # log P(w, c) - log P(w) - log P_a(c); the grand total cancels
+    pmi = np.log(C.data) - np.log(rows[C.row]) - np.log(cols[C.col] / cols.sum())
+    keep = pmi > 0
+    return sparse.csr_matrix((pmi[keep], (C.row[keep], C.col[keep])), shape=C.shape)
+
+
+def randomized_svd(M, k, oversample=OVERSAMPLE, power_iterations=POWER_ITERATIONS, seed=0):
+    """
+    Rank-k truncated SVD of a sparse matrix from a Gaussian sketch.
+
+    Only M @ dense and M.T @ dense products are used, so M stays sparse.
+    Returns (U, S, Vt) with S descending.
+    """
+    n_rows, n_cols = M.shape
+    k = min(k, n_rows, n_cols)
+    width = min(k + oversample, n_rows, n_cols)
+    rng = np.random.default_rng(seed)
+    Q, _ = np.linalg.qr(M @ rng.standard_normal((n_cols, width)))
+    for _ in range(power_iterations):
+        Z, _ = np.linalg.qr(M.T @ Q)
+        Q, _ = np.linalg.qr(M @ Z)
+    B = (M.T @ Q).T
+    U_small, S, Vt = np.linalg.svd(B, full_matrices=False)
+    return (Q @ U_small)[:, :k], S[:k], Vt[:k]
+
+
+def word_vectors(M, dimensions=DIMENSIONS, seed=0):
+    """L2-normalised U * sqrt(S) rows of the truncated SVD (zero rows stay zero)"""
+    U, S, _ = randomized_svd(M, dimensions, seed=seed)
+    vectors = U * np.sqrt(S)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0), S
+
+
+def cluster_words(vectors, freq, clusters=CLUSTERS, min_count=MIN_COUNT, seed=0):
+    """k-means label of every word, -1 for words rarer than min_count"""
+    labels = np.full(len(vectors), -1, dtype=np.int64)
+    frequent = np.flatnonzero(freq >= min_count)
+    clusters = min(clusters, len(frequent))
+    if clusters:
+        _, labels[frequent] = kmeans2(vectors[frequent], clusters, minit='++', seed=seed)
+    return labels
+
+
+def nearest(vectors, word_ids, word, top=10, candidates=None):
+    """Most cosine-similar words to `word` as (index, similarity), optionally among a boolean mask"""
+    i = word_ids.get(word)
+    if i is None:
+        return []
+    sims = vectors @ vectors[i]
+    sims[i] = -np.inf
+    if candidates is not None:
+        sims[~candidates] = -np.inf
+    order = np.argsort(-sims)[:top]
+    return [(int(j), float(sims[j])) for j in order]
+
+
+def cluster_report(labels, vocab, freq, top=12):
+    """Size, token mass, most frequent members and dominant 2-letter suffix per cluster"""
+    report = []
+    for c in range(int(labels.max()) + 1 if len(labels) else 0):
+        members = np.flatnonzero(labels == c)
+        if not len(members):
+            continue
+        members = members[np.argsort(-freq[members], kind='stable')]
+        suffixes = Counter()
+        for i in members.tolist():
+            suffixes[vocab[i][-2:]] += int(freq[i])
+        mass = int(freq[members].sum())
+        suffix, count = suffixes.most_common(1)[0]
+        report.append({
+            'cluster': c,
+            'types': int(len(members)),
+            'tokens': mass,
+            'top_words': [vocab[i] for i in members[:top].tolist()],
+            'dominant_suffix': suffix,
+            'suffix_share': round(count / mass, 3) if mass else 0.0,
+        })
+    return sorted(report, key=lambda r: -r['tokens'])
+
+
+def word_classes(corpora, window=WINDOW, dimensions=DIMENSIONS, clusters=CLUSTERS,
+                 min_count=MIN_COUNT, seed=0):
+    """
+    Full pipeline over one or more corpora.
+
+    Returns (report, vocab, freq, vectors, labels).
+    """
+    timings = {}
+    started = time.perf_counter()
+    vocab, tokens, line_ids = pooled_tokens(corpora)
+    freq = np.bincount(tokens, minlength=len(vocab))
+    C = cooccurrence_matrix(tokens, line_ids, len(vocab), window)
+    timings['cooccurrence'] = time.perf_counter() - started
+
+    step = time.perf_counter()
+    M = ppmi(C)
+    timings['ppmi'] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    vectors, S = word_vectors(M, dimensions, seed)
+    timings['svd'] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    labels = cluster_words(vectors, freq, clusters, min_count, seed)
+    timings['clusters'] = time.perf_counter() - step
+
+    report = {
+        'tokens': int(len(tokens)),
+        'types': len(vocab),
+        'window': window,
+        'min_count': min_count,
+        'clustered_types': int((labels >= 0).sum()),
+        'cooccurrence_nnz': int(C.nnz),
+        'ppmi_nnz': int(M.nnz),
+        'dimensions': int(vectors.shape[1]),
+        'singular_values': [round(float(s), 4) for s in S],
+        'clusters': cluster_report(labels, vocab, freq),
+        'seconds': {k: round(v, 3) for k, v in timings.items()},
+    }
+    return report, vocab, freq, vectors, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributional word classes from PPMI + truncated SVD")
+    parser.add_argument('paths', nargs='*', default=[str(Path(__file__).with_name('voynich_ZL3b.txt'))])
+    parser.add_argument('--window', type=int, default=WINDOW)
+    parser.add_argument('--dimensions', type=int, default=DIMENSIONS)
+    parser.add_argument('--clusters', type=int, default=CLUSTERS)
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH DISTRIBUTIONAL WORD CLASSES")
+    print("=" * 60)
+
+    print(f"\n[1] Loading {len(args.paths)} transliteration(s)...")
+    corpora = [load_corpus(path) for path in args.paths]
+    report, vocab, freq, vectors, labels = word_classes(corpora, args.window, args.dimensions,
+                                                        args.clusters, args.min_count, args.seed)
+    report['sources'] = [str(p) for p in args.paths]
+    print(f"    {report['tokens']:,} tokens, {report['types']:,} types")
+    print(f"    Co-occurrence entries: {report['cooccurrence_nnz']:,}  PPMI entries: {report['ppmi_nnz']:,}")
+    print(f"    Time: " + "  ".join(f"{k} {v:.2f}s" for k, v in report['seconds'].items()))
+
+    print(f"\n[2] {len(report['clusters'])} word classes over {report['clustered_types']:,} types "
+          f"seen {args.min_count}+ times...")
+    for c in report['clusters']:
+        print(f"    #{c['cluster']:<3} {c['types']:>5} types {c['tokens']:>6,} tokens  "
+              f"-{c['dominant_suffix']} {c['suffix_share']:.0%}  {c['top_words'][:8]}")
+
+    print("\n[3] Nearest neighbours...")
+    word_ids = {w: i for i, w in enumerate(vocab)}
+    report['neighbours'] = {}
+    for word in PROBE_WORDS:
+        hits = nearest(vectors, word_ids, word, candidates=freq >= args.min_count)
+        if hits:
+            report['neighbours'][word] = [[vocab[j], round(s, 4)] for j, s in hits]
+            print(f"    {word:<8} {[vocab[j] for j, _ in hits[:8]]}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n[✓] Results saved to: {args.output}")
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Voynich Sliding-Window Entropy Profiler
+Letter, word and conditional entropy along the text
+
+The window slides over the token stream (or over whole lines) and the letter,
+word, bigram and trigram counts are updated incrementally: only tokens that
+enter or leave the window are touched. Each count keeps a running
+S = sum(c * log2 c), so the entropy of a window is log2(N) - S/N and a full
+profile costs O(N) instead of O(N * W).
+
+h2 and h3 are the conditional entropies H(X_n | X_1..X_n-1) estimated as
+H(n-grams) - H((n-1)-grams), with n-grams taken inside words only (the same
+boundary rule as ngram_analysis).
+"""
+
+import argparse
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+from voynich_corpus import load_corpus
+
+
+class _RunningEntropy:
+    """Counts plus running sum of c*log2(c) for O(1) entropy updates"""
+
+    def __init__(self, size, xlogx):
+        self.counts = [0] * size
+        self.total = 0
+        self.s = 0.0
+        self.xlogx = xlogx
+
+    def add(self, keys):
+        counts = self.counts
+        xlogx = self.xlogx
+        s = self.s
+        for k in keys:
+            c = counts[k]
+            s += xlogx[c + 1] - xlogx[c]
+            counts[k] = c + 1
+        self.s = s
+        self.total += len(keys)
+
+    def remove(self, keys):
+        counts = self.counts
+        xlogx = self.xlogx
+        s = self.s
+        for k in keys:
+            c = counts[k]
+            s += xlogx[c - 1] - xlogx[c]
+            counts[k] = c - 1
+        self.s = s
+        self.total -= len(keys)
+
+    def entropy(self):
+        n = self.total
+        if n <= 0:
+            return 0.0
+        return max(0.0, math.log2(n) - self.s / n)
+
+
+def _type_features(vocab):
+    """Per word type: letter, bigram and trigram IDs (within the word)"""
+    letter_ids = {}
+    bigram_ids = {}
+    trigram_ids = {}
+    letters, bigrams, trigrams = [], [], []
+
+    for word in vocab:
+        letters.append([letter_ids.setdefault(c, len(letter_ids)) for c in word])
+        bigrams.append([bigram_ids.setdefault(word[i:i + 2], len(bigram_ids))
+                        for i in range(len(word) - 1)])
+        trigrams.append([trigram_ids.setdefault(word[i:i + 3], len(trigram_ids))
+                         for i in range(len(word) - 2)])
+
+    return (letters, len(letter_ids)), (bigrams, len(bigram_ids)), (trigrams, len(trigram_ids))
+
+
+def _window_starts(length, window, stride):
+    """Starts 0, stride, 2*stride, ... plus length - window when the stride skips it"""
+    last = max(length - window, 0)
+    starts = np.arange(0, last + 1, stride)
+    if starts[-1] != last:
+        starts = np.append(starts, last)
+    return starts
+
+
+def window_bounds(num_tokens, window, stride, line_offsets=None):
+    """
+    Token ranges (start, end) of every window.
+
+    With line_offsets the window and stride are counted in lines, otherwise
+    in tokens. If the stride does not land on the last full window, one more
+    window ending at the end of the text is added so the tail is covered; a
+    text shorter than one window gives a single, shorter window.
+    """
+    if window <= 0 or stride <= 0:
+        raise ValueError("window and stride must be positive")
+
+    if line_offsets is None:
+        starts = _window_starts(num_tokens, window, stride)
+        ends = np.minimum(starts + window, num_tokens)
+    else:
+        offsets = np.asarray(line_offsets)
+        num_lines = len(offsets) - 1
+        first = _window_starts(num_lines, window, stride)
+        starts = offsets[first]
+        ends = offsets[np.minimum(first + window, num_lines)]
+    return starts.astype(np.int64), ends.astype(np.int64)
+
+
+def entropy_profile(corpus, window=1000, stride=1, unit='tokens'):
+    """
+    Sliding-window entropy over a Corpus.
+
+    unit is 'tokens' or 'lines'. Returns a dict of equal-length arrays:
+    start/end token offsets, the page of each window's first token, and
+    letter_entropy, word_entropy, h2, h3 in bits.
+    """
+    if unit not in ('tokens', 'lines'):
+        raise ValueError(f"unit must be 'tokens' or 'lines', not {unit!r}")
+
+    tokens = np.asarray(corpus.tokens).tolist()
+    starts, ends = window_bounds(len(tokens), window, stride,
+                                 corpus.line_offsets if unit == 'lines' else None)
+
+    (letters, n_letters), (bigrams, n_bigrams), (trigrams, n_trigrams) = \
+        _type_features(corpus.vocab)
+
+    # c*log2(c) for every count a window can reach
+    longest = max((len(w) for w in corpus.vocab), default=0)
+    span = int((ends - starts).max()) if len(starts) else 0
+    c = np.arange(span * max(longest, 1) + 2, dtype=np.float64)
+    xlogx = (c * np.log2(np.maximum(c, 1))).tolist()
+
+    word_h = _RunningEntropy(len(corpus.vocab), xlogx)
+    letter_h = _RunningEntropy(n_letters, xlogx)
+    bigram_h = _RunningEntropy(n_bigrams, xlogx)
+    trigram_h = _RunningEntropy(n_trigrams, xlogx)
+
+    def add(t):
+        word_h.add((t,))
+        letter_h.add(letters[t])
+        bigram_h.add(bigrams[t])
+        trigram_h.add(trigrams[t])
+
+    def remove(t):
+        word_h.remove((t,))
+        letter_h.remove(letters[t])
+        bigram_h.remove(bigrams[t])
+        trigram_h.remove(trigrams[t])
+
+    rows = len(starts)
+    letter_e = np.empty(rows)
+    word_e = np.empty(rows)
+    h2 = np.empty(rows)
+    h3 = np.empty(rows)
+
+    lo = hi = 0
+    for r, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        # Windows only move forward; drop everything when they stop overlapping
+        if start >= hi:
+            for t in tokens[lo:hi]:
+                remove(t)
+            lo = hi = start
+        while hi < end:
+            add(tokens[hi])
+            hi += 1
+        while lo < start:
+            remove(tokens[lo])
+            lo += 1
+
+        h1 = letter_h.entropy()
+        h_bi = bigram_h.entropy()
+        letter_e[r] = h1
+        word_e[r] = word_h.entropy()
+        h2[r] = h_bi - h1
+        h3[r] = trigram_h.entropy() - h_bi
+
+    pages = [corpus.pages[p] if p >= 0 else None
+             for p in _window_pages(corpus, starts).tolist()]
+
+    return {
+        'start': starts,
+        'end': ends,
+        'page': pages,
+        'letter_entropy': letter_e,
+        'word_entropy': word_e,
+        'h2': h2,
+        'h3': h3,
+    }
+
+
+def _window_pages(corpus, starts):
+    """Page index of the line holding each window's first token"""
+    line_page = np.asarray(corpus.line_page)
+    if not len(line_page):
+        return np.full(len(starts), -1)
+    first_line = np.searchsorted(np.asarray(corpus.line_offsets), starts, side='right') - 1
+    return line_page[np.clip(first_line, 0, len(line_page) - 1)]
+
+
+def summarize_profile(profile):
+    """Min/mean/max of every entropy series"""
+    summary = {}
+    for key in ('letter_entropy', 'word_entropy', 'h2', 'h3'):
+        values = profile[key]
+        if len(values):
+            summary[key] = {
+                'min': round(float(values.min()), 3),
+                'mean': round(float(values.mean()), 3),
+                'max': round(float(values.max()), 3),
+            }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sliding-window entropy profile of an IVTFF file")
+    parser.add_argument('filepath', nargs='?', default=str(Path(__file__).with_name('voynich_ZL3b.txt')))
+    parser.add_argument('--window', type=int, default=1000)
+    parser.add_argument('--stride', type=int, default=1)
+    parser.add_argument('--unit', choices=['tokens', 'lines'], default='tokens')
+    parser.add_argument('--output', help="write the profile as JSON")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH SLIDING-WINDOW ENTROPY PROFILE")
+    print("=" * 60)
+
+    corpus = load_corpus(args.filepath)
+    profile = entropy_profile(corpus, args.window, args.stride, args.unit)
+    print(f"\n    Windows: {len(profile['start']):,} "
+          f"(window {args.window} {args.unit}, stride {args.stride})")
+    for key, stats in summarize_profile(profile).items():
+        print(f"    {key}: min {stats['min']:.3f}  mean {stats['mean']:.3f}  max {stats['max']:.3f}")
+
+    if args.output:
+        rows = {k: (v.tolist() if isinstance(v, np.ndarray) else v) for k, v in profile.items()}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False)
+        print(f"\n[✓] Profile saved to: {args.output}")
+
+    return profile
+
+
+if __name__ == "__main__":
+    main()
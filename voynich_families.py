@@ -0,0 +1,261 @@
+"""
+Voynich Orthographic Word Families
+Edit-distance neighbours of every word type from a deletion index
+
+Comparing all ~8,400 word types pairwise is ~35 million edit-distance
+computations. A SymSpell-style index avoids that: every type is stored
+under each string obtained by deleting up to D of its characters. Two
+words within Levenshtein distance D always share such a deletion variant
+(each side deletes its own substituted and extra characters), so a query
+only has to look up its own deletion variants and verify the few
+candidates found there.
+
+Candidates are verified in bulk with the bit-parallel edit distance of
+voynich_diff: the graph collects every pair of types sharing a deletion
+bucket (~1 million candidate pairs for D = 2) and scores them in a few
+vectorised batches, a couple of seconds instead of minutes of per-pair
+dynamic programming. Vocabulary words are then answered from their row of
+the graph; other strings go through the index.
+
+    query(word)     all types within distance 1..D, in microseconds
+    graph()         the whole neighbour graph as a sparse matrix of distances
+    families()      frequency-greedy partition: the most frequent unassigned
+                    word claims its unassigned neighbours, e.g. daiin ->
+                    dain, daiiin, odaiin, ...
+
+    python voynich_families.py --file voynich_ZL3b.txt --query daiin,chedy
+"""
+
+import argparse
+import json
+import time
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from voynich_corpus import load_corpus
+from voynich_diff import myers_distance, pad_sequences
+
+MAX_DISTANCE = 2
+
+# Word pairs per bit-parallel verification batch (bounds the match-mask tables)
+VERIFY_BATCH = 200_000
+
+
+def deletion_variants(word, max_deletions):
+    """The word and every string made by deleting up to max_deletions characters"""
+    variants = {word}
+    for k in range(1, min(max_deletions, len(word)) + 1):
+        for positions in combinations(range(len(word)), k):
+            skip = set(positions)
+            variants.add(''.join(ch for i, ch in enumerate(word) if i not in skip))
+    return variants
+
+
+def _pairs_within(groups):
+    """All (i, j) pairs, i < j, of IDs sharing a group; groups is a list of ID lists"""
+    by_size = {}
+    for ids in groups:
+        if len(ids) > 1:
+            by_size.setdefault(len(ids), []).append(ids)
+    left, right = [], []
+    for size, members in by_size.items():
+        members = np.sort(np.array(members, dtype=np.int64), axis=1)
+        a, b = np.triu_indices(size, 1)
+        left.append(members[:, a].ravel())
+        right.append(members[:, b].ravel())
+    if not left:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(left), np.concatenate(right)
+
+
+class NeighborIndex:
+    """
+    Deletion index over a vocabulary.
+
+    words[i] is the type with ID i; deletions maps each deletion variant
+    to the IDs of the types that produce it. Candidates are verified in
+    batches with the bit-parallel edit distance of voynich_diff.
+    """
+
+    def __init__(self, words, max_distance=MAX_DISTANCE):
+        self.words = list(words)
+        self.word_ids = {w: i for i, w in enumerate(self.words)}
+        self.max_distance = max_distance
+        self.deletions = {}
+        for i, word in enumerate(self.words):
+            for variant in deletion_variants(word, max_distance):
+                self.deletions.setdefault(variant, []).append(i)
+        self.codes = [[ord(ch) for ch in w] for w in self.words]
+        self._graph = None
+
+    def _distances(self, left, right):
+        """Edit distances of word pairs (left[k], right[k]), VERIFY_BATCH pairs at a time"""
+        out = np.zeros(len(left), dtype=np.int64)
+        for start in range(0, len(left), VERIFY_BATCH):
+            a = left[start:start + VERIFY_BATCH].tolist()
+            b = right[start:start + VERIFY_BATCH].tolist()
+            patterns, pattern_len = pad_sequences([self.codes[i] for i in a])
+            texts, text_len = pad_sequences([self.codes[j] for j in b])
+            out[start:start + len(a)] = myers_distance(patterns, pattern_len, texts, text_len)
+        return out
+
+    def graph(self):
+        """
+        Symmetric CSR matrix of distances 1..max_distance between type IDs.
+
+        Built once from the candidate pairs of every deletion bucket.
+        """
+        if self._graph is None:
+            left, right = _pairs_within(list(self.deletions.values()))
+            n = len(self.words)
+            pairs = np.unique(left * n + right)
+            left, right = pairs // n, pairs % n
+            d = self._distances(left, right)
+            keep = d <= self.max_distance
+            upper = sparse.csr_matrix((d[keep].astype(np.int8), (left[keep], right[keep])),
+                                      shape=(n, n))
+            self._graph = (upper + upper.T).tocsr()
+        return self._graph
+
+    def query(self, word, max_distance=None):
+        """
+        [(type ID, distance)] of the types within max_distance of word, nearest first.
+
+        Vocabulary words read their row of the neighbour graph; other
+        strings look up their own deletion variants and verify the candidates.
+        """
+        max_distance = self.max_distance if max_distance is None else max_distance
+        if max_distance > self.max_distance:
+            raise ValueError(f"Index was built for distance {self.max_distance}, not {max_distance}")
+        i = self.word_ids.get(word)
+        if i is not None:
+            G = self.graph()
+            ids = G.indices[G.indptr[i]:G.indptr[i + 1]]
+            dists = G.data[G.indptr[i]:G.indptr[i + 1]].astype(np.int64)
+        else:
+            candidates = set()
+            for variant in deletion_variants(word, max_distance):
+                candidates.update(self.deletions.get(variant, ()))
+            ids = np.array(sorted(candidates), dtype=np.int64)
+            if not len(ids):
+                return []
+            patterns, pattern_len = pad_sequences([[ord(ch) for ch in word]] * len(ids))
+            texts, text_len = pad_sequences([self.codes[j] for j in ids.tolist()])
+            dists = myers_distance(patterns, pattern_len, texts, text_len)
+        keep = dists <= max_distance
+        order = np.lexsort((ids[keep], dists[keep]))
+        return list(zip(ids[keep][order].tolist(), dists[keep][order].tolist()))
+
+    def families(self, freq, max_distance=1, min_size=2):
+        """
+        Frequency-greedy word families.
+
+        Words are visited from most to least frequent (freq[i] is the count
+        of type i); each unassigned word heads a family of its unassigned
+        neighbours within max_distance. Returns [(head, [members])] for the
+        families with at least min_size words, largest token mass first.
+        """
+        order = sorted(range(len(self.words)), key=lambda i: (-freq[i], i))
+        assigned = np.zeros(len(self.words), dtype=bool)
+        families = []
+        for head in order:
+            if assigned[head]:
+                continue
+            assigned[head] = True
+            members = [j for j, _ in self.query(self.words[head], max_distance) if not assigned[j]]
+            assigned[members] = True
+            if len(members) + 1 >= min_size:
+                members.sort(key=lambda j: (-freq[j], j))
+                families.append((head, members))
+        families.sort(key=lambda f: -(freq[f[0]] + sum(freq[j] for j in f[1])))
+        return families
+
+
+def family_report(index, word_freq, max_distance=1, top=20):
+    """Orthographic families of a word-frequency Counter as JSON-ready dicts"""
+    freq = [word_freq[w] for w in index.words]
+    families = index.families(freq, max_distance)
+    return {
+        'max_distance': max_distance,
+        'families': len(families),
+        'words_in_families': sum(1 + len(m) for _, m in families),
+        'top': [{'head': index.words[head],
+                 'tokens': freq[head] + sum(freq[j] for j in members),
+                 'members': [index.words[j] for j in members]}
+                for head, members in families[:top]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Edit-distance neighbours and word families")
+    parser.add_argument('--file', default=str(Path(__file__).with_name('voynich_ZL3b.txt')))
+    parser.add_argument('--max-distance', type=int, default=MAX_DISTANCE)
+    parser.add_argument('--family-distance', type=int, default=1)
+    parser.add_argument('--query', default='daiin,chedy,qokeey,ol',
+                        help="comma-separated words to look up")
+    parser.add_argument('--graph', default=None, help="write the neighbour graph as a .npz matrix")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH ORTHOGRAPHIC WORD FAMILIES")
+    print("=" * 60)
+
+    word_freq = load_corpus(args.file).type_counts()
+
+    print(f"\n[1] Deletion index (distance {args.max_distance})...")
+    started = time.perf_counter()
+    index = NeighborIndex(word_freq, args.max_distance)
+    print(f"    {len(index.words):,} types, {len(index.deletions):,} deletion variants "
+          f"({time.perf_counter() - started:.2f}s)")
+
+    print("\n[2] Neighbour graph...")
+    started = time.perf_counter()
+    G = index.graph()
+    elapsed = time.perf_counter() - started
+    degree = np.diff(G.indptr)
+    results = {'types': len(index.words), 'max_distance': args.max_distance}
+    results['graph'] = {
+        'edges': int(G.nnz // 2),
+        'edges_by_distance': {d: int((G.data == d).sum() // 2) for d in range(1, args.max_distance + 1)},
+        'isolated_types': int((degree == 0).sum()),
+        'mean_degree': round(float(degree.mean()), 3) if len(degree) else 0.0,
+        'seconds': round(elapsed, 3),
+    }
+    print(f"    {results['graph']['edges']:,} edges {results['graph']['edges_by_distance']}, "
+          f"{results['graph']['isolated_types']:,} isolated types "
+          f"({elapsed:.2f}s, {elapsed / max(len(index.words), 1) * 1e6:.0f} µs per type)")
+    if args.graph:
+        sparse.save_npz(args.graph, G)
+        print(f"    Graph saved to: {args.graph}")
+
+    print("\n[3] Queries...")
+    results['queries'] = {}
+    for word in [w.strip() for w in args.query.split(',') if w.strip()]:
+        started = time.perf_counter()
+        hits = index.query(word)
+        elapsed = time.perf_counter() - started
+        results['queries'][word] = [[index.words[i], d] for i, d in hits]
+        print(f"    {word:<10} {len(hits):>4} neighbours in {elapsed * 1e6:,.0f} µs: "
+              f"{[index.words[i] for i, _ in hits[:10]]}")
+
+    print(f"\n[4] Families (distance {args.family_distance})...")
+    results['families'] = family_report(index, word_freq, args.family_distance)
+    print(f"    {results['families']['families']:,} families covering "
+          f"{results['families']['words_in_families']:,} types")
+    for family in results['families']['top'][:10]:
+        print(f"    {family['head']:<10} {family['tokens']:>6,} tokens  {family['members'][:8]}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n[✓] Results saved to: {args.output}")
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Voynich Gallow Contingency Analysis
+Gallow glyphs cross-tabulated against what follows them
+
+Quevedo's "mode selector" reading predicts that the gallow glyphs (p, f, t,
+k and their benched forms cph, cfh, cth, ckh) select different
+vocabularies. Every gallow occurrence is taken in one of three positions
+
+    line_initial   the first glyph(s) of a line's first word
+    word_initial   the first glyph(s) of any word
+    anywhere       every gallow inside every word
+
+and counted against what comes after it:
+
+    root           the ROOT_LENGTH glyphs following the gallow in its word
+    next_word      the next word in the line ('#' at the line end)
+    line_word      every later word of the line (line_initial only)
+
+Each table is a sparse gallow x target count matrix. Chi-square and mutual
+information only need the non-zero cells (chi2 = sum O^2/E - N), and the
+permutation test shuffles the gallow labels of all events for a whole batch
+of replicas at once; the margins are fixed under that shuffle, so each
+replica's statistics are one bincount and two reductions.
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse, stats
+
+from voynich_corpus import load_corpus
+
+GALLOWS = ('p', 'f', 't', 'k', 'cph', 'cfh', 'cth', 'ckh')
+GALLOW_RE = re.compile(r'c[ptkf]h|[ptkf]')
+
+POSITIONS = ('line_initial', 'word_initial', 'anywhere')
+TARGETS = {
+    'line_initial': ('root', 'next_word', 'line_word'),
+    'word_initial': ('root', 'next_word'),
+    'anywhere': ('root', 'next_word'),
+}
+
+# Glyphs after a gallow that make up its root
+ROOT_LENGTH = 3
+
+# Marks an empty root (gallow at the word end) or the end of a line
+END = '#'
+
+# Permutations evaluated together in one vectorized batch
+BATCH_SIZE = 50
+
+
+def _type_gallows(vocab):
+    """
+    Gallow occurrences of every word type.
+
+    Returns (initial_row, initial_root, occurrences, root_labels):
+    initial_row / initial_root give, per type, the gallow it starts with and
+    the root after it (-1 if none); occurrences is a (type, gallow, root)
+    array of every gallow in every type, sorted by type.
+    """
+    root_ids = {}
+    root_labels = []
+
+    def root_id(root):
+        root = root or END
+        if root not in root_ids:
+            root_ids[root] = len(root_labels)
+            root_labels.append(root)
+        return root_ids[root]
+
+    gallow_ids = {g: i for i, g in enumerate(GALLOWS)}
+    initial_row = np.full(len(vocab), -1, dtype=np.int64)
+    initial_root = np.full(len(vocab), -1, dtype=np.int64)
+    occurrences = []
+    for t, word in enumerate(vocab):
+        for match in GALLOW_RE.finditer(word):
+            row = gallow_ids[match.group()]
+            root = root_id(word[match.end():match.end() + ROOT_LENGTH])
+            occurrences.append((t, row, root))
+            if match.start() == 0:
+                initial_row[t] = row
+                initial_root[t] = root
+    occurrences = np.array(occurrences, dtype=np.int64).reshape(-1, 3)
+    return initial_row, initial_root, occurrences, root_labels
+
+
+def gallow_events(corpus):
+    """
+    (gallow, target) event arrays for every position and target.
+
+    Returns ({position: {target: (rows, cols)}}, {target: column labels}).
+    """
+    vocab = corpus.vocab
+    tokens = np.asarray(corpus.tokens, dtype=np.int64)
+    offsets = np.asarray(corpus.line_offsets, dtype=np.int64)
+    lengths = np.diff(offsets)
+    initial_row, initial_root, occurrences, root_labels = _type_gallows(vocab)
+
+    # Next word in the same line, END after the last word of a line
+    end_id = len(vocab)
+    next_word = np.append(tokens[1:], end_id)
+    next_word[offsets[1:][lengths > 0] - 1] = end_id
+
+    events = {}
+
+    # Word-initial gallows
+    idx = np.flatnonzero(initial_row[tokens] >= 0)
+    events['word_initial'] = {
+        'root': (initial_row[tokens[idx]], initial_root[tokens[idx]]),
+        'next_word': (initial_row[tokens[idx]], next_word[idx]),
+    }
+
+    # Line-initial gallows: first words of lines, then the rest of each line
+    firsts = offsets[:-1][lengths > 0]
+    firsts = firsts[initial_row[tokens[firsts]] >= 0]
+    rows = initial_row[tokens[firsts]]
+    rest = lengths[np.searchsorted(offsets[:-1], firsts, side='right') - 1] - 1
+    rest_pos = np.repeat(firsts + 1 - np.concatenate(([0], np.cumsum(rest)[:-1])), rest) \
+        + np.arange(int(rest.sum()))
+    events['line_initial'] = {
+        'root': (rows, initial_root[tokens[firsts]]),
+        'next_word': (rows, next_word[firsts]),
+        'line_word': (np.repeat(rows, rest), tokens[rest_pos]),
+    }
+
+    # Every gallow in every word: expand each token into its type's occurrences
+    occ_count = np.bincount(occurrences[:, 0], minlength=len(vocab))
+    occ_start = np.concatenate(([0], np.cumsum(occ_count)[:-1]))
+    reps = occ_count[tokens]
+    token_idx = np.repeat(np.arange(len(tokens)), reps)
+    within = np.arange(int(reps.sum())) - np.repeat(np.cumsum(reps) - reps, reps)
+    occ = occ_start[tokens[token_idx]] + within
+    events['anywhere'] = {
+        'root': (occurrences[occ, 1], occurrences[occ, 2]),
+        'next_word': (occurrences[occ, 1], next_word[token_idx]),
+    }
+
+    labels = {
+        'root': root_labels,
+        'next_word': list(vocab) + [END],
+        'line_word': list(vocab) + [END],
+    }
+    return events, labels
+
+
+def _statistics(counts, expected, n):
+    """chi-square and mutual information (bits) of count rows against fixed expectations"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi2 = (counts * counts / expected).sum(axis=-1) - n
+        mi = np.where(counts > 0, counts * np.log2(counts / expected), 0.0).sum(axis=-1) / n
+    return chi2, mi
+
+
+def contingency_table(rows, cols, row_labels, col_labels, permutations=1000, seed=0, top=10):
+    """
+    Chi-square, mutual information and standardized residuals of one table.
+
+    rows / cols are per-event indices into row_labels / col_labels. The
+    permutation p-values shuffle the row label of every event (seed is an
+    int or a SeedSequence); residuals are
+    adjusted standardized residuals (O - E) / sqrt(E (1 - r/N) (1 - c/N)),
+    with the `top` most over- and under-represented targets of each row.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    n = len(rows)
+    if n == 0:
+        return {'events': 0}
+
+    # Compact to the rows and columns that occur
+    row_keep = np.flatnonzero(np.bincount(rows, minlength=len(row_labels)))
+    col_keep = np.flatnonzero(np.bincount(cols, minlength=len(col_labels)))
+    row_map = np.full(len(row_labels), -1, dtype=np.int64)
+    row_map[row_keep] = np.arange(len(row_keep))
+    col_map = np.full(len(col_labels), -1, dtype=np.int64)
+    col_map[col_keep] = np.arange(len(col_keep))
+    rows, cols = row_map[rows], col_map[cols]
+    n_rows, n_cols = len(row_keep), len(col_keep)
+
+    observed = sparse.csr_matrix((np.ones(n), (rows, cols)), shape=(n_rows, n_cols))
+    observed.sum_duplicates()
+    row_sums = np.asarray(observed.sum(axis=1)).ravel()
+    col_sums = np.asarray(observed.sum(axis=0)).ravel()
+
+    cells = observed.tocoo()
+    cell_expected = row_sums[cells.row] * col_sums[cells.col] / n
+    chi2, mi = _statistics(cells.data, cell_expected, n)
+    dof = (n_rows - 1) * (n_cols - 1)
+    result = {
+        'events': n,
+        'rows': {row_labels[r]: int(c) for r, c in zip(row_keep.tolist(), row_sums.tolist())},
+        'columns': n_cols,
+        'chi2': round(float(chi2), 3),
+        'dof': dof,
+        'p_asymptotic': float(stats.chi2.sf(chi2, dof)) if dof > 0 else None,
+        'cramers_v': round(float(np.sqrt(chi2 / (n * (min(n_rows, n_cols) - 1)))), 4)
+                     if min(n_rows, n_cols) > 1 else None,
+        'mutual_information': round(float(mi), 5),
+    }
+
+    # Bulk permutation test: margins are fixed, only the cell counts move
+    if permutations and dof > 0:
+        expected = np.outer(row_sums, col_sums).ravel() / n
+        null_chi2, null_mi = [], []
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        seeds = seed.spawn((permutations + BATCH_SIZE - 1) // BATCH_SIZE)
+        for start, batch_seed in zip(range(0, permutations, BATCH_SIZE), seeds):
+            replicas = min(BATCH_SIZE, permutations - start)
+            rng = np.random.default_rng(batch_seed)
+            shuffled = rng.permuted(np.tile(rows, (replicas, 1)), axis=1)
+            keys = (np.arange(replicas)[:, None] * n_rows + shuffled) * n_cols + cols
+            counts = np.bincount(keys.ravel(), minlength=replicas * n_rows * n_cols)
+            batch_chi2, batch_mi = _statistics(counts.reshape(replicas, -1), expected, n)
+            null_chi2.append(batch_chi2)
+            null_mi.append(batch_mi)
+        null_chi2 = np.concatenate(null_chi2)
+        null_mi = np.concatenate(null_mi)
+        tolerance = 1e-9 * max(1.0, abs(float(chi2)))
+        result['permutations'] = permutations
+        result['p_chi2'] = (1 + int((null_chi2 >= chi2 - tolerance).sum())) / (permutations + 1)
+        result['p_mutual_information'] = (1 + int((null_mi >= mi - 1e-12).sum())) / (permutations + 1)
+
+    # Adjusted standardized residuals, dense over the few gallow rows
+    dense = observed.toarray()
+    expected = np.outer(row_sums, col_sums) / n
+    scale = np.sqrt(expected * np.outer(1 - row_sums / n, 1 - col_sums / n))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        residuals = np.where(scale > 0, (dense - expected) / scale, 0.0)
+    def cell(r, c):
+        return {'target': col_labels[col_keep[c]], 'observed': int(dense[r, c]),
+                'expected': round(float(expected[r, c]), 2),
+                'residual': round(float(residuals[r, c]), 2)}
+
+    result['residuals'] = {}
+    for r in range(n_rows):
+        order = np.argsort(residuals[r], kind='stable')
+        result['residuals'][row_labels[row_keep[r]]] = {
+            'over': [cell(r, c) for c in order[::-1][:top].tolist() if residuals[r, c] > 0],
+            'under': [cell(r, c) for c in order[:top].tolist() if residuals[r, c] < 0],
+        }
+    return result
+
+
+def gallow_contingency(corpus, permutations=1000, seed=0, top=10, gallows=GALLOWS):
+    """
+    Contingency tables for every position and target.
+
+    Returns {position: {target: contingency_table(...)}}; gallows restricts
+    the rows, e.g. ('p', 'f') to compare only those two.
+    """
+    events, labels = gallow_events(corpus)
+    keep_rows = np.array([g in gallows for g in GALLOWS])
+    tables = [(position, target) for position in POSITIONS for target in TARGETS[position]]
+    seeds = np.random.SeedSequence(seed).spawn(len(tables))
+
+    results = {}
+    for (position, target), table_seed in zip(tables, seeds):
+        rows, cols = events[position][target]
+        sel = keep_rows[rows]
+        results.setdefault(position, {})[target] = contingency_table(
+            rows[sel], cols[sel], GALLOWS, labels[target], permutations, table_seed, top)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gallow x root / following-word contingency tables")
+    parser.add_argument('filepath', nargs='?', default=str(Path(__file__).with_name('voynich_ZL3b.txt')))
+    parser.add_argument('--permutations', type=int, default=1000)
+    parser.add_argument('--gallows', default=','.join(GALLOWS), help="rows to compare, e.g. p,f")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the tables as JSON")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH GALLOW CONTINGENCY ANALYSIS")
+    print("=" * 60)
+
+    gallows = tuple(g.strip() for g in args.gallows.split(',') if g.strip())
+    results = gallow_contingency(load_corpus(args.filepath), args.permutations, args.seed,
+                                 gallows=gallows)
+
+    for position, tables in results.items():
+        print(f"\n[{position}]")
+        for target, table in tables.items():
+            if not table['events']:
+                print(f"    {target:<10} no events")
+                continue
+            print(f"    {target:<10} N={table['events']:,}  chi2={table['chi2']:.1f} "
+                  f"(dof {table['dof']})  V={table['cramers_v']}  "
+                  f"MI={table['mutual_information']:.4f} bits  "
+                  f"p_perm={table.get('p_chi2', float('nan')):.4g}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n[✓] Results saved to: {args.output}")
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
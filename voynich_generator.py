@@ -0,0 +1,431 @@
+"""
+Voynich Synthetic Text Generator
+Markov and Quevedo-wheel null-model corpora in IVTFF format
+
+The Quevedo suite compares the manuscript with literature constants; this
+module produces text from the mechanisms themselves, laid out on the real
+pages and lines, so the same parsers and statistics run on both:
+
+    glyph   n-th order glyph Markov chain trained on the running text
+            (word breaks are a symbol, so word lengths come out of the model)
+    word    word unigram (order 0) or bigram (order 1) model
+    wheel   a rotating device: prefix ring, swappable root cartridge and
+            suffix ring; the rings advance a fixed step per word with random
+            slips, and a cartridge swap at a line start is marked by a gallow
+
+Markov models keep only observed (context, next) pairs, with an alias table
+per context, and read the training stream cyclically so every context has a
+successor. Sampling advances tens of thousands of independent chains
+together, one vectorized table lookup per step.
+The wheel is computed for all words at once from cumulative ring steps.
+
+    python voynich_generator.py glyph --order 3 --scale 10 --output synth.txt
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from voynich_corpus import encode_lines, load_corpus
+from voynich_ngrams import BOUNDARY, decode_glyphs, encode_glyphs
+from voynich_significance import consecutive_jaccard, encode_line_words
+from voynich_tokenizer import IvtffLine
+
+MODELS = ('glyph', 'word', 'wheel')
+
+# Independent chains advanced together by the Markov samplers
+CHAINS = 65536
+
+# Folio number offset between two copies of the page layout
+FOLIO_STRIDE = 1000
+FOLIO_RE = re.compile(r'^f(\d+)')
+
+# Glyph marking the cartridge in the first word after a swap
+WHEEL_GALLOWS = ('p', 'f', 't', 'k')
+
+
+def alias_tables(counts, row_first):
+    """
+    Walker/Vose alias tables for consecutive rows of a flat count array.
+
+    Returns (prob, alias): a draw from row r picks slot j uniformly among
+    the row's slots, then keeps j with probability prob[j] and takes
+    alias[j] (a flat slot index in the same row) otherwise.
+    """
+    prob = np.ones(len(counts), dtype=np.float64)
+    alias = np.arange(len(counts), dtype=np.int64)
+    bounds = np.r_[row_first, len(counts)].tolist()
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end - start == 1:
+            continue
+        row = counts[start:end]
+        scaled = (row * ((end - start) / row.sum())).tolist()
+        small = [start + i for i, x in enumerate(scaled) if x < 1.0]
+        large = [start + i for i, x in enumerate(scaled) if x >= 1.0]
+        while small and large:
+            s, l = small.pop(), large[-1]
+            prob[s] = scaled[s - start]
+            alias[s] = l
+            scaled[l - start] -= 1.0 - scaled[s - start]
+            if scaled[l - start] < 1.0:
+                small.append(large.pop())
+    return prob, alias
+
+
+class MarkovChain:
+    """
+    Order-n Markov chain over an integer symbol stream.
+
+    Contexts are the previous `order` symbols in mixed radix. Only observed
+    (context, next) pairs are kept, grouped by context into rows with alias
+    tables, and each pair stores the row it leads to, so a step costs a few
+    table lookups whatever the order or the row size.
+    """
+
+    def __init__(self, stream, alphabet_size, order=1):
+        stream = np.asarray(stream, dtype=np.int64)
+        if len(stream) <= order:
+            raise ValueError("Training stream is shorter than the model order")
+        if alphabet_size ** (order + 1) >= 2 ** 62:
+            raise ValueError(f"Order {order} is too high for {alphabet_size:,} symbols")
+        self.order = order
+        self.size = alphabet_size
+        self.modulus = alphabet_size ** order
+
+        # Context code of every position, reading the stream cyclically
+        context = np.zeros(len(stream), dtype=np.int64)
+        for lag in range(order, 0, -1):
+            context = context * alphabet_size + np.roll(stream, lag)
+
+        keys = np.sort(context * alphabet_size + stream)
+        first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        counts = np.diff(np.r_[first, len(keys)])
+        pair_keys = keys[first]
+        self.next_symbol = pair_keys % alphabet_size
+
+        pair_context = pair_keys // alphabet_size
+        row_first = np.flatnonzero(np.r_[True, pair_context[1:] != pair_context[:-1]])
+        contexts = pair_context[row_first]
+        self.row_start = row_first
+        self.row_width = np.diff(np.r_[row_first, len(pair_keys)])
+        self.prob, self.alias = alias_tables(counts, row_first)
+
+        # Chain states are row numbers; every pair knows the row it leads to
+        # (the stream is cyclic, so each successor context was observed too)
+        self.next_row = np.searchsorted(contexts, pair_keys % self.modulus)
+        self._position_row = np.searchsorted(contexts, context)
+
+    def start_states(self, count, rng, positions=None):
+        """States at `count` random training positions (optionally among `positions`)"""
+        if positions is None:
+            return self._position_row[rng.integers(0, len(self._position_row), size=count)]
+        return self._position_row[positions[rng.integers(0, len(positions), size=count)]]
+
+    def step(self, states, rng):
+        """Draw the next symbol of every chain; returns (symbols, new states)"""
+        # Integer part of u * width picks the slot, the fraction decides slot or alias
+        u = rng.random(len(states)) * self.row_width[states]
+        slot = u.astype(np.int64)
+        slot += self.row_start[states]
+        slot = np.where(u - np.floor(u) < self.prob[slot], slot, self.alias[slot])
+        return self.next_symbol[slot], self.next_row[slot]
+
+    def sample(self, length, states, rng):
+        """(chains, length) array of symbols continuing from `states`"""
+        out = np.empty((length, len(states)), dtype=np.int64)
+        for i in range(length):
+            out[i], states = self.step(states, rng)
+        return out.T
+
+
+class GlyphModel:
+    """n-th order glyph Markov model; the word break (code 0) is one of the symbols"""
+
+    def __init__(self, corpus, order=3):
+        words = [corpus.vocab[t] for t in np.asarray(corpus.tokens).tolist()]
+        codes, self.alphabet = encode_glyphs(words + [''])
+        stream = codes.astype(np.int64)
+        self.chain = MarkovChain(stream, len(self.alphabet), order)
+        self.break_symbol = 0
+        # Chains start right after a word break, so every chain begins a word
+        self.word_starts = np.flatnonzero(np.roll(stream, 1) == self.break_symbol)
+        self.mean_symbols = len(stream) / max(len(corpus.tokens), 1)
+
+    def sample(self, line_lengths, rng):
+        """Words for lines of the given lengths, as a flat list"""
+        needed = int(np.sum(line_lengths))
+        words = []
+        while len(words) < needed:
+            missing = needed - len(words)
+            chains = min(CHAINS, missing)
+            length = int(np.ceil(missing / chains * self.mean_symbols * 1.1)) + 16
+            states = self.chain.start_states(chains, rng, self.word_starts)
+            symbols = self.chain.sample(length, states, rng)
+
+            # Drop each chain's unfinished last word and close it with a break
+            is_break = symbols == self.break_symbol
+            last = length - 1 - np.argmax(is_break[:, ::-1], axis=1)
+            last[~is_break.any(axis=1)] = -1
+            symbols[np.arange(length)[None, :] > last[:, None]] = self.break_symbol
+            symbols = np.hstack([symbols, np.full((chains, 1), self.break_symbol)])
+            text = decode_glyphs(symbols.ravel(), self.alphabet)
+            words.extend(w for w in text.split(BOUNDARY) if w)
+        return words[:needed]
+
+
+class WordModel:
+    """Word unigram (order 0) or bigram (order 1) model"""
+
+    def __init__(self, corpus, order=1):
+        self.vocab = np.array(corpus.vocab, dtype=object)
+        self.chain = MarkovChain(corpus.tokens, len(corpus.vocab), order)
+
+    def sample(self, line_lengths, rng):
+        """Words for lines of the given lengths, as a flat list"""
+        needed = int(np.sum(line_lengths))
+        chains = max(1, min(CHAINS, needed))
+        length = -(-needed // chains)
+        ids = self.chain.sample(length, self.chain.start_states(chains, rng), rng)
+        return self.vocab[ids.ravel()[:needed]].tolist()
+
+
+class WheelDevice:
+    """
+    Parametrised Quevedo wheel.
+
+    Each word reads the prefix ring, the mounted root cartridge and the
+    suffix ring at their current positions. After every word each ring
+    turns `steps[i]` slots, plus one more with probability `slip`. At a
+    line start the cartridge is swapped with probability `swap`; the first
+    word after a swap shows the cartridge's gallow in place of its prefix.
+    """
+
+    def __init__(self, prefixes, cartridges, suffixes, steps=(1, 3, 7), slip=0.1, swap=0.2):
+        if not prefixes or not suffixes or not cartridges:
+            raise ValueError("A wheel needs prefixes, suffixes and at least one cartridge")
+        size = len(cartridges[0])
+        if any(len(c) != size for c in cartridges):
+            raise ValueError("Every cartridge must hold the same number of roots")
+        self.prefixes = np.array(prefixes, dtype=object)
+        self.roots = np.array([r for c in cartridges for r in c], dtype=object)
+        self.suffixes = np.array(suffixes, dtype=object)
+        self.cartridge_size = size
+        self.num_cartridges = len(cartridges)
+        self.steps = steps
+        self.slip = slip
+        self.swap = swap
+
+    @classmethod
+    def from_corpus(cls, corpus, cartridges=4, cartridge_size=25, ring_size=12,
+                    affix_len=2, **params):
+        """Rings of the most frequent word-initial / word-final glyph pairs and roots"""
+        prefixes, roots, suffixes = {}, {}, {}
+        for word, count in corpus.type_counts().items():
+            if len(word) <= 2 * affix_len:
+                continue
+            for table, part in ((prefixes, word[:affix_len]), (roots, word[affix_len:-affix_len]),
+                                (suffixes, word[-affix_len:])):
+                table[part] = table.get(part, 0) + count
+
+        def top(table, n):
+            return [k for k, _ in sorted(table.items(), key=lambda x: -x[1])[:n]]
+
+        ranked = top(roots, cartridges * cartridge_size)
+        if len(ranked) < cartridges * cartridge_size:
+            raise ValueError("Not enough distinct roots for the requested cartridges")
+        # Deal roots round-robin so every cartridge gets frequent and rare ones
+        return cls(top(prefixes, ring_size), [ranked[i::cartridges] for i in range(cartridges)],
+                   top(suffixes, ring_size), **params)
+
+    def _ring(self, size, step, count, rng):
+        turns = step + (rng.random(count) < self.slip)
+        return (rng.integers(size) + np.cumsum(turns) - turns[0]) % size
+
+    def sample(self, line_lengths, rng):
+        """Words for lines of the given lengths, as a flat list"""
+        line_lengths = np.asarray(line_lengths, dtype=np.int64)
+        count = int(line_lengths.sum())
+        prefix = self._ring(len(self.prefixes), self.steps[0], count, rng)
+        root = self._ring(self.cartridge_size, self.steps[1], count, rng)
+        suffix = self._ring(len(self.suffixes), self.steps[2], count, rng)
+
+        # Cartridge of every line: forward-fill the swaps
+        swapped = rng.random(len(line_lengths)) < self.swap
+        swapped[0] = True
+        choice = rng.integers(0, self.num_cartridges, size=len(line_lengths))
+        mounted = choice[np.maximum.accumulate(np.where(swapped, np.arange(len(line_lengths)), 0))]
+        cartridge = np.repeat(mounted, line_lengths)
+
+        words = self.prefixes[prefix] + self.roots[cartridge * self.cartridge_size + root] \
+            + self.suffixes[suffix]
+        starts = (np.cumsum(line_lengths) - line_lengths)[swapped & (line_lengths > 0)]
+        gallows = np.array(WHEEL_GALLOWS, dtype=object)[cartridge[starts] % len(WHEEL_GALLOWS)]
+        words[starts] = gallows + self.roots[cartridge[starts] * self.cartridge_size + root[starts]] \
+            + self.suffixes[suffix[starts]]
+        return words.tolist()
+
+
+def build_model(name, corpus, order=None, **params):
+    """Model `name` trained on (or, for the wheel, parametrised from) the corpus"""
+    if name == 'glyph':
+        return GlyphModel(corpus, 3 if order is None else order)
+    if name == 'word':
+        return WordModel(corpus, 1 if order is None else order)
+    if name == 'wheel':
+        return WheelDevice.from_corpus(corpus, **params)
+    raise ValueError(f"Unknown model {name!r}; expected one of {MODELS}")
+
+
+def shift_folio(name, copy):
+    """Page or locus name of the copy-th layout repetition
+
+    Folio numbers are shifted (f1r -> f1001r), other pages get a suffix
+    (fRos -> fRos~1, fRos.3,@Cc -> fRos~1.3,@Cc).
+    """
+    if not copy:
+        return name
+    page, dot, rest = name.partition('.')
+    match = FOLIO_RE.match(page)
+    if match:
+        page = f"f{int(match.group(1)) + copy * FOLIO_STRIDE}{page[match.end():]}"
+    else:
+        page = f"{page}~{copy}"
+    return page + dot + rest
+
+
+def corpus_layout(corpus, scale=1):
+    """
+    Pages and lines of a corpus, repeated `scale` times with renamed pages.
+
+    Returns {'pages', 'page_meta', 'line_page', 'loci', 'line_lengths'} for
+    the lines that hold words.
+    """
+    lengths = np.diff(np.asarray(corpus.line_offsets))
+    keep = np.flatnonzero(lengths > 0)
+    line_page = np.asarray(corpus.line_page)[keep]
+    layout = {'pages': [], 'page_meta': [], 'line_page': [], 'loci': [], 'line_lengths': []}
+    for copy in range(scale):
+        layout['pages'].extend(shift_folio(p, copy) for p in corpus.pages)
+        layout['page_meta'].extend(corpus.page_meta)
+        layout['line_page'].append(np.where(line_page >= 0, line_page + copy * len(corpus.pages), -1))
+        layout['loci'].extend(shift_folio(corpus.loci[i], copy) for i in keep.tolist())
+        layout['line_lengths'].append(lengths[keep])
+    layout['line_page'] = np.concatenate(layout['line_page'])
+    layout['line_lengths'] = np.concatenate(layout['line_lengths'])
+    return layout
+
+
+def generate(model, layout, seed=0):
+    """Flat word list filling every layout line in order"""
+    return model.sample(layout['line_lengths'], np.random.default_rng(seed))
+
+
+def layout_lines(layout, words):
+    """Yield (page index, locus, words) for every layout line"""
+    ends = np.cumsum(layout['line_lengths']).tolist()
+    for p, locus, start, end in zip(layout['line_page'].tolist(), layout['loci'],
+                                    [0] + ends[:-1], ends):
+        yield p, locus, words[start:end]
+
+
+def to_corpus(layout, words):
+    """In-memory Corpus of generated words"""
+    pages = layout['pages']
+    page_meta = dict(zip(pages, layout['page_meta']))
+    records = (IvtffLine(pages[p] if p >= 0 else None, locus, line, '.'.join(line))
+               for p, locus, line in layout_lines(layout, words))
+    return encode_lines(records, page_meta)
+
+
+def write_ivtff(path, layout, words, comment=None):
+    """Write generated words as an IVTFF file with the layout's page headers"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("#=IVTFF Eva- 2.0\n")
+        if comment:
+            f.write(f"# {comment}\n")
+        current = -1
+        for p, locus, line in layout_lines(layout, words):
+            if p != current and p >= 0:
+                current = p
+                variables = ' '.join(f"${k}={v}" for k, v in layout['page_meta'][p].items())
+                f.write(f"<{layout['pages'][p]}>      <! {variables}>\n")
+            f.write(f"<{locus}>      {'.'.join(line)}\n")
+    return path
+
+
+def text_summary(corpus):
+    """Word count, type count, word entropy and mean consecutive-line Jaccard"""
+    counts = np.bincount(np.asarray(corpus.tokens), minlength=len(corpus.vocab))
+    p = counts[counts > 0] / counts.sum()
+    data = encode_line_words(corpus)
+    scores = consecutive_jaccard(data['line'], data['word'], data['num_lines'],
+                                 data['vocab_size'])[0]
+    return {
+        'words': int(counts.sum()),
+        'unique_words': int((counts > 0).sum()),
+        'word_entropy': round(float(-(p * np.log2(p)).sum()), 4),
+        'mean_word_length': round(float(np.mean([len(w) for w in corpus.words()])), 4),
+        'jaccard_mean': round(float(np.nanmean(scores)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic IVTFF null-model corpora")
+    parser.add_argument('model', choices=MODELS)
+    parser.add_argument('--file', default=str(Path(__file__).with_name('voynich_ZL3b.txt')),
+                        help="reference transliteration (training text and page layout)")
+    parser.add_argument('--order', type=int, default=None,
+                        help="Markov order (glyph: default 3, word: 0 unigram / 1 bigram)")
+    parser.add_argument('--scale', type=int, default=1, help="repetitions of the page layout")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cartridges', type=int, default=4)
+    parser.add_argument('--cartridge-size', type=int, default=25)
+    parser.add_argument('--ring-size', type=int, default=12)
+    parser.add_argument('--slip', type=float, default=0.1)
+    parser.add_argument('--swap', type=float, default=0.2)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH SYNTHETIC TEXT GENERATOR")
+    print("=" * 60)
+
+    reference = load_corpus(args.file)
+    params = {}
+    if args.model == 'wheel':
+        params = {'cartridges': args.cartridges, 'cartridge_size': args.cartridge_size,
+                  'ring_size': args.ring_size, 'slip': args.slip, 'swap': args.swap}
+
+    print(f"\n[1] Building {args.model} model from {Path(args.file).name}...")
+    start = time.perf_counter()
+    model = build_model(args.model, reference, args.order, **params)
+    print(f"    Built in {time.perf_counter() - start:.2f}s")
+
+    print(f"\n[2] Generating {args.scale}x the page layout...")
+    layout = corpus_layout(reference, args.scale)
+    start = time.perf_counter()
+    words = generate(model, layout, args.seed)
+    seconds = time.perf_counter() - start
+    total = int(layout['line_lengths'].sum())
+    print(f"    {total:,} words in {seconds:.2f}s ({total / max(seconds, 1e-9):,.0f} words/s)")
+
+    output = Path(args.output or f"synthetic_{args.model}_x{args.scale}.txt")
+    order = f" order {args.order}" if args.order is not None else ""
+    write_ivtff(output, layout, words,
+                f"Synthetic {args.model}{order} corpus from {Path(args.file).name}, seed {args.seed}")
+    print(f"    Written to: {output}")
+
+    print("\n[3] Synthetic vs reference text...")
+    synthetic = text_summary(load_corpus(output))
+    real = text_summary(reference)
+    for key in real:
+        print(f"    {key:<18} {synthetic[key]:>12,}  (reference {real[key]:,})")
+
+    return synthetic
+
+
+if __name__ == "__main__":
+    main()
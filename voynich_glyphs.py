@@ -0,0 +1,280 @@
+"""
+Voynich Glyph Segmentation Schemes
+Re-encode the token stream under alternative glyph inventories
+
+Letter and n-gram statistics normally treat every EVA character as one
+glyph, while hypothesis H3 reads 'ch', 'sh', 'cth', 'ckh' or 'iin' as
+single units. A segmentation scheme is just the list of its multi-character
+glyphs; schemes live in a JSON file (glyph_schemes.json by default):
+
+    {"raw": [], "digraph": ["ch", "sh"], "h3": ["ch", "sh", "cth", "ckh", "iin"]}
+
+Each scheme compiles into a trie and words are cut by longest match, any
+character not starting a listed glyph standing for itself. Segmentation
+runs once per word type, not per token, and the token stream is then
+gathered from the per-type code runs in one vectorized pass, giving the
+same (codes, alphabet) layout as voynich_ngrams.encode_glyphs.
+
+The encoded stream of every scheme is cached as .npy next to the corpus
+cache (<name>.corpus/glyphs/), keyed on the corpus key and the glyph list,
+so comparing ten schemes costs one corpus load plus ten array reads.
+
+    python voynich_glyphs.py --file voynich_ZL3b.txt --schemes raw,digraph,h3
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+
+from voynich_corpus import cache_dir, cache_key, load_corpus
+from voynich_ngrams import BOUNDARY, count_ngrams
+from voynich_zipf import fit_rank_frequency, rank_counts
+
+DEFAULT_SCHEMES_PATH = Path(__file__).with_name('glyph_schemes.json')
+
+# Bump when the cached stream layout changes
+STREAM_FORMAT = 1
+
+
+def load_schemes(path=None):
+    """Segmentation schemes from a JSON file: {scheme name: [multi-character glyph, ...]}"""
+    with open(path or DEFAULT_SCHEMES_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class GlyphScheme:
+    """
+    Compiled segmentation scheme.
+
+    segment(word)         glyph list by longest match
+    encode_words(words)   (codes, alphabet) as voynich_ngrams.encode_glyphs
+    encode(corpus)        (codes, alphabet) for the corpus token stream
+    """
+
+    def __init__(self, name, glyphs):
+        self.name = name
+        self.glyphs = sorted(set(glyphs))
+        self.trie = [{}, False]
+        for glyph in self.glyphs:
+            if len(glyph) < 2 or BOUNDARY in glyph:
+                raise ValueError(f"Scheme {name!r}: {glyph!r} is not a multi-character glyph")
+            node = self.trie
+            for ch in glyph:
+                node = node[0].setdefault(ch, [{}, False])
+            node[1] = True
+
+    @property
+    def digest(self):
+        """Hash of the glyph list, for cache keys"""
+        return hashlib.sha256(json.dumps(self.glyphs).encode('utf-8')).hexdigest()
+
+    def segment(self, word):
+        """Cut a word into glyphs, taking the longest listed glyph at each position"""
+        glyphs = []
+        i, n = 0, len(word)
+        while i < n:
+            end = i + 1
+            node = self.trie
+            for j in range(i, n):
+                node = node[0].get(word[j])
+                if node is None:
+                    break
+                if node[1]:
+                    end = j + 1
+            glyphs.append(word[i:end])
+            i = end
+        return glyphs
+
+    def encode_types(self, types):
+        """Per-type code runs (each ending in a boundary), their offsets and the alphabet"""
+        segmented = [self.segment(w) for w in types]
+        alphabet = [BOUNDARY] + sorted({g for glyphs in segmented for g in glyphs})
+        if len(alphabet) > 256:
+            raise ValueError(f"{len(alphabet) - 1} distinct glyphs do not fit uint8 codes")
+        code = {g: i for i, g in enumerate(alphabet)}
+        flat = np.array([c for glyphs in segmented for c in [code[g] for g in glyphs] + [0]],
+                        dtype=np.uint8)
+        lengths = np.array([len(glyphs) + 1 for glyphs in segmented], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        return flat, offsets, alphabet
+
+    def _gather(self, flat, offsets, ids):
+        """Boundary-joined code stream of a sequence of type IDs"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return np.zeros(0, dtype=np.uint8)
+        starts = offsets[ids]
+        lengths = offsets[ids + 1] - starts
+        out = np.concatenate(([0], np.cumsum(lengths)))
+        gather = np.repeat(starts - out[:-1], lengths) + np.arange(out[-1])
+        # Every run ends in a boundary; the stream has none after the last word
+        return flat[gather[:-1]]
+
+    def encode_words(self, words):
+        """(codes, alphabet) for a word list"""
+        types = list(dict.fromkeys(words))
+        index = {w: i for i, w in enumerate(types)}
+        flat, offsets, alphabet = self.encode_types(types)
+        return self._gather(flat, offsets, [index[w] for w in words]), alphabet
+
+    def encode(self, corpus):
+        """(codes, alphabet) for the corpus token stream"""
+        flat, offsets, alphabet = self.encode_types(corpus.vocab)
+        return self._gather(flat, offsets, corpus.tokens), alphabet
+
+
+def compile_schemes(schemes):
+    """{name: GlyphScheme} for every scheme"""
+    return {name: GlyphScheme(name, glyphs) for name, glyphs in schemes.items()}
+
+
+def _stream_paths(filepath, scheme):
+    directory = cache_dir(filepath) / 'glyphs'
+    stem = f"{scheme.name}-{scheme.digest[:16]}"
+    return directory, directory / f'{stem}.npy', directory / f'{stem}.json'
+
+
+def scheme_stream(filepath, scheme, corpus=None, rebuild=False):
+    """
+    Cached (codes, alphabet) of a transliteration under a scheme.
+
+    The cache entry is valid while the corpus key and the glyph list are
+    unchanged. Returns (codes, alphabet, cached).
+    """
+    key = hashlib.sha256(json.dumps({'corpus': cache_key(filepath), 'glyphs': scheme.glyphs,
+                                     'format': STREAM_FORMAT}).encode('utf-8')).hexdigest()
+    directory, codes_path, meta_path = _stream_paths(filepath, scheme)
+
+    if not rebuild:
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('key') == key:
+                return np.load(codes_path, mmap_mode='r'), meta['alphabet'], True
+        except (OSError, ValueError, KeyError):
+            pass
+
+    codes, alphabet = scheme.encode(corpus if corpus is not None else load_corpus(filepath))
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = codes_path.with_name(codes_path.name + f'.tmp{os.getpid()}')
+        with open(tmp, 'wb') as f:
+            np.save(f, codes)
+        os.replace(tmp, codes_path)
+        # The metadata is written last and marks the entry complete
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'alphabet': alphabet, 'glyphs': scheme.glyphs}, f,
+                      ensure_ascii=False)
+    except OSError:
+        pass
+    return codes, alphabet, False
+
+
+def _entropy(counts):
+    """Shannon entropy in bits of a count array"""
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum()
+    if not total:
+        return 0.0
+    p = counts[counts > 0] / total
+    return float(-(p * np.log2(p)).sum())
+
+
+def scheme_statistics(codes, alphabet, max_n=3, top=20):
+    """Glyph frequency, entropy, n-gram and rank-frequency summary of one encoded stream"""
+    codes = np.asarray(codes)
+    grams = count_ngrams(codes, alphabet, max_n)
+    unigrams = grams[1]
+    words = int(np.count_nonzero(codes == 0)) + 1 if len(codes) else 0
+    glyph_tokens = sum(unigrams.values())
+
+    h1 = _entropy(list(unigrams.values()))
+    h2 = _entropy(list(grams[2].values())) if max_n >= 2 else None
+    counts = rank_counts(list(unigrams.values()))
+    s_zipf, _, _ = fit_rank_frequency(counts[None, :])
+    s_zm, b_zm, _ = fit_rank_frequency(counts[None, :], mandelbrot=True)
+
+    return {
+        'glyphs': len(unigrams),
+        'glyph_tokens': glyph_tokens,
+        'mean_word_length': round(glyph_tokens / words, 4) if words else 0.0,
+        'entropy': {
+            'h1': round(h1, 4),
+            'h1_ratio': round(h1 / math.log2(len(unigrams)), 4) if len(unigrams) > 1 else None,
+            'h2_joint': round(h2, 4) if h2 is not None else None,
+            'h2_conditional': round(h2 - h1, 4) if h2 is not None else None,
+        },
+        'zipf': {'s': round(float(s_zipf[0]), 4),
+                 'mandelbrot_s': round(float(s_zm[0]), 4),
+                 'mandelbrot_b': round(float(b_zm[0]), 4)},
+        'glyph_frequency': dict(unigrams.most_common()),
+        'ngrams': {n: dict(grams[n].most_common(top)) for n in range(2, max_n + 1)},
+    }
+
+
+def compare_schemes(filepath, schemes, max_n=3, top=20, rebuild=False):
+    """Statistics of every scheme over one transliteration, from a single corpus load"""
+    corpus = load_corpus(filepath)
+    results = {}
+    for name, scheme in schemes.items():
+        codes, alphabet, cached = scheme_stream(filepath, scheme, corpus, rebuild)
+        results[name] = {'units': scheme.glyphs, 'cached': cached,
+                         **scheme_statistics(codes, alphabet, max_n, top)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Glyph statistics under alternative segmentation schemes")
+    parser.add_argument('schemes_file', nargs='?', default=str(DEFAULT_SCHEMES_PATH))
+    parser.add_argument('--file', default=str(Path(__file__).with_name('voynich_ZL3b.txt')))
+    parser.add_argument('--schemes', default=None, help="comma-separated scheme names (default all)")
+    parser.add_argument('--max-n', type=int, default=3)
+    parser.add_argument('--rebuild', action='store_true', help="re-encode instead of reading the cache")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH GLYPH SEGMENTATION SCHEMES")
+    print("=" * 60)
+
+    schemes = load_schemes(args.schemes_file)
+    if args.schemes:
+        names = [s.strip() for s in args.schemes.split(',') if s.strip()]
+        missing = [n for n in names if n not in schemes]
+        if missing:
+            parser.error(f"unknown schemes {missing}; available: {list(schemes)}")
+        schemes = {n: schemes[n] for n in names}
+
+    print(f"\n[1] Encoding {len(schemes)} schemes...")
+    results = compare_schemes(args.file, compile_schemes(schemes), args.max_n, rebuild=args.rebuild)
+    cached = sum(r['cached'] for r in results.values())
+    print(f"    {cached} read from cache, {len(results) - cached} encoded")
+
+    print("\n[2] Scheme comparison...")
+    print(f"    {'scheme':<10} {'glyphs':>6} {'tokens':>8} {'len':>6} {'h1':>7} {'h2|1':>7} {'zipf s':>7}")
+    for name, r in results.items():
+        h2 = r['entropy']['h2_conditional']
+        print(f"    {name:<10} {r['glyphs']:>6} {r['glyph_tokens']:>8,} {r['mean_word_length']:>6.2f} "
+              f"{r['entropy']['h1']:>7.3f} {h2 if h2 is not None else float('nan'):>7.3f} "
+              f"{r['zipf']['s']:>7.3f}")
+
+    print("\n[3] Top bigrams per scheme...")
+    for name, r in results.items():
+        if 2 in r['ngrams']:
+            print(f"    {name:<10} {list(r['ngrams'][2].items())[:8]}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n[✓] Results saved to: {args.output}")
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
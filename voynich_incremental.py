@@ -0,0 +1,234 @@
+"""
+Voynich Incremental Re-analysis
+Recompute only the pages of a transliteration that changed since the last run
+
+The file is split into page blocks (a page header up to the next one). Each
+block's contribution to the Track A and Quevedo statistics - letter, word,
+bigram/trigram, word-length, first/last-word and gallow-root counters plus
+the within-page Jaccard scores - is stored keyed on the SHA-1 of the block.
+On the next run only blocks with an unknown hash are re-tokenized; the rest
+come from the state file. Merging walks the blocks in file order, so counter
+insertion order, and therefore every most_common() tie, matches a full run.
+Jaccard pairs that straddle a page boundary are recomputed at merge time.
+
+The sliding-window entropy profile, the Zipf/Heaps fits and the Jaccard
+null models span page boundaries, so they are rebuilt from the merged token
+stream (interning only, no re-parse), as are the gallow contingency tables,
+whose permutation tests pool every page. The memory-mapped corpus cache is
+refreshed along the way.
+"""
+
+import argparse
+import hashlib
+import json
+import pickle
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import quevedo_validation
+import voynich_analysis
+from voynich_corpus import cache_dir, cache_key, encode_lines, save_corpus, CLEANING_OPTIONS
+from voynich_entropy import entropy_profile
+from voynich_gallows import gallow_contingency
+from voynich_ngrams import ngram_counts
+from voynich_significance import jaccard_significance
+from voynich_zipf import law_fits
+from voynich_tokenizer import iter_ivtff_lines, page_header_match
+
+# Bump when the per-block counters change shape
+STATE_VERSION = 1
+
+
+def state_path(filepath):
+    """State file remembering per-page counters for a transliteration"""
+    filepath = Path(filepath)
+    return filepath.with_name(filepath.name + '.incremental.pkl')
+
+
+def split_page_blocks(filepath):
+    """Split a file into (sha1, lines) blocks, each starting at a page header"""
+    blocks = []
+    current = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if current and page_header_match(line.strip()):
+                blocks.append(current)
+                current = []
+            current.append(line)
+    if current:
+        blocks.append(current)
+
+    return [(hashlib.sha1(''.join(lines).encode('utf-8')).hexdigest(), lines)
+            for lines in blocks]
+
+
+def analyze_block(lines):
+    """Per-page counters for one block of raw IVTFF lines"""
+    page_meta = {}
+    records = list(iter_ivtff_lines(lines, page_meta))
+    words = [w for record in records for w in record.words]
+    ngrams = ngram_counts(words, 3, min_n=2)
+
+    quevedo_lines = quevedo_validation.lines_from_records(records)
+    gallow_vocab, _ = quevedo_validation.analyze_gallow_correlation(quevedo_lines)
+    first_words = Counter(line['first_word'] for line in quevedo_lines)
+    last_words = Counter(line['last_word'] for line in quevedo_lines)
+
+    return {
+        'records': records,
+        'page_meta': page_meta,
+        'num_words': len(words),
+        'letter_freq': voynich_analysis.letter_frequency(words),
+        'word_freq': voynich_analysis.word_frequency(words),
+        'bigrams': ngrams[2],
+        'trigrams': ngrams[3],
+        'word_lengths': voynich_analysis.word_length_distribution(words),
+        'jaccard_scores': quevedo_validation.calculate_jaccard_index(quevedo_lines),
+        'first_line': quevedo_lines[0]['words'] if quevedo_lines else None,
+        'last_line': quevedo_lines[-1]['words'] if quevedo_lines else None,
+        'gallow_vocab': dict(gallow_vocab),
+        'first_words': first_words,
+        'last_words': last_words,
+    }
+
+
+def merge_blocks(blocks):
+    """Fold per-page counters, in file order, into global totals"""
+    merged = {
+        'records': [],
+        'page_meta': {},
+        'num_words': 0,
+        'letter_freq': Counter(),
+        'word_freq': Counter(),
+        'bigrams': Counter(),
+        'trigrams': Counter(),
+        'word_lengths': Counter(),
+        'jaccard_scores': [],
+        'gallow_vocab': defaultdict(Counter),
+        'first_words': Counter(),
+        'last_words': Counter(),
+    }
+    previous_line = None
+
+    for block in blocks:
+        merged['records'].extend(block['records'])
+        merged['page_meta'].update(block['page_meta'])
+        merged['num_words'] += block['num_words']
+        for key in ('letter_freq', 'word_freq', 'bigrams', 'trigrams', 'word_lengths',
+                    'first_words', 'last_words'):
+            merged[key].update(block[key])
+        for mode, vocab in block['gallow_vocab'].items():
+            merged['gallow_vocab'][mode].update(vocab)
+
+        # Consecutive-line pair straddling the page boundary
+        if block['first_line'] is not None:
+            if previous_line is not None:
+                merged['jaccard_scores'].extend(quevedo_validation.calculate_jaccard_index(
+                    [{'words': previous_line}, {'words': block['first_line']}]))
+            merged['jaccard_scores'].extend(block['jaccard_scores'])
+            previous_line = block['last_line']
+
+    return merged
+
+
+def load_state(filepath):
+    """Block counters from the previous run, keyed on block hash"""
+    try:
+        with open(state_path(filepath), 'rb') as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return {}
+    if state.get('version') != STATE_VERSION or state.get('cleaning') != CLEANING_OPTIONS:
+        return {}
+    return state.get('blocks', {})
+
+
+def save_state(filepath, blocks):
+    """Remember the block counters of this run"""
+    state = {'version': STATE_VERSION, 'cleaning': CLEANING_OPTIONS, 'blocks': blocks}
+    tmp = state_path(filepath).with_suffix('.tmp')
+    with open(tmp, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(state_path(filepath))
+
+
+def run_incremental(filepath, bootstrap=0, permutations=0):
+    """
+    Track A and Quevedo results for filepath, recomputing only changed pages.
+
+    bootstrap and permutations enable the Zipf intervals and the Jaccard
+    null models, as in voynich_analysis.main and quevedo_validation.main.
+
+    Returns (statistics_results, quevedo_results, info) where info reports
+    how many page blocks there are and how many were recomputed.
+    """
+    filepath = Path(filepath)
+    previous = load_state(filepath)
+
+    current = {}
+    ordered = []
+    recomputed = 0
+    for digest, lines in split_page_blocks(filepath):
+        block = current.get(digest) or previous.get(digest)
+        if block is None:
+            block = analyze_block(lines)
+            recomputed += 1
+        current[digest] = block
+        ordered.append(block)
+    if recomputed or current.keys() != previous.keys():
+        save_state(filepath, current)
+
+    merged = merge_blocks(ordered)
+
+    corpus = encode_lines(merged['records'], merged['page_meta'])
+    try:
+        save_corpus(corpus, cache_dir(filepath), cache_key(filepath))
+    except OSError:
+        pass
+    profile = entropy_profile(corpus, voynich_analysis.PROFILE_WINDOW,
+                              voynich_analysis.PROFILE_STRIDE)
+
+    statistics_results = voynich_analysis.compile_results(
+        filepath, merged['num_words'], merged['letter_freq'], merged['word_freq'],
+        merged['bigrams'], merged['trigrams'], merged['word_lengths'], profile,
+        law_fits(corpus, bootstrap))
+    quevedo_results = quevedo_validation.compile_results(
+        merged['jaccard_scores'], merged['gallow_vocab'],
+        quevedo_validation.position_entropy_summary(merged['first_words'], merged['last_words']),
+        jaccard_significance(corpus, permutations) if permutations else None,
+        gallow_contingency(corpus, permutations))
+
+    info = {'pages': len(ordered), 'recomputed': recomputed}
+    return statistics_results, quevedo_results, info
+
+
+def main(filepath=None, output_dir=None, bootstrap=0, permutations=0):
+    filepath = Path(filepath or Path(__file__).with_name('voynich_ZL3b.txt'))
+    output_dir = Path(output_dir or filepath.parent)
+
+    print("=" * 60)
+    print("VOYNICH INCREMENTAL RE-ANALYSIS")
+    print("=" * 60)
+
+    statistics_results, quevedo_results, info = run_incremental(filepath, bootstrap, permutations)
+    print(f"\n    Page blocks: {info['pages']}  recomputed: {info['recomputed']}")
+
+    for name, results in (("voynich_statistics.json", statistics_results),
+                          ("quevedo_validation.json", quevedo_results)):
+        with open(output_dir / name, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"[✓] Results saved to: {output_dir / name}")
+
+    return statistics_results, quevedo_results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental Track A and Quevedo re-analysis")
+    parser.add_argument('filepath', nargs='?')
+    parser.add_argument('output_dir', nargs='?')
+    parser.add_argument('--bootstrap', type=int, default=0,
+                        help="Zipf bootstrap resamples for confidence intervals (0 = none)")
+    parser.add_argument('--permutations', type=int, default=0,
+                        help="Jaccard null-model and gallow label permutations (0 = skip)")
+    args = parser.parse_args()
+    main(args.filepath, args.output_dir, args.bootstrap, args.permutations)
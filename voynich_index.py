@@ -0,0 +1,89 @@
+"""
+Voynich Page Metadata Index
+Inverted index from IVTFF page-header variables to line and token ranges
+
+Every page header carries variables such as $Q (quire), $I (illustration),
+$L (Currier language) and $H (hand). The index maps each 'VAR=value' to the
+pages that carry it, so a selection like '$L=B,$I=B' becomes one mask over
+the per-line page IDs instead of a rescan of the transliteration. The mask
+stays correct when a page header occurs more than once and its lines are
+split into several runs.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+
+def build_metadata_index(corpus):
+    """{'VAR=value': sorted array of page IDs} for a Corpus"""
+    index = defaultdict(list)
+    for pid, meta in enumerate(corpus.page_meta):
+        for var, value in meta.items():
+            index[f'{var}={value}'].append(pid)
+    return {key: np.array(pids, dtype=np.int64) for key, pids in index.items()}
+
+
+def parse_query(query):
+    """
+    Parse a selection such as '$L=B,$I=B|H'.
+
+    Comma-separated terms are combined with AND, '|' lists alternative
+    values for one variable. Returns a list of (var, [values]).
+    """
+    terms = []
+    for term in query.split(','):
+        term = term.strip()
+        if not term:
+            continue
+        var, sep, values = term.partition('=')
+        if not sep or not values:
+            raise ValueError(f"Bad metadata term {term!r}, expected e.g. '$L=B'")
+        terms.append((var.strip().lstrip('$'), [v.strip() for v in values.split('|')]))
+    return terms
+
+
+def select_pages(corpus, query):
+    """Page IDs matching a metadata query"""
+    index = corpus.metadata_index
+    selected = np.arange(len(corpus.pages), dtype=np.int64)
+    for var, values in parse_query(query):
+        matches = [index.get(f'{var}={value}', np.zeros(0, dtype=np.int64)) for value in values]
+        selected = np.intersect1d(selected, np.concatenate(matches))
+    return selected
+
+
+def page_line_ranges(corpus, pages):
+    """
+    (start, end) line ranges of the given pages.
+
+    Only valid when every page's lines are contiguous; raises ValueError
+    when a page header occurs more than once (select_lines does not need this).
+    """
+    line_page = np.asarray(corpus.line_page)
+    if len(line_page) > 1 and (np.diff(line_page) < 0).any():
+        raise ValueError("Page lines are not contiguous (repeated page header); "
+                         "use select_lines")
+    pages = np.asarray(pages, dtype=np.int64)
+    offsets = np.asarray(corpus.page_offsets)
+    return offsets[pages], offsets[pages + 1]
+
+
+def page_token_ranges(corpus, pages):
+    """(start, end) token ranges of the given pages"""
+    starts, ends = page_line_ranges(corpus, pages)
+    offsets = np.asarray(corpus.line_offsets)
+    return offsets[starts], offsets[ends]
+
+
+def select_lines(corpus, query):
+    """Ascending line indices of all pages matching a metadata query"""
+    pages = select_pages(corpus, query)
+    return np.flatnonzero(np.isin(np.asarray(corpus.line_page), pages)).astype(np.int64)
+
+
+def select(corpus, query):
+    """Sub-corpus of the pages matching a metadata query (None selects everything)"""
+    if not query:
+        return corpus
+    return corpus.subset(select_lines(corpus, query))
@@ -0,0 +1,274 @@
+"""
+Voynich Reference-Language Profiles
+Track A metrics measured on plain-text reference corpora
+
+compare_with_languages used to return literature constants. Here each
+language is a plain-text file in reference_corpora/ (Latin.txt,
+Italian.txt, Hebrew.txt, ...; the file stem is the language name) and is
+profiled with the metrics Track A reports for the manuscript:
+
+    summary                  tokens, types, letters and alphabet size
+    letter_entropy           h1 over letters
+    conditional_entropy      h2, letter given the previous letter in the word
+    word_entropy             entropy of the word distribution
+    average_word_length      letters per word
+    word_length_distribution share of tokens of each length
+    zipf                     maximum-likelihood Zipf and Zipf-Mandelbrot fits
+    affix_regularity         token share covered by the 10 most common
+                             2-letter prefixes / suffixes (words of 3+ letters)
+
+Words are lower-cased runs of letters. Profiles are computed on a process
+pool and cached in reference_corpora/.profiles.json by the SHA-256 of each
+file, one entry per metric, so adding a language computes only that
+language and adding a metric computes only that metric.
+
+    python voynich_languages.py reference_corpora --workers 4
+"""
+
+import argparse
+import json
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from voynich_corpus import file_hash
+from voynich_ngrams import ngram_counts
+from voynich_zipf import fit_rank_frequency, rank_counts
+
+REFERENCE_DIR = Path(__file__).with_name('reference_corpora')
+CACHE_NAME = '.profiles.json'
+
+# Bump when a metric definition changes; older cache entries are dropped
+PROFILE_FORMAT = 1
+
+WORD_RE = re.compile(r'[^\W\d_]+')
+
+# Affix regularity: affix length, number of affixes and minimum word length
+AFFIX_LENGTH = 2
+AFFIX_TOP = 10
+AFFIX_MIN_WORD = 3
+
+
+def read_word_counts(path):
+    """Word type counts of a plain-text file (lower-cased letter runs)"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return Counter(WORD_RE.findall(f.read().lower()))
+
+
+def _entropy(counts):
+    counts = np.asarray(list(counts), dtype=np.float64)
+    total = counts.sum()
+    if not total:
+        return 0.0
+    p = counts[counts > 0] / total
+    return float(-(p * np.log2(p)).sum())
+
+
+def _letter_counts(word_freq):
+    letters = Counter()
+    for word, freq in word_freq.items():
+        for ch in word:
+            letters[ch] += freq
+    return letters
+
+
+def summary(word_freq):
+    """Token, type, letter and alphabet counts"""
+    letters = _letter_counts(word_freq)
+    return {'tokens': sum(word_freq.values()), 'types': len(word_freq),
+            'letters': sum(letters.values()), 'alphabet': len(letters)}
+
+
+def letter_entropy(word_freq):
+    """Entropy of the letter distribution (h1)"""
+    return round(_entropy(_letter_counts(word_freq).values()), 4)
+
+
+def conditional_entropy(word_freq):
+    """Entropy of a letter given the previous one in the same word (h2)"""
+    words = list(word_freq)
+    grams = ngram_counts(words, 2, weights=[word_freq[w] for w in words])
+    return round(_entropy(grams[2].values()) - _entropy(grams[1].values()), 4)
+
+
+def word_entropy(word_freq):
+    """Entropy of the word distribution"""
+    return round(_entropy(word_freq.values()), 4)
+
+
+def average_word_length(word_freq):
+    """Mean letters per word token"""
+    tokens = sum(word_freq.values())
+    letters = sum(len(w) * f for w, f in word_freq.items())
+    return round(letters / tokens, 4) if tokens else 0.0
+
+
+def word_length_distribution(word_freq):
+    """Share of word tokens of each length"""
+    lengths = Counter()
+    for word, freq in word_freq.items():
+        lengths[len(word)] += freq
+    tokens = sum(lengths.values())
+    return {str(k): round(v / tokens, 5) for k, v in sorted(lengths.items())}
+
+
+def zipf(word_freq):
+    """Zipf and Zipf-Mandelbrot exponents of the rank-frequency spectrum"""
+    counts = rank_counts(list(word_freq.values()))
+    if not len(counts):
+        return None
+    s, _, _ = fit_rank_frequency(counts[None, :])
+    s_zm, b_zm, _ = fit_rank_frequency(counts[None, :], mandelbrot=True)
+    return {'s': round(float(s[0]), 4), 'mandelbrot_s': round(float(s_zm[0]), 4),
+            'mandelbrot_b': round(float(b_zm[0]), 4)}
+
+
+def affix_regularity(word_freq):
+    """Token share of the most common prefixes and suffixes"""
+    prefixes, suffixes = Counter(), Counter()
+    for word, freq in word_freq.items():
+        if len(word) >= AFFIX_MIN_WORD:
+            prefixes[word[:AFFIX_LENGTH]] += freq
+            suffixes[word[-AFFIX_LENGTH:]] += freq
+    tokens = sum(prefixes.values())
+    if not tokens:
+        return None
+    return {'prefix': round(sum(c for _, c in prefixes.most_common(AFFIX_TOP)) / tokens, 4),
+            'suffix': round(sum(c for _, c in suffixes.most_common(AFFIX_TOP)) / tokens, 4)}
+
+
+# Metric name -> function of a word-type Counter; results must be JSON-serialisable
+METRICS = {
+    'summary': summary,
+    'letter_entropy': letter_entropy,
+    'conditional_entropy': conditional_entropy,
+    'word_entropy': word_entropy,
+    'average_word_length': average_word_length,
+    'word_length_distribution': word_length_distribution,
+    'zipf': zipf,
+    'affix_regularity': affix_regularity,
+}
+
+
+def profile_words(word_freq, metrics=None):
+    """{metric: value} of a word-type Counter"""
+    return {name: METRICS[name](word_freq) for name in (metrics or METRICS)}
+
+
+def _profile_file(path, metrics):
+    """Pool task: the requested metrics of one reference file"""
+    return profile_words(read_word_counts(path), metrics)
+
+
+def reference_files(reference_dir=None):
+    """{language: path} of the .txt corpora in a reference directory"""
+    reference_dir = Path(reference_dir or REFERENCE_DIR)
+    if not reference_dir.is_dir():
+        return {}
+    return {path.stem: path for path in sorted(reference_dir.glob('*.txt'))}
+
+
+def load_profile_cache(path):
+    """Cached {file hash: {metric: value}}, empty when missing or of another format"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('format') == PROFILE_FORMAT:
+            return cache['profiles']
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+
+def save_profile_cache(path, profiles):
+    path = Path(path)
+    tmp = path.with_name(path.name + f'.tmp{os.getpid()}')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'format': PROFILE_FORMAT, 'profiles': profiles}, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def build_profiles(reference_dir=None, metrics=None, workers=None, rebuild=False):
+    """
+    Profiles of every reference corpus, computing only uncached metrics.
+
+    Returns ({language: {metric: value}}, number of files profiled).
+    """
+    metrics = list(metrics or METRICS)
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics: {sorted(unknown)}")
+    files = reference_files(reference_dir)
+    if not files:
+        return {}, 0
+
+    cache_path = next(iter(files.values())).with_name(CACHE_NAME)
+    cache = {} if rebuild else load_profile_cache(cache_path)
+    hashes = {lang: file_hash(path) for lang, path in files.items()}
+    todo = {lang: [m for m in metrics if m not in cache.get(hashes[lang], {})]
+            for lang in files}
+    todo = {lang: missing for lang, missing in todo.items() if missing}
+
+    if todo:
+        workers = workers or min(len(todo), os.cpu_count() or 1)
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {lang: pool.submit(_profile_file, str(files[lang]), missing)
+                           for lang, missing in todo.items()}
+                computed = {lang: future.result() for lang, future in futures.items()}
+        else:
+            computed = {lang: _profile_file(files[lang], missing) for lang, missing in todo.items()}
+        for lang, values in computed.items():
+            cache.setdefault(hashes[lang], {}).update(values)
+        try:
+            save_profile_cache(cache_path, cache)
+        except OSError:
+            pass
+
+    profiles = {lang: {m: cache[hashes[lang]][m] for m in metrics} for lang in files}
+    return profiles, len(todo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile plain-text reference-language corpora")
+    parser.add_argument('reference_dir', nargs='?', default=str(REFERENCE_DIR))
+    parser.add_argument('--metrics', default=None, help="comma-separated metric names (default all)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rebuild', action='store_true', help="ignore the profile cache")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH REFERENCE-LANGUAGE PROFILES")
+    print("=" * 60)
+
+    metrics = [m.strip() for m in args.metrics.split(',')] if args.metrics else None
+    profiles, computed = build_profiles(args.reference_dir, metrics, args.workers, args.rebuild)
+    if not profiles:
+        print(f"\n    No .txt corpora in {args.reference_dir}")
+        return {}
+    print(f"\n    {len(profiles)} languages, {computed} profiled, {len(profiles) - computed} from cache")
+
+    nan = float('nan')
+    print(f"\n    {'language':<14} {'tokens':>10} {'h1':>7} {'h2':>7} {'word H':>7} {'len':>6} {'zipf s':>7}")
+    for lang, p in profiles.items():
+        tokens = (p.get('summary') or {}).get('tokens', 0)
+        s = (p.get('zipf') or {}).get('s', nan)
+        print(f"    {lang:<14} {tokens:>10,} {p.get('letter_entropy', nan):>7.3f} "
+              f"{p.get('conditional_entropy', nan):>7.3f} {p.get('word_entropy', nan):>7.3f} "
+              f"{p.get('average_word_length', nan):>6.2f} {s:>7.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(profiles, f, indent=2, ensure_ascii=False)
+        print(f"\n[✓] Results saved to: {args.output}")
+
+    return profiles
+
+
+if __name__ == "__main__":
+    main()
@@ -3,71 +3,109 @@ Voynich Manuscript Linguistic Analysis
 AIDols Finale Challenge - Track B: Comparative Linguistics
 """
 
+import argparse
 import json
 from pathlib import Path
 from collections import Counter, defaultdict
 import re
 
-def load_statistics():
+from voynich_affixes import AffixMatcher, load_rules
+from voynich_corpus import load_corpus
+from voynich_families import NeighborIndex, family_report
+from voynich_languages import REFERENCE_DIR, build_profiles, profile_words
+from voynich_metrics import StageMetrics, format_metrics
+
+def load_statistics(stats_path=None):
     """Load previously computed statistics"""
-    with open(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos\voynich_statistics.json", 'r') as f:
+    if stats_path is None:
+        stats_path = r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos\voynich_statistics.json"
+    with open(stats_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def analyze_word_structure(word_freq):
+def load_type_frequencies(stats):
+    """
+    Full word-type frequency table for the transliteration behind stats.
+
+    Read from the shared corpus cache of the source file recorded in the
+    Track A metadata; falls back to the truncated top-50 word_frequency
+    from the JSON when that file is not available. Returns (word_freq, source).
+    """
+    source = stats.get('metadata', {}).get('source')
+    if source and Path(source).is_file():
+        return load_corpus(source).type_counts(), 'corpus'
+    return Counter(stats['word_frequency']), 'word_frequency'
+
+def build_affix_tries(word_freq, min_word_len=3):
+    """
+    Prefix and suffix tries over all word types, built in one pass.
+
+    Each node holds the summed frequency of the words passing through it.
+    Returns (prefix_nodes, suffix_nodes): lists of (affix, node) in node
+    creation order, which is the order a Counter fed word by word would use.
+    """
+    prefix_root, suffix_root = {}, {}
+    prefix_nodes, suffix_nodes = [], []
+    for word, freq in word_freq.items():
+        if len(word) < min_word_len:
+            continue
+        for key, children, nodes, rev in ((word, prefix_root, prefix_nodes, False),
+                                          (word[::-1], suffix_root, suffix_nodes, True)):
+            for depth, ch in enumerate(key, 1):
+                node = children.get(ch)
+                if node is None:
+                    node = children[ch] = [0, {}]
+                    nodes.append((key[depth - 1::-1] if rev else key[:depth], node))
+                node[0] += freq
+                children = node[1]
+    return prefix_nodes, suffix_nodes
+
+def affix_counts(nodes, lengths=None):
+    """Counter of affix frequencies from trie nodes, optionally only some lengths"""
+    return Counter({affix: node[0] for affix, node in nodes
+                    if lengths is None or len(affix) in lengths})
+
+def affixes_by_length(nodes, max_len=6, top=10):
+    """Most common affixes for every length 1..max_len"""
+    by_length = {}
+    for length in range(1, max_len + 1):
+        counts = affix_counts(nodes, (length,))
+        if counts:
+            by_length[length] = dict(counts.most_common(top))
+    return by_length
+
+def analyze_word_structure(word_freq, lengths=(2, 3), tries=None, rule_sets=None):
     """Analyze word morphological patterns"""
     words = list(word_freq.keys())
     
-    # Common prefixes
-    prefix_counts = Counter()
-    for word in words:
-        if len(word) >= 3:
-            prefix_counts[word[:2]] += word_freq[word]
-            prefix_counts[word[:3]] += word_freq[word]
-    
-    # Common suffixes
-    suffix_counts = Counter()
-    for word in words:
-        if len(word) >= 3:
-            suffix_counts[word[-2:]] += word_freq[word]
-            suffix_counts[word[-3:]] += word_freq[word]
+    # Common prefixes and suffixes, all types counted through the tries
+    prefix_nodes, suffix_nodes = tries or build_affix_tries(word_freq)
+    prefix_counts = affix_counts(prefix_nodes, lengths)
+    suffix_counts = affix_counts(suffix_nodes, lengths)
     
-    # Root patterns
+    # Root patterns: strip each matching suffix of the 'root_suffixes' rule set
+    rules = (rule_sets or load_rules())['root_suffixes']
+    matcher = AffixMatcher(rules)
     root_patterns = defaultdict(list)
     for word in words:
-        # Extract potential roots by removing common suffixes
-        for suffix in ['dy', 'aiin', 'ey', 'ol', 'ar', 'in', 'al']:
-            if word.endswith(suffix) and len(word) > len(suffix) + 1:
-                root = word[:-len(suffix)]
-                root_patterns[root].append(word)
+        for i in matcher.match_ids(word):
+            root = word[:len(word) - len(rules[i]['suffix'])]
+            root_patterns[root].append(word)
     
     return prefix_counts, suffix_counts, root_patterns
 
-def compare_with_languages():
-    """Generate comparison data for candidate languages"""
-    # Reference entropy values from linguistic research
-    language_entropy = {
-        'Voynich': 3.87,
-        'English': 4.5,
-        'Latin': 4.0,
-        'Italian': 4.2,
-        'Hebrew': 4.1,
-        'Arabic': 4.3,
-        'German': 4.3,
-        'Constructed (avg)': 3.5,
-        'Random': 4.7
-    }
-    
-    # Reference word length averages
-    language_word_length = {
-        'Voynich': 5.04,
-        'English': 4.5,
-        'Latin': 5.8,
-        'Italian': 4.8,
-        'Hebrew': 4.5,
-        'Arabic': 5.2,
-        'German': 6.3,
-        'Spanish': 4.9
-    }
+def compare_with_languages(stats, profiles=None):
+    """
+    Entropy and word-length comparison with reference languages.
+
+    The Voynich figures come from the Track A statistics, the others from
+    profiles measured on reference corpora (see voynich_languages).
+    """
+    summary = stats['summary']
+    language_entropy = {'Voynich': summary['letter_entropy']}
+    language_word_length = {'Voynich': summary['average_word_length']}
+    for lang, profile in (profiles or {}).items():
+        language_entropy[lang] = profile['letter_entropy']
+        language_word_length[lang] = profile['average_word_length']
     
     return language_entropy, language_word_length
 
@@ -86,69 +124,48 @@ def analyze_positional_patterns(words):
     
     return first_letters, second_letters, last_letters
 
-def detect_grammar_patterns(word_freq):
-    """Detect potential grammatical patterns"""
-    patterns = {
-        'qo_prefix': {'count': 0, 'examples': []},
-        'ch_prefix': {'count': 0, 'examples': []},
-        'sh_prefix': {'count': 0, 'examples': []},
-        'aiin_suffix': {'count': 0, 'examples': []},
-        'dy_suffix': {'count': 0, 'examples': []},
-        'ey_suffix': {'count': 0, 'examples': []},
-        'ol_suffix': {'count': 0, 'examples': []},
-        'ar_suffix': {'count': 0, 'examples': []},
-    }
-    
-    for word, freq in word_freq.items():
-        if word.startswith('qo'):
-            patterns['qo_prefix']['count'] += freq
-            if len(patterns['qo_prefix']['examples']) < 10:
-                patterns['qo_prefix']['examples'].append(word)
-        if word.startswith('ch') and not word.startswith('cho'):
-            patterns['ch_prefix']['count'] += freq
-            if len(patterns['ch_prefix']['examples']) < 10:
-                patterns['ch_prefix']['examples'].append(word)
-        if word.startswith('sh'):
-            patterns['sh_prefix']['count'] += freq
-            if len(patterns['sh_prefix']['examples']) < 10:
-                patterns['sh_prefix']['examples'].append(word)
-        if word.endswith('aiin'):
-            patterns['aiin_suffix']['count'] += freq
-            if len(patterns['aiin_suffix']['examples']) < 10:
-                patterns['aiin_suffix']['examples'].append(word)
-        if word.endswith('dy'):
-            patterns['dy_suffix']['count'] += freq
-            if len(patterns['dy_suffix']['examples']) < 10:
-                patterns['dy_suffix']['examples'].append(word)
-        if word.endswith('ey') and not word.endswith('eey'):
-            patterns['ey_suffix']['count'] += freq
-            if len(patterns['ey_suffix']['examples']) < 10:
-                patterns['ey_suffix']['examples'].append(word)
-        if word.endswith('ol'):
-            patterns['ol_suffix']['count'] += freq
-            if len(patterns['ol_suffix']['examples']) < 10:
-                patterns['ol_suffix']['examples'].append(word)
-        if word.endswith('ar'):
-            patterns['ar_suffix']['count'] += freq
-            if len(patterns['ar_suffix']['examples']) < 10:
-                patterns['ar_suffix']['examples'].append(word)
-    
-    return patterns
+def detect_grammar_patterns(word_freq, rule_sets=None):
+    """Detect potential grammatical patterns (the 'grammar' affix rule set)"""
+    rule_sets = rule_sets or load_rules()
+    scanned = AffixMatcher(rule_sets['grammar']).scan(word_freq)
+    return {name: {'count': data['count'], 'examples': data['examples']}
+            for name, data in scanned.items()}
+
+# Reference language the Romance-shorthand hypothesis (H4) is measured against
+ROMANCE_REFERENCE = 'Italian'
 
 def hypothesis_generator(stats, patterns, entropy_compare):
-    """Generate linguistic hypotheses based on analysis"""
+    """
+    Generate linguistic hypotheses based on analysis.
+
+    Figures come from the Track A statistics and the reference profiles in
+    entropy_compare ((entropy, word length) by language, as returned by
+    compare_with_languages); comparisons with a language that has no
+    profile are left out.
+    """
     hypotheses = []
+    summary = stats['summary']
+    entropy, word_length = entropy_compare
+    voynich_entropy = entropy['Voynich']
+    voynich_length = word_length['Voynich']
+    references = {lang: ent for lang, ent in entropy.items() if lang != 'Voynich'}
+    top_words = list(stats.get('word_frequency', {}).items())
+    top_bigrams = list(stats.get('bigrams', {}).items())[:2]
     
     # Hypothesis 1: Constructed language
-    voynich_entropy = entropy_compare[0]['Voynich']
     if voynich_entropy < 4.0:
+        entropy_evidence = f"Low entropy ({voynich_entropy:.2f})"
+        if references:
+            lowest, highest = min(references.values()), max(references.values())
+            entropy_evidence += (f" against {lowest:.2f}-{highest:.2f} in the "
+                                 f"{len(references)} reference languages")
         hypotheses.append({
             'id': 'H1',
             'title': 'Constructed/Artificial Language',
             'evidence': [
-                f"Low entropy ({voynich_entropy}) closer to constructed languages (3.5) than natural (4.0-4.5)",
+                entropy_evidence,
                 "Highly regular morphological patterns",
-                "Limited alphabet (28 unique letters)",
+                f"Limited alphabet ({summary['unique_letters']} unique letters)",
                 "Zipf deviation suggests artificial word frequency distribution"
             ],
             'confidence': 'HIGH',
@@ -159,15 +176,18 @@ def hypothesis_generator(stats, patterns, entropy_compare):
         })
     
     # Hypothesis 2: Steganographic encoding
+    evidence = [
+        "Word patterns suggest underlying structure",
+        "'qo' prefix might encode articles/prepositions",
+        "Suffix patterns (-dy, -aiin) might encode grammatical cases"
+    ]
+    if top_words:
+        word, count = top_words[0]
+        evidence.append(f"Top word '{word}' ({count}x) could be encoded function word")
     hypotheses.append({
         'id': 'H2',
         'title': 'Encoded Natural Language (Steganography)',
-        'evidence': [
-            "Word patterns suggest underlying structure",
-            "'qo' prefix might encode articles/prepositions",
-            "Suffix patterns (-dy, -aiin) might encode grammatical cases",
-            f"Top word 'daiin' (799x) could be encoded function word"
-        ],
+        'evidence': evidence,
         'confidence': 'MEDIUM',
         'counter_evidence': [
             "No consistent mapping to any known cipher system",
@@ -176,15 +196,19 @@ def hypothesis_generator(stats, patterns, entropy_compare):
     })
     
     # Hypothesis 3: Polyphonic encoding
+    evidence = [
+        "EVA 'characters' might represent syllables or phonemes",
+        "'ch', 'sh', 'qo' as digraphs suggest phonetic units",
+        f"Low unique letter count ({summary['unique_letters']}) but high unique words "
+        f"({summary['unique_words']})"
+    ]
+    if top_bigrams:
+        pairs = ", ".join(f"{bigram}={count}" for bigram, count in top_bigrams)
+        evidence.append(f"Consistent bigram patterns ({pairs})")
     hypotheses.append({
         'id': 'H3',
         'title': 'Polyphonic/Multi-value System',
-        'evidence': [
-            "EVA 'characters' might represent syllables or phonemes",
-            "'ch', 'sh', 'qo' as digraphs suggest phonetic units",
-            "Low unique letter count (28) but high unique words (8381)",
-            "Consistent bigram patterns (ch=11007, he=8198)"
-        ],
+        'evidence': evidence,
         'confidence': 'MEDIUM',
         'counter_evidence': [
             "Would require unknown phonetic mapping"
@@ -192,58 +216,87 @@ def hypothesis_generator(stats, patterns, entropy_compare):
     })
     
     # Hypothesis 4: Proto-Romance with shorthand
+    length_evidence = f"Average word length ({voynich_length:.2f})"
+    counter_evidence = ["No clear Latin/Italian vocabulary matches"]
+    if ROMANCE_REFERENCE in references:
+        length_evidence += f" against {ROMANCE_REFERENCE} ({word_length[ROMANCE_REFERENCE]:.2f})"
+        reference_entropy = references[ROMANCE_REFERENCE]
+        direction = 'lower' if voynich_entropy < reference_entropy else 'higher'
+        counter_evidence.append(f"Entropy {direction} than {ROMANCE_REFERENCE} "
+                                f"({voynich_entropy:.2f} vs {reference_entropy:.2f})")
     hypotheses.append({
         'id': 'H4',
         'title': 'Medieval Italian/Romance with Abbreviation System',
         'evidence': [
-            f"Average word length (5.04) close to Italian (4.8)",
+            length_evidence,
             "Suffix patterns similar to Romance conjugation",
             "Historical context (15th century Italy) supports",
             "Some botanical terms may correlate with Italian herbals"
         ],
         'confidence': 'LOW-MEDIUM',
-        'counter_evidence': [
-            "No clear Latin/Italian vocabulary matches",
-            "Entropy significantly lower than Italian (3.87 vs 4.2)"
-        ]
+        'counter_evidence': counter_evidence
     })
     
     return hypotheses
 
-def main():
+def main(stats_path=None, output_file=None, rules_path=None, capture=None, reference_dir=None):
+    if output_file is None:
+        output_file = Path(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos\voynich_linguistics.json")
+    
     print("=" * 60)
     print("VOYNICH MANUSCRIPT LINGUISTIC ANALYSIS")
     print("AIDols Finale - Track B: Comparative Linguistics")
     print("=" * 60)
+    metrics = StageMetrics(capture)
     
     # Load statistics
-    stats = load_statistics()
-    word_freq = stats['word_frequency']
+    metrics.step('load')
+    stats = load_statistics(stats_path)
+    word_freq, type_source = load_type_frequencies(stats)
+    rule_sets = load_rules(rules_path)
     
+    metrics.step('morphology')
     print("\n[1] Morphological Analysis...")
-    prefix_counts, suffix_counts, root_patterns = analyze_word_structure(word_freq)
+    print(f"    Word types: {len(word_freq):,} (from {type_source})")
+    prefix_nodes, suffix_nodes = build_affix_tries(word_freq)
+    prefix_counts, suffix_counts, root_patterns = analyze_word_structure(
+        word_freq, tries=(prefix_nodes, suffix_nodes), rule_sets=rule_sets)
     print(f"    Top 10 prefixes: {prefix_counts.most_common(10)}")
     print(f"    Top 10 suffixes: {suffix_counts.most_common(10)}")
     print(f"    Root pattern families: {len(root_patterns)}")
+    families = family_report(NeighborIndex(word_freq, max_distance=1), word_freq, max_distance=1)
+    print(f"    Orthographic families (edit distance 1): {families['families']:,} "
+          f"covering {families['words_in_families']:,} types")
     
+    metrics.step('language_comparison')
     print("\n[2] Language Comparison...")
-    entropy_compare, length_compare = compare_with_languages()
+    reference_dir = Path(reference_dir or REFERENCE_DIR)
+    profiles, profiled = build_profiles(reference_dir)
+    if profiles:
+        print(f"    Reference corpora: {len(profiles)} ({profiled} profiled, "
+              f"{len(profiles) - profiled} cached)")
+    else:
+        print(f"    No reference corpora in {reference_dir} (plain-text <Language>.txt files)")
+    entropy_compare, length_compare = compare_with_languages(stats, profiles)
     print("    Entropy comparison:")
     for lang, ent in sorted(entropy_compare.items(), key=lambda x: x[1]):
         marker = " ← VOYNICH" if lang == 'Voynich' else ""
         print(f"        {lang}: {ent:.2f}{marker}")
     
+    metrics.step('positional')
     print("\n[3] Positional Analysis...")
     first_l, second_l, last_l = analyze_positional_patterns(word_freq)
     print(f"    Most common first letters: {first_l.most_common(5)}")
     print(f"    Most common last letters: {last_l.most_common(5)}")
     
+    metrics.step('grammar_patterns')
     print("\n[4] Grammar Pattern Detection...")
-    patterns = detect_grammar_patterns(word_freq)
+    patterns = detect_grammar_patterns(word_freq, rule_sets)
     for name, data in sorted(patterns.items(), key=lambda x: -x[1]['count']):
         print(f"    {name}: {data['count']} occurrences")
         print(f"        Examples: {data['examples'][:5]}")
     
+    metrics.step('hypotheses')
     print("\n[5] Generating Hypotheses...")
     hypotheses = hypothesis_generator(stats, patterns, (entropy_compare, length_compare))
     
@@ -261,13 +314,20 @@ def main():
             print(f"      - {c}")
     
     # Save results
+    metrics.step('compile_results')
     output = {
         'track': 'B',
         'analysis_type': 'Comparative Linguistics',
         'morphology': {
             'top_prefixes': dict(prefix_counts.most_common(20)),
             'top_suffixes': dict(suffix_counts.most_common(20)),
-            'root_families_count': len(root_patterns)
+            'root_families_count': len(root_patterns),
+            'orthographic_families_count': families['families'],
+            'orthographic_families': families['top'],
+            'word_types': len(word_freq),
+            'type_source': type_source,
+            'prefixes_by_length': affixes_by_length(prefix_nodes),
+            'suffixes_by_length': affixes_by_length(suffix_nodes)
         },
         'positional': {
             'first_letters': dict(first_l.most_common(10)),
@@ -277,16 +337,22 @@ def main():
         'grammar_patterns': {k: {'count': v['count'], 'examples': v['examples']} for k, v in patterns.items()},
         'language_comparison': {
             'entropy': entropy_compare,
-            'word_length': length_compare
+            'word_length': length_compare,
+            'reference_dir': str(reference_dir),
+            'profiles': {'Voynich': profile_words(word_freq), **profiles}
         },
         'hypotheses': hypotheses
     }
+    output['metrics'] = metrics.finish()
     
-    output_file = Path(r"C:\Users\Jeffrey\.gemini\antigravity\playground\magnetic-cosmos\voynich_linguistics.json")
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(output, f, indent=2, ensure_ascii=False)
     print(f"\n[✓] Results saved to: {output_file}")
     
+    print("\n    Stage costs:")
+    for line in format_metrics(output['metrics']):
+        print(line)
+    
     print("\n" + "=" * 60)
     print("TRACK B COMPLETE")
     print("=" * 60)
@@ -294,4 +360,10 @@ def main():
     return output
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Track B comparative linguistics")
+    parser.add_argument('stats_path', nargs='?')
+    parser.add_argument('output_file', nargs='?')
+    parser.add_argument('--rules', default=None,
+                        help="affix rule file (default: affix_rules.json next to the scripts)")
+    args = parser.parse_args()
+    main(args.stats_path, args.output_file, rules_path=args.rules)
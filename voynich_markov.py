@@ -0,0 +1,342 @@
+"""
+Voynich Markov Language Models
+Smoothed glyph and word n-gram models, conditional entropies and perplexity
+
+Every position of a symbol stream (glyphs with the word break as a symbol,
+or word IDs) gets one packed uint64 key per context length j = 0..order:
+the previous j symbols and the symbol itself, with contexts reaching past
+the start of the page filled by a padding symbol. Counting a level is then
+one np.unique over its key array, and a CountTable (sorted keys + counts,
+looked up with searchsorted) replaces nested context dicts. Contexts are
+the high bits of their keys, so context totals and follower counts come
+from the same sorted table with one reduceat.
+
+Probabilities interpolate each order with the next lower one, down to a
+uniform distribution over the symbol set. With T(h) the number of
+distinct followers of context h:
+
+    absolute      p_j(w | h) = (max(c(h, w) - D, 0) + D T(h) p_{j-1}(w | h')) / c(h)
+                  with D = n1 / (n1 + 2 n2) from the level's count-of-counts
+    kneser-ney    as absolute, but below the top order c(h, w) counts the
+                  distinct symbols seen before h w instead of its occurrences
+                  (interpolated Kneser-Ney, the default)
+    witten-bell   p_j(w | h) = (c(h, w) + T(h) p_{j-1}(w | h')) / (c(h) + T(h))
+
+Unseen contexts fall back to p_{j-1}. All orders 0..N are scored together
+in one pass over the levels.
+
+    h_n   plug-in conditional entropy of a symbol given the n-1 before it
+          (h1 is the unigram entropy), on the whole text
+    perplexity   2^(held-out bits per symbol) under page-level k-fold
+          cross-validation: the pages are shuffled into k folds and each
+          fold is scored by models counted on the other k-1
+
+    python voynich_markov.py voynich_ZL3b.txt voynich_RF1b.txt --folds 5
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from voynich_corpus import load_corpus
+from voynich_glyphs import GlyphScheme, load_schemes
+from voynich_index import select
+
+GLYPH_ORDER = 6
+WORD_ORDER = 3
+FOLDS = 5
+
+SMOOTHING_METHODS = ('kneser-ney', 'absolute', 'witten-bell')
+SMOOTHING = 'kneser-ney'
+
+
+class CountTable:
+    """Sparse counts of packed uint64 keys, sorted for searchsorted lookup"""
+
+    def __init__(self, keys, counts):
+        self.keys = keys
+        self.counts = counts
+
+    @classmethod
+    def from_keys(cls, keys):
+        keys, counts = np.unique(keys, return_counts=True)
+        return cls(keys, counts.astype(np.int64))
+
+    def lookup(self, query):
+        """Count of every query key (0 when absent)"""
+        if not len(self.keys):
+            return np.zeros(len(query), dtype=np.int64)
+        idx = np.searchsorted(self.keys, query)
+        idx[idx == len(self.keys)] = 0
+        return np.where(self.keys[idx] == query, self.counts[idx], 0)
+
+    def contexts(self, bits):
+        """(context table, follower-type table) of a joint (context, symbol) table"""
+        ctx = self.keys >> np.uint64(bits)
+        if not len(ctx):
+            empty = np.zeros(0, dtype=np.int64)
+            return CountTable(ctx, empty), CountTable(ctx, empty)
+        starts = np.flatnonzero(np.concatenate(([True], ctx[1:] != ctx[:-1])))
+        totals = np.add.reduceat(self.counts, starts)
+        types = np.diff(np.append(starts, len(ctx)))
+        return CountTable(ctx[starts], totals), CountTable(ctx[starts], types)
+
+
+def symbol_bits(num_symbols):
+    """Bits per symbol, leaving room for the padding symbol num_symbols"""
+    return max(1, int(num_symbols).bit_length())
+
+
+def level_keys(symbols, page_ids, order, num_symbols):
+    """
+    Packed (context, symbol) keys of every position for context lengths 0..order.
+
+    The most recent context symbol sits just above the symbol itself, so
+    key >> bits is the context key of the same level.
+    """
+    bits = symbol_bits(num_symbols)
+    if (order + 1) * bits > 64:
+        raise ValueError(f"order {order} with {bits}-bit symbols exceeds 64-bit keys")
+    symbols = np.asarray(symbols, dtype=np.uint64)
+    page_ids = np.asarray(page_ids)
+    n = len(symbols)
+    shift = np.uint64(bits)
+    pad = np.uint64(num_symbols)
+
+    keys = [symbols.copy()]
+    context = np.zeros(n, dtype=np.uint64)
+    for j in range(1, order + 1):
+        previous = np.full(n, pad, dtype=np.uint64)
+        same_page = page_ids[j:] == page_ids[:-j] if j < n else np.zeros(0, dtype=bool)
+        previous[j:][same_page] = symbols[:-j][same_page]
+        context = context | (previous << np.uint64((j - 1) * bits))
+        keys.append((context << shift) | symbols)
+    return keys, bits
+
+
+def _discount(counts):
+    """Absolute discount D = n1 / (n1 + 2 n2) from the count-of-counts"""
+    n1 = int(np.count_nonzero(counts == 1))
+    n2 = int(np.count_nonzero(counts == 2))
+    if not n1:
+        return 0.5
+    return n1 / (n1 + 2 * n2)
+
+
+class MarkovModel:
+    """Interpolated models of every order 0..order, counted from level keys"""
+
+    def __init__(self, keys, bits, num_symbols, positions=None, smoothing=SMOOTHING):
+        if smoothing not in SMOOTHING_METHODS:
+            raise ValueError(f"Unknown smoothing {smoothing!r}; expected one of {SMOOTHING_METHODS}")
+        self.bits = bits
+        self.num_symbols = num_symbols
+        self.smoothing = smoothing
+        tables = [CountTable.from_keys(level if positions is None else level[positions])
+                  for level in keys]
+        self.levels = [self._level(joint) for joint in tables]
+        self.lower = self.levels
+        if smoothing == 'kneser-ney':
+            # Below the top order, a gram counts the distinct symbols seen before it
+            mask = [np.uint64((1 << ((j + 1) * bits)) - 1) for j in range(len(tables) - 1)]
+            self.lower = [self._level(CountTable.from_keys(tables[j + 1].keys & mask[j]))
+                          for j in range(len(tables) - 1)]
+
+    def _level(self, joint):
+        totals, types = joint.contexts(self.bits)
+        return joint, totals, types, _discount(joint.counts)
+
+    @property
+    def order(self):
+        return len(self.levels) - 1
+
+    def _smooth(self, level, query, context, p):
+        """Interpolate one level's counts with the lower-order probabilities p"""
+        joint, totals, types, discount = level
+        c_hw = joint.lookup(query)
+        c_h = totals.lookup(context)
+        t_h = types.lookup(context)
+        if self.smoothing == 'witten-bell':
+            smoothed = (c_hw + t_h * p) / np.maximum(c_h + t_h, 1)
+        else:
+            smoothed = (np.maximum(c_hw - discount, 0) + discount * t_h * p) / np.maximum(c_h, 1)
+        return np.where(c_h > 0, smoothed, p)
+
+    def log2_probs(self, keys, positions=None):
+        """
+        (order + 1, positions) array of log2 p under the order 0..N models.
+
+        Row k is the order-k model itself: its own counts at level k over the
+        lower-order chain (continuation counts for Kneser-Ney).
+        """
+        shift = np.uint64(self.bits)
+        n = len(keys[0]) if positions is None else len(positions)
+        p = np.full(n, 1.0 / self.num_symbols)
+        rows = []
+        for j, level in enumerate(keys):
+            query = level if positions is None else level[positions]
+            context = query >> shift
+            top = self._smooth(self.levels[j], query, context, p)
+            rows.append(np.log2(top))
+            if j < self.order:
+                p = top if self.lower is self.levels else self._smooth(self.lower[j], query, context, p)
+        return np.array(rows)
+
+
+def conditional_entropies(keys, bits):
+    """Plug-in h1..h(order+1): H(context + symbol) - H(context) per level"""
+    def entropy(counts):
+        p = counts / counts.sum()
+        return float(-(p * np.log2(p)).sum())
+
+    result = {}
+    for j, level in enumerate(keys):
+        joint = CountTable.from_keys(level)
+        totals, _ = joint.contexts(bits)
+        result[f'h{j + 1}'] = round(entropy(joint.counts) - entropy(totals.counts), 4)
+    return result
+
+
+def page_folds(page_ids, folds, seed=0):
+    """Position arrays of k page-level folds (pages shuffled, then split)"""
+    pages = np.unique(page_ids)
+    rng = np.random.default_rng(seed)
+    groups = np.array_split(rng.permutation(pages), min(folds, len(pages)))
+    return [np.flatnonzero(np.isin(page_ids, group)) for group in groups]
+
+
+def cross_validate(keys, bits, num_symbols, page_ids, folds=FOLDS, seed=0, smoothing=SMOOTHING):
+    """Held-out bits per symbol and perplexity of each order, pooled over folds"""
+    test_sets = page_folds(page_ids, folds, seed)
+    if len(test_sets) < 2:
+        return None
+    n = len(page_ids)
+    total_bits = np.zeros(len(keys))
+    per_fold = []
+    for test in test_sets:
+        train = np.setdiff1d(np.arange(n), test, assume_unique=True)
+        model = MarkovModel(keys, bits, num_symbols, train, smoothing)
+        bits_used = -model.log2_probs(keys, test).sum(axis=1)
+        total_bits += bits_used
+        per_fold.append(bits_used / len(test))
+    per_fold = np.array(per_fold)
+    cross_entropy = total_bits / n
+    return {order: {'bits_per_symbol': round(float(cross_entropy[order]), 4),
+                    'perplexity': round(float(2 ** cross_entropy[order]), 4),
+                    'fold_std': round(float(per_fold[:, order].std()), 4)}
+            for order in range(len(keys))}
+
+
+def glyph_sequence(corpus, scheme=None):
+    """Glyph codes of the running text (each word followed by a break), their page IDs and alphabet"""
+    scheme = scheme or GlyphScheme('raw', [])
+    flat, offsets, alphabet = scheme.encode_types(corpus.vocab)
+    tokens = np.asarray(corpus.tokens, dtype=np.int64)
+    starts = offsets[tokens]
+    lengths = offsets[tokens + 1] - starts
+    out = np.concatenate(([0], np.cumsum(lengths)))
+    symbols = flat[np.repeat(starts - out[:-1], lengths) + np.arange(out[-1])]
+    return symbols, np.repeat(token_pages(corpus), lengths), alphabet
+
+
+def token_pages(corpus):
+    """Page ID of every token (-1 before the first page header)"""
+    return np.repeat(np.asarray(corpus.line_page), np.diff(np.asarray(corpus.line_offsets)))
+
+
+def sequence_report(symbols, page_ids, num_symbols, order, folds=FOLDS, seed=0,
+                    smoothing=SMOOTHING):
+    """Entropies and cross-validated perplexities of one symbol stream"""
+    if not len(symbols):
+        return None
+    keys, bits = level_keys(symbols, page_ids, order, num_symbols)
+    return {
+        'tokens': int(len(symbols)),
+        'symbols': int(num_symbols),
+        'entropy': conditional_entropies(keys, bits),
+        'perplexity': cross_validate(keys, bits, num_symbols, page_ids, folds, seed, smoothing),
+    }
+
+
+def markov_report(corpus, glyph_order=GLYPH_ORDER, word_order=WORD_ORDER, folds=FOLDS,
+                  seed=0, scheme=None, smoothing=SMOOTHING):
+    """Glyph and word model report of a corpus"""
+    symbols, glyph_pages, alphabet = glyph_sequence(corpus, scheme)
+    words, word_ids = np.unique(np.asarray(corpus.tokens), return_inverse=True)
+    return {
+        'glyph': sequence_report(symbols, glyph_pages, len(alphabet), glyph_order, folds, seed,
+                                 smoothing),
+        'word': sequence_report(word_ids.ravel(), token_pages(corpus), len(words), word_order,
+                                folds, seed, smoothing),
+    }
+
+
+def section_reports(corpus, section_var='I', **options):
+    """markov_report for the pages of every value of a header variable"""
+    values = sorted({meta[section_var] for meta in corpus.page_meta if section_var in meta})
+    return {value: markov_report(select(corpus, f'${section_var}={value}'), **options)
+            for value in values}
+
+
+def _print_report(label, report):
+    for unit in ('glyph', 'word'):
+        r = report[unit]
+        if r is None:
+            continue
+        entropies = ' '.join(f"{k}={v:.3f}" for k, v in r['entropy'].items())
+        print(f"    {label:<12} {unit:<5} {r['tokens']:>8,} tokens  {entropies}")
+        if r['perplexity']:
+            ppl = ' '.join(f"{k}:{v['perplexity']:.2f}" for k, v in r['perplexity'].items())
+            print(f"    {'':<12} {'':<5} perplexity by order  {ppl}")
+
+
+def main():
+    default = Path(__file__).with_name('voynich_ZL3b.txt')
+    parser = argparse.ArgumentParser(description="Glyph and word Markov models with cross-validated perplexity")
+    parser.add_argument('paths', nargs='*', default=[str(default), str(default.with_name('voynich_RF1b.txt'))])
+    parser.add_argument('--glyph-order', type=int, default=GLYPH_ORDER)
+    parser.add_argument('--word-order', type=int, default=WORD_ORDER)
+    parser.add_argument('--folds', type=int, default=FOLDS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--smoothing', choices=SMOOTHING_METHODS, default=SMOOTHING)
+    parser.add_argument('--section-var', default='I', help="page header variable defining sections")
+    parser.add_argument('--scheme', default=None, help="glyph scheme name from glyph_schemes.json")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH MARKOV LANGUAGE MODELS")
+    print("=" * 60)
+
+    scheme = None
+    if args.scheme:
+        scheme = GlyphScheme(args.scheme, load_schemes()[args.scheme])
+    options = {'glyph_order': args.glyph_order, 'word_order': args.word_order,
+               'folds': args.folds, 'seed': args.seed, 'scheme': scheme,
+               'smoothing': args.smoothing}
+
+    results = {}
+    started = time.perf_counter()
+    for i, path in enumerate(args.paths, 1):
+        print(f"\n[{i}] {Path(path).name}")
+        corpus = load_corpus(path)
+        reports = {'all': markov_report(corpus, **options)}
+        reports.update(section_reports(corpus, args.section_var, **options))
+        for name, report in reports.items():
+            _print_report(name if name == 'all' else f"${args.section_var}={name}", report)
+        results[Path(path).name] = reports
+    print(f"\n    Sweep time: {time.perf_counter() - started:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[✓] Results saved to: {args.output}")
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
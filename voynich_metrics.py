@@ -0,0 +1,207 @@
+"""
+Voynich Stage Metrics
+Per-step wall time, CPU time, memory and allocation counters for the mains
+
+The analysis mains mark each numbered step with metrics.step(name); the
+previous step is closed at that point and finish() closes the last one and
+returns the 'metrics' block written to the output JSON:
+
+    {'capture': None, 'wall_seconds': ..., 'cpu_seconds': ...,
+     'stages': {name: {'wall_seconds', 'cpu_seconds', 'peak_rss',
+                       'rss_growth', 'allocated_blocks', ...}}}
+
+peak_rss is the process high-water mark at the end of the step and
+rss_growth how far the step raised it (both None where the platform offers
+neither the resource module nor GetProcessMemoryInfo); allocated_blocks is the net change
+in live Python memory blocks. These are cheap enough to be always on.
+
+An optional capture mode adds detail at a cost in speed:
+    'cprofile'     the functions with the most cumulative time per step
+    'tracemalloc'  the allocation peak and largest allocation sites per step
+The mains take it from the VOYNICH_PROFILE environment variable.
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CAPTURE_MODES = ('cprofile', 'tracemalloc')
+PROFILE_ENV = 'VOYNICH_PROFILE'
+
+# Functions / allocation sites reported per step in capture mode
+TOP_ENTRIES = 15
+
+
+def _windows_memory():
+    """(working set, peak working set) in bytes from GetProcessMemoryInfo, or None"""
+    if sys.platform != 'win32':
+        return None
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD),
+                        ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t),
+                        ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t),
+                        ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters),
+                                                        counters.cb):
+            return None
+        return counters.WorkingSetSize, counters.PeakWorkingSetSize
+    except (OSError, AttributeError):
+        return None
+
+
+def current_rss():
+    """Current resident set size in bytes (Linux /proc or Windows), or None"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    memory = _windows_memory()
+    return memory[0] if memory else None
+
+
+def max_rss():
+    """Peak resident set size of this process so far, in bytes, or None"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    memory = _windows_memory()
+    return memory[1] if memory else None
+
+
+def rss_difference(a, b):
+    """a - b, or None if either is unknown"""
+    return None if a is None or b is None else a - b
+
+
+def capture_mode(capture=None):
+    """Validated capture mode, falling back to $VOYNICH_PROFILE"""
+    if capture is None:
+        capture = os.environ.get(PROFILE_ENV, '')
+    capture = capture.strip().lower() or None
+    if capture is not None and capture not in CAPTURE_MODES:
+        raise ValueError(f"Unknown capture mode {capture!r}; expected one of {CAPTURE_MODES}")
+    return capture
+
+
+def _profile_top(profiler, top):
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:top]
+    return [{'function': f"{os.path.basename(filename)}:{line}({name})",
+             'calls': nc, 'total_seconds': round(tt, 5), 'cumulative_seconds': round(ct, 5)}
+            for (filename, line, name), (cc, nc, tt, ct, callers) in rows]
+
+
+def _allocation_top(before, after, top):
+    diffs = after.compare_to(before, 'lineno')[:top]
+    return [{'site': f"{os.path.basename(d.traceback[0].filename)}:{d.traceback[0].lineno}",
+             'size_diff': d.size_diff, 'count_diff': d.count_diff}
+            for d in diffs if d.size_diff]
+
+
+class StageMetrics:
+    """Step-by-step counters for one run of an analysis main"""
+
+    def __init__(self, capture=None, top=TOP_ENTRIES):
+        self.capture = capture_mode(capture)
+        self.top = top
+        self.stages = {}
+        self._name = None
+        self._started = (time.perf_counter(), time.process_time())
+        self._tracing = False
+        if self.capture == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+    def step(self, name):
+        """Close the running step (if any) and start measuring `name`"""
+        self._close()
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage name {name!r}")
+        self._name = name
+        self._rss = max_rss()
+        self._blocks = sys.getallocatedblocks()
+        if self.capture == 'cprofile':
+            self._profiler = cProfile.Profile()
+        elif self.capture == 'tracemalloc':
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        if self.capture == 'cprofile':
+            self._profiler.enable()
+
+    def _close(self):
+        if self._name is None:
+            return
+        if self.capture == 'cprofile':
+            self._profiler.disable()
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        peak = max_rss()
+        entry = {
+            'wall_seconds': round(wall, 5),
+            'cpu_seconds': round(cpu, 5),
+            'peak_rss': peak,
+            'rss_growth': rss_difference(peak, self._rss),
+            'allocated_blocks': sys.getallocatedblocks() - self._blocks,
+        }
+        if self.capture == 'cprofile':
+            entry['profile'] = _profile_top(self._profiler, self.top)
+            self._profiler = None
+        elif self.capture == 'tracemalloc':
+            entry['peak_alloc'] = tracemalloc.get_traced_memory()[1]
+            entry['top_allocations'] = _allocation_top(self._snapshot, tracemalloc.take_snapshot(),
+                                                       self.top)
+            self._snapshot = None
+        self.stages[self._name] = entry
+        self._name = None
+
+    def finish(self):
+        """Close the last step and return the metrics block"""
+        self._close()
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        wall, cpu = self._started
+        return {
+            'capture': self.capture,
+            'wall_seconds': round(time.perf_counter() - wall, 5),
+            'cpu_seconds': round(time.process_time() - cpu, 5),
+            'peak_rss': max_rss(),
+            'stages': self.stages,
+        }
+
+
+def format_metrics(metrics):
+    """One line per stage, slowest share first ('n/a' where RSS is unavailable)"""
+    total = metrics['wall_seconds'] or 1.0
+    lines = []
+    for name, entry in sorted(metrics['stages'].items(), key=lambda x: -x[1]['wall_seconds']):
+        growth = entry.get('rss_growth')
+        rss = "n/a" if growth is None else f"+{growth / 2**20:.1f} MiB"
+        lines.append(f"    {name:<24} {entry['wall_seconds']:>9.3f}s "
+                     f"({entry['wall_seconds'] / total:>6.1%})  cpu {entry['cpu_seconds']:>8.3f}s  "
+                     f"{rss} RSS")
+    return lines
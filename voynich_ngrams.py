@@ -0,0 +1,142 @@
+"""
+Voynich Vectorized N-gram Engine
+Glyph n-gram counting on uint8 code arrays
+
+The text is encoded once as a uint8 array (0 = word boundary, 1..K = glyphs).
+Each n-gram window is packed into a single uint64 key by shifting in one code
+at a time, so every order 1..N is derived from the previous one in a single
+pass and counted with np.unique. Windows that touch a word boundary are
+masked out, matching the '.'-exclusion rule of the original string loop.
+
+A code may also stand for a multi-character glyph such as 'ch' (see
+voynich_glyphs); such glyphs are written in parentheses inside n-gram
+names, e.g. '(ch)e', so that every name spells one code sequence.
+"""
+
+from collections import Counter
+
+import numpy as np
+
+BOUNDARY = '.'
+
+
+def encode_glyphs(words):
+    """
+    Encode '.'-joined words as uint8 glyph codes.
+
+    Returns (codes, alphabet) where alphabet[code] is the glyph string and
+    code 0 is the word boundary.
+    """
+    text = BOUNDARY.join(words)
+    points = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    uniq, inverse = np.unique(points, return_inverse=True)
+
+    # Move the boundary to code 0 and shift glyphs to 1..K
+    boundary = ord(BOUNDARY)
+    glyphs = [chr(p) for p in uniq.tolist() if p != boundary]
+    if len(glyphs) > 255:
+        raise ValueError(f"{len(glyphs)} distinct glyphs do not fit uint8 codes")
+    remap = np.empty(len(uniq), dtype=np.uint8)
+    code = 1
+    for i, p in enumerate(uniq.tolist()):
+        if p == boundary:
+            remap[i] = 0
+        else:
+            remap[i] = code
+            code += 1
+    codes = remap[inverse.ravel()] if len(uniq) else np.zeros(0, dtype=np.uint8)
+    return codes, [BOUNDARY] + glyphs
+
+
+def _bits_per_glyph(alphabet):
+    """Bits needed to hold one glyph code"""
+    return max(1, (len(alphabet) - 1).bit_length())
+
+
+def count_ngrams(codes, alphabet, max_n, min_n=1, weights=None):
+    """
+    Count glyph n-grams of every order min_n..max_n in one pass.
+
+    Returns {n: Counter} with n-gram strings as keys. Counters are filled in
+    first-occurrence order so most_common() ties resolve exactly as they did
+    with the string-slicing loop. With per-code weights each window counts
+    the weight of its first code instead of 1 (float counts).
+    """
+    bits = _bits_per_glyph(alphabet)
+    if max_n * bits > 64:
+        raise ValueError(f"order {max_n} with {bits}-bit glyphs exceeds 64-bit keys")
+
+    codes = np.asarray(codes, dtype=np.uint8)
+    length = len(codes)
+    is_boundary = np.concatenate(([0], np.cumsum(codes == 0)))
+    name = _gram_namer(codes, alphabet)
+
+    results = {}
+    keys = np.zeros(length, dtype=np.uint64)
+    shift = np.uint64(bits)
+    for n in range(1, max_n + 1):
+        windows = length - n + 1
+        if windows <= 0:
+            for m in range(max(n, min_n), max_n + 1):
+                results[m] = Counter()
+            break
+
+        # key of window i = key_{n-1}(i) << bits | codes[i + n - 1]
+        keys = (keys[:windows] << shift) | codes[n - 1:].astype(np.uint64)
+        if n < min_n:
+            continue
+
+        valid = (is_boundary[n:] - is_boundary[:windows]) == 0
+        positions = np.flatnonzero(valid)
+        results[n] = _keys_to_counter(keys[positions], positions, n, name,
+                                      None if weights is None else weights[positions])
+
+    return results
+
+
+def glyph_labels(alphabet):
+    """Label of each code inside an n-gram name; multi-character glyphs are parenthesised"""
+    return [g if len(g) == 1 else f'({g})' for g in alphabet]
+
+
+def _gram_namer(codes, alphabet):
+    """name(start, n) of the n-gram at a position, by slicing the decoded text"""
+    if all(len(g) == 1 for g in alphabet):
+        text = decode_glyphs(codes, alphabet)
+        return lambda i, n: text[i:i + n]
+    labels = glyph_labels(alphabet)
+    seq = np.asarray(codes, dtype=np.uint8).tolist()
+    return lambda i, n: ''.join([labels[c] for c in seq[i:i + n]])
+
+
+def _keys_to_counter(keys, positions, n, name, weights=None):
+    """Count packed keys, naming each n-gram at its first occurrence"""
+    if weights is None:
+        uniq, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    else:
+        uniq, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        counts = np.bincount(inverse.ravel(), weights=weights, minlength=len(uniq))
+    order = np.argsort(first, kind='stable')
+    starts = positions[first[order]].tolist()
+    grams = [name(i, n) for i in starts]
+    return Counter(dict(zip(grams, counts[order].tolist())))
+
+
+def decode_glyphs(codes, alphabet):
+    """Turn a code array of single-character glyphs back into its '.'-joined text"""
+    table = {i: g for i, g in enumerate(alphabet)}
+    return np.asarray(codes, dtype=np.uint8).tobytes().decode('latin-1').translate(table)
+
+
+def ngram_counts(words, max_n, min_n=1, weights=None):
+    """
+    Glyph n-gram Counters of orders min_n..max_n for a word list.
+
+    weights (one per word) turn the counts into weighted sums, e.g. expected
+    counts over a table of word readings.
+    """
+    codes, alphabet = encode_glyphs(words)
+    if weights is not None:
+        lengths = np.array([len(w) + 1 for w in words], dtype=np.int64)
+        weights = np.repeat(np.asarray(weights, dtype=np.float64), lengths)[:len(codes)]
+    return count_ngrams(codes, alphabet, max_n, min_n, weights)
@@ -0,0 +1,473 @@
+"""
+Voynich Corpus Query Daemon
+Resident transliterations answering frequency, n-gram, entropy and Jaccard queries
+
+Loads one or more IVTFF files once and serves JSON over localhost HTTP (or
+a Unix socket), so notebooks and dashboards stop paying the parse and count
+time on every call:
+
+    GET /files
+    GET /frequency?word=daiin&subset=$L=B
+    GET /top?n=20&subset=$I=H
+    GET /ngrams?n=2&top=20               (glyph n-grams; unit=word for word n-grams)
+    GET /entropy?subset=$L=A&window=1000
+    GET /jaccard?subset=$L=B
+    GET /kwic?pattern=qok*&limit=20
+    GET /reload?file=voynich_RF1b        (also automatic when a file changes)
+    GET /cache
+
+Every query takes file=<name> (a file stem, default the first file loaded)
+and most take subset=<metadata query> as understood by voynich_index.
+Answers and the per-subset word counts behind them are kept in an LRU
+cache keyed by file version. A watcher thread polls the files; a changed
+file is re-read in the background and swapped in when ready, so queries
+keep being answered from the old version meanwhile.
+
+    python voynich_server.py voynich_ZL3b.txt voynich_RF1b.txt --port 8408
+
+From Python:
+
+    client = QueryClient('http://127.0.0.1:8408')
+    client.query('frequency', word='daiin', subset='$L=B')
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+from voynich_concordance import Concordance
+from voynich_corpus import load_corpus
+from voynich_entropy import entropy_profile, summarize_profile
+from voynich_index import select
+from voynich_ngrams import ngram_counts
+from voynich_significance import consecutive_jaccard, encode_line_words
+
+DEFAULT_PORT = 8408
+CACHE_SIZE = 256
+
+# Seconds between checks of the loaded files for changes
+POLL_SECONDS = 2.0
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache of computed answers"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Cached value of key, computing (outside the lock) and storing it on a miss"""
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        return {'size': len(self.entries), 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses}
+
+
+def file_stamp(path):
+    """(mtime_ns, size) of a file, the change signal for hot reloads"""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class Dataset:
+    """One loaded transliteration; replaced as a whole on reload"""
+
+    def __init__(self, name, path, version=0):
+        self.name = name
+        self.path = Path(path)
+        self.version = version
+        self.stamp = file_stamp(path)
+        self.corpus = load_corpus(path)
+        self.loaded_at = time.time()
+        self._concordance = None
+        self._lock = threading.Lock()
+
+    @property
+    def concordance(self):
+        """Suffix-array index of the full corpus, built on first use"""
+        with self._lock:
+            if self._concordance is None:
+                self._concordance = Concordance(self.corpus)
+            return self._concordance
+
+    def describe(self):
+        return {'file': str(self.path), 'version': self.version,
+                'tokens': len(self.corpus.tokens), 'types': len(self.corpus.vocab),
+                'lines': self.corpus.num_lines, 'pages': len(self.corpus.pages),
+                'loaded_at': self.loaded_at}
+
+
+def _entropy(counts):
+    counts = np.asarray(counts, dtype=np.float64)
+    counts = counts[counts > 0]
+    if not len(counts):
+        return 0.0
+    p = counts / counts.sum()
+    return float(-(p * np.log2(p)).sum())
+
+
+def _word_ngrams(corpus, n, top):
+    """Most frequent word n-grams within lines"""
+    tokens = np.asarray(corpus.tokens, dtype=np.int64)
+    if len(tokens) < n:
+        return []
+    lengths = np.diff(np.asarray(corpus.line_offsets))
+    line = np.repeat(np.arange(len(lengths)), lengths)
+    size = len(corpus.vocab)
+    starts = np.flatnonzero(line[:len(tokens) - n + 1] == line[n - 1:])
+    keys = np.zeros(len(starts), dtype=np.int64)
+    for k in range(n):
+        keys = keys * size + tokens[starts + k]
+    keys.sort()
+    first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[first, len(keys)])
+    order = np.argsort(-counts, kind='stable')[:top]
+    result = []
+    for key, count in zip(keys[first][order].tolist(), counts[order].tolist()):
+        ids = []
+        for _ in range(n):
+            key, wid = divmod(key, size)
+            ids.append(wid)
+        result.append([' '.join(corpus.vocab[i] for i in reversed(ids)), count])
+    return result
+
+
+class QueryService:
+    """
+    Query answering over resident datasets.
+
+    query(endpoint, params) returns a JSON-serialisable dict and raises
+    ValueError for bad parameters or unknown files / endpoints.
+    """
+
+    def __init__(self, paths, cache_size=CACHE_SIZE):
+        if not paths:
+            raise ValueError("QueryService needs at least one file")
+        self.cache = LRUCache(cache_size)
+        self.datasets = {}
+        self._reload_lock = threading.Lock()
+        for path in paths:
+            name = Path(path).stem
+            if name in self.datasets:
+                raise ValueError(f"Two files share the name {name!r}")
+            self.datasets[name] = Dataset(name, path)
+        self.default = next(iter(self.datasets))
+        self.endpoints = {
+            'files': self.files,
+            'frequency': self.frequency,
+            'top': self.top,
+            'ngrams': self.ngrams,
+            'entropy': self.entropy,
+            'jaccard': self.jaccard,
+            'kwic': self.kwic,
+            'reload': self.reload,
+            'cache': self.cache_stats,
+        }
+
+    # -- plumbing ---------------------------------------------------------
+
+    def query(self, endpoint, params):
+        handler = self.endpoints.get(endpoint)
+        if handler is None:
+            raise ValueError(f"Unknown query {endpoint!r}; expected one of {sorted(self.endpoints)}")
+        return handler(**params)
+
+    def dataset(self, name=None):
+        dataset = self.datasets.get(name or self.default)
+        if dataset is None:
+            raise ValueError(f"Unknown file {name!r}; loaded: {sorted(self.datasets)}")
+        return dataset
+
+    def _cached(self, dataset, *key, compute):
+        return self.cache.get((dataset.name, dataset.version) + key, compute)
+
+    def _subset(self, dataset, subset):
+        if not subset:
+            return dataset.corpus
+        return self._cached(dataset, 'subset', subset,
+                            compute=lambda: select(dataset.corpus, subset))
+
+    def _counts(self, dataset, subset):
+        """Word counts by vocabulary ID of a subset"""
+        corpus = self._subset(dataset, subset)
+        return self._cached(dataset, 'counts', subset, compute=lambda: np.bincount(
+            np.asarray(corpus.tokens), minlength=len(dataset.corpus.vocab)))
+
+    # -- queries ----------------------------------------------------------
+
+    def files(self):
+        return {name: d.describe() for name, d in self.datasets.items()}
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+    def frequency(self, word, file=None, subset=None):
+        dataset = self.dataset(file)
+        counts = self._counts(dataset, subset)
+        total = int(counts.sum())
+        wid = dataset.corpus.word_ids.get(word)
+        count = int(counts[wid]) if wid is not None else 0
+        return {'file': dataset.name, 'subset': subset, 'word': word, 'count': count,
+                'total': total, 'per_million': round(count / total * 1e6, 3) if total else 0.0}
+
+    def top(self, n=20, file=None, subset=None):
+        dataset = self.dataset(file)
+
+        def compute():
+            counts = self._counts(dataset, subset)
+            order = np.argsort(-counts, kind='stable')[:int(n)]
+            vocab = dataset.corpus.vocab
+            return {'file': dataset.name, 'subset': subset, 'total': int(counts.sum()),
+                    'top': [[vocab[i], int(counts[i])] for i in order.tolist() if counts[i]]}
+        return self._cached(dataset, 'top', subset, int(n), compute=compute)
+
+    def ngrams(self, n=2, top=20, unit='glyph', file=None, subset=None):
+        dataset = self.dataset(file)
+        n, top = int(n), int(top)
+        if n < 1:
+            raise ValueError("n must be at least 1")
+
+        def compute():
+            corpus = self._subset(dataset, subset)
+            if unit == 'glyph':
+                grams = ngram_counts(corpus.words(), n, min_n=n)[n].most_common(top)
+            elif unit == 'word':
+                grams = _word_ngrams(corpus, n, top)
+            else:
+                raise ValueError(f"Unknown n-gram unit {unit!r}; expected 'glyph' or 'word'")
+            return {'file': dataset.name, 'subset': subset, 'n': n, 'unit': unit,
+                    'top': [list(g) for g in grams]}
+        return self._cached(dataset, 'ngrams', subset, n, top, unit, compute=compute)
+
+    def entropy(self, file=None, subset=None, window=None, stride=None):
+        dataset = self.dataset(file)
+
+        def compute():
+            corpus = self._subset(dataset, subset)
+            counts = self._counts(dataset, subset)
+            letters = Counter()
+            vocab = dataset.corpus.vocab
+            for wid in np.flatnonzero(counts).tolist():
+                for ch in vocab[wid]:
+                    letters[ch] += int(counts[wid])
+            result = {'file': dataset.name, 'subset': subset,
+                      'letter_entropy': round(_entropy(list(letters.values())), 4),
+                      'word_entropy': round(_entropy(counts), 4)}
+            if window:
+                size = int(window)
+                profile = entropy_profile(corpus, size, int(stride or max(size // 2, 1)))
+                result['profile'] = summarize_profile(profile) if len(profile['start']) else {}
+            return result
+        return self._cached(dataset, 'entropy', subset, window, stride, compute=compute)
+
+    def jaccard(self, file=None, subset=None):
+        dataset = self.dataset(file)
+
+        def compute():
+            data = encode_line_words(self._subset(dataset, subset))
+            scores = consecutive_jaccard(data['line'], data['word'], data['num_lines'],
+                                         data['vocab_size'])[0] if data['num_lines'] > 1 else []
+            scores = np.asarray(scores)
+            scores = scores[~np.isnan(scores)]
+            if not len(scores):
+                return {'file': dataset.name, 'subset': subset, 'pairs': 0}
+            return {'file': dataset.name, 'subset': subset, 'pairs': len(scores),
+                    'mean': round(float(scores.mean()), 6),
+                    'median': round(float(np.median(scores)), 6)}
+        return self._cached(dataset, 'jaccard', subset, compute=compute)
+
+    def kwic(self, pattern, width=4, limit=50, file=None):
+        dataset = self.dataset(file)
+
+        def compute():
+            concordance = dataset.concordance
+            return {'file': dataset.name, 'pattern': pattern,
+                    'count': concordance.count(pattern),
+                    'hits': concordance.kwic(pattern, int(width), int(limit))}
+        return self._cached(dataset, 'kwic', pattern, int(width), int(limit), compute=compute)
+
+    # -- reloading --------------------------------------------------------
+
+    def reload(self, file=None, force=True):
+        """Re-read changed (or, with force, the named / all) files; returns the swapped names"""
+        if isinstance(force, str):
+            force = force.strip().lower() not in ('0', 'false', 'no')
+        names = [self.dataset(file).name] if file else list(self.datasets)
+        swapped = []
+        with self._reload_lock:
+            for name in names:
+                current = self.datasets[name]
+                try:
+                    changed = file_stamp(current.path) != current.stamp
+                except OSError:
+                    continue
+                if changed or force:
+                    # Build the replacement first; queries use `current` until the swap
+                    self.datasets[name] = Dataset(name, current.path, current.version + 1)
+                    swapped.append(name)
+        return {'reloaded': swapped}
+
+    def watch(self, interval=POLL_SECONDS):
+        """Start a daemon thread that reloads files as they change"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    result = self.reload(force=False)
+                except Exception as exc:
+                    print(f"    ✗ reload failed: {exc}")
+                    continue
+                for name in result['reloaded']:
+                    print(f"    ↻ reloaded {name} (version {self.datasets[name].version})")
+        thread = threading.Thread(target=loop, name='voynich-watch', daemon=True)
+        thread.start()
+        return thread
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """GET /<query>?param=value -> JSON"""
+
+    service = None
+    verbose = False
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        endpoint = url.path.strip('/') or 'files'
+        params = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+        start = time.perf_counter()
+        try:
+            body = self.service.query(endpoint, params)
+            status = 200
+        except (ValueError, TypeError) as exc:
+            body, status = {'error': str(exc)}, 400
+        except Exception as exc:
+            body, status = {'error': f"{type(exc).__name__}: {exc}"}, 500
+        if isinstance(body, dict):
+            body = dict(body, elapsed_ms=round((time.perf_counter() - start) * 1e3, 3))
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+# Unix sockets are missing on Windows; --socket is then unavailable
+UNIX_SOCKETS = hasattr(socketserver, 'UnixStreamServer')
+
+if UNIX_SOCKETS:
+    class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def get_request(self):
+            request, _ = super().get_request()
+            return request, ('unix', 0)
+
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT, socket_path=None, verbose=False):
+    """HTTP server for a QueryService on localhost or a Unix socket"""
+    handler = type('BoundQueryHandler', (QueryHandler,), {'service': service, 'verbose': verbose})
+    if socket_path:
+        if not UNIX_SOCKETS:
+            raise ValueError("Unix sockets are not supported on this platform; "
+                             "serve on host and port instead")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+class QueryClient:
+    """Minimal client for a running daemon on localhost HTTP"""
+
+    def __init__(self, url=f'http://127.0.0.1:{DEFAULT_PORT}', timeout=30):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def query(self, endpoint, **params):
+        params = {k: v for k, v in params.items() if v is not None}
+        url = f"{self.url}/{endpoint}?{urllib.parse.urlencode(params)}"
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as exc:
+            raise ValueError(json.loads(exc.read().decode('utf-8')).get('error')) from None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve corpus queries from resident transliterations")
+    parser.add_argument('files', nargs='*',
+                        default=[str(Path(__file__).with_name('voynich_ZL3b.txt'))])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', default=None, help="serve on this Unix socket instead")
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+    parser.add_argument('--poll', type=float, default=POLL_SECONDS,
+                        help="seconds between change checks (0 disables hot reload)")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    if args.socket and not UNIX_SOCKETS:
+        parser.error("--socket needs Unix sockets, which this platform lacks; use --host/--port")
+
+    print("=" * 60)
+    print("VOYNICH CORPUS QUERY DAEMON")
+    print("=" * 60)
+
+    print("\n[1] Loading transliterations...")
+    service = QueryService(args.files, args.cache_size)
+    for name, info in service.files().items():
+        print(f"    {name}: {info['tokens']:,} tokens, {info['lines']:,} lines")
+
+    if args.poll > 0:
+        service.watch(args.poll)
+    server = make_server(service, args.host, args.port, args.socket, args.verbose)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"\n[2] Serving on {where} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n    Stopped")
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Voynich Jaccard Significance Engine
+Permutation / null-model p-values for consecutive-line vocabulary overlap
+
+The observed mean consecutive-line Jaccard index is compared against
+shuffled baselines instead of fixed literature thresholds:
+
+    line_shuffle   lines shuffled within each page
+    word_shuffle   tokens shuffled among the positions of one section
+                   (pages sharing a header variable, $I by default)
+    unigram        every token redrawn from the global unigram distribution
+
+Lines are held as integer (word, line) keys. A batch of permutations is
+sorted row-wise in one call; a word shared by line l and line l + 1 then
+shows up as two adjacent keys differing by one, so intersections and set
+sizes are counted with diff/bincount and no Python sets are built.
+
+Batches run on a process pool; every batch has its own seed derived from
+the master seed, so results do not depend on the number of workers. On one
+core 10,000 permutations of all three models take about a minute and a
+half (roughly 3 ms per permutation and model); wall time divides by the
+number of workers.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from voynich_corpus import load_corpus
+
+NULL_MODELS = ('line_shuffle', 'word_shuffle', 'unigram')
+
+# Permutations evaluated together in one vectorized batch
+BATCH_SIZE = 50
+
+
+def encode_line_words(corpus):
+    """
+    Integer form of the non-empty lines used by the Quevedo Jaccard test.
+
+    Returns a dict with per-token 'line' and 'word' arrays (lines renumbered
+    0..L-1 in text order), 'line_page' per line and the vocabulary size.
+    """
+    offsets = np.asarray(corpus.line_offsets)
+    lengths = np.diff(offsets)
+    keep = np.flatnonzero(lengths > 0)
+    token_line = np.repeat(np.arange(len(keep)), lengths[keep])
+    tokens = np.asarray(corpus.subset(keep).tokens, dtype=np.int64)
+    return {
+        'line': token_line.astype(np.int64),
+        'word': tokens,
+        'line_page': np.asarray(corpus.line_page)[keep].astype(np.int64),
+        'num_lines': len(keep),
+        'vocab_size': len(corpus.vocab),
+    }
+
+
+def consecutive_jaccard(token_line, token_word, num_lines, vocab_size):
+    """
+    Jaccard index of every line with the next one.
+
+    token_line / token_word are (replicas, tokens) arrays (1-D for a single
+    text). Keys word * num_lines + line are sorted per replica, which puts
+    (w, l) right before (w, l + 1) whenever both lines contain w, so the
+    intersections are adjacent key pairs differing by exactly one.
+    Returns an array of shape (replicas, num_lines - 1).
+    """
+    token_line = np.atleast_2d(token_line)
+    token_word = np.atleast_2d(token_word)
+    replicas = token_line.shape[0]
+    dtype = np.uint32 if vocab_size * num_lines < 2 ** 32 else np.uint64
+
+    keys = np.sort(token_word.astype(dtype) * dtype(num_lines) + token_line.astype(dtype), axis=1)
+    lines = keys % dtype(num_lines)
+    step = np.diff(keys, axis=1)
+
+    first = np.ones(keys.shape, dtype=bool)
+    first[:, 1:] = step != 0
+    shared = (step == 1) & (lines[:, :-1] != num_lines - 1)
+
+    base = (np.arange(replicas, dtype=np.int64) * num_lines)[:, None]
+    flat_lines = lines.astype(np.int64) + base
+    total = replicas * num_lines
+    sizes = np.bincount(flat_lines[first], minlength=total).reshape(replicas, num_lines)
+    inter = np.bincount(flat_lines[:, :-1][shared], minlength=total).reshape(replicas, num_lines)
+
+    inter = inter[:, :-1]
+    union = sizes[:, :-1] + sizes[:, 1:] - inter
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(union > 0, inter / np.maximum(union, 1), np.nan)
+
+
+def _group_slices(groups):
+    """Index arrays of the members of each group value"""
+    order = np.argsort(groups, kind='stable')
+    bounds = np.flatnonzero(np.diff(groups[order])) + 1
+    return [g for g in np.split(order, bounds) if len(g) > 1]
+
+
+def _shuffle_within(groups, replicas, rng):
+    """replicas x n permutation arrays that only move items within their group"""
+    n = len(groups)
+    perms = np.tile(np.arange(n), (replicas, 1))
+    for members in _group_slices(groups):
+        shuffled = rng.permuted(np.tile(members, (replicas, 1)), axis=1)
+        perms[:, members] = shuffled
+    return perms
+
+
+def _null_batch(model, data, replicas, seed):
+    """Mean consecutive Jaccard of `replicas` samples from one null model"""
+    rng = np.random.default_rng(seed)
+    num_lines = data['num_lines']
+    line = data['line']
+    word = data['word']
+    n_tok = len(word)
+
+    if model == 'line_shuffle':
+        # New position of each line; line contents are unchanged
+        perms = _shuffle_within(data['line_page'], replicas, rng)
+        new_pos = np.empty_like(perms)
+        np.put_along_axis(new_pos, perms, np.arange(num_lines)[None, :], axis=1)
+        token_line = new_pos[:, line]
+        token_word = np.broadcast_to(word, (replicas, n_tok))
+    elif model == 'word_shuffle':
+        perms = _shuffle_within(data['token_section'], replicas, rng)
+        token_line = np.broadcast_to(line, (replicas, n_tok))
+        token_word = word[perms]
+    elif model == 'unigram':
+        token_line = np.broadcast_to(line, (replicas, n_tok))
+        token_word = word[rng.integers(0, n_tok, size=(replicas, n_tok))]
+    else:
+        raise ValueError(f"Unknown null model {model!r}, expected one of {NULL_MODELS}")
+
+    scores = consecutive_jaccard(token_line, token_word, num_lines, data['vocab_size'])
+    return np.nanmean(scores, axis=1)
+
+
+# Null-model data shared with pool workers (set once per process)
+_WORKER_DATA = None
+
+
+def _init_worker(data):
+    global _WORKER_DATA
+    _WORKER_DATA = data
+
+
+def _run_batch(batch):
+    """Worker entry point: evaluate one (model, replicas, seed) batch"""
+    model, replicas, seed = batch
+    return _null_batch(model, _WORKER_DATA, replicas, seed)
+
+
+def jaccard_significance(corpus, permutations=10000, models=NULL_MODELS, section_var='I',
+                         seed=0, workers=None, bootstrap=2000):
+    """
+    Observed mean consecutive-line Jaccard versus shuffled baselines.
+
+    Returns {'observed', 'observed_ci95', 'null_models': {model: {...}}}
+    where each model reports the null mean/std, its 95% interval, and the
+    empirical one-sided p-values (null <= observed, null >= observed).
+    """
+    data = encode_line_words(corpus)
+    page_section = [meta.get(section_var, '?') for meta in corpus.page_meta]
+    section_ids = {s: i for i, s in enumerate(sorted(set(page_section)))}
+    line_section = np.array([section_ids[page_section[p]] if p >= 0 else -1
+                             for p in data['line_page'].tolist()], dtype=np.int64)
+    data['token_section'] = line_section[data['line']]
+
+    scores = consecutive_jaccard(data['line'], data['word'], data['num_lines'],
+                                 data['vocab_size'])[0]
+    scores = scores[~np.isnan(scores)]
+    observed = float(scores.mean())
+
+    # Percentile bootstrap over line pairs for the observed mean
+    rng = np.random.default_rng(seed)
+    boot = scores[rng.integers(0, len(scores), size=(bootstrap, len(scores)))].mean(axis=1)
+
+    # Fixed-size batches with spawned seeds: identical results for any worker count
+    plan = []
+    for model in models:
+        for start in range(0, permutations, BATCH_SIZE):
+            plan.append((model, min(BATCH_SIZE, permutations - start)))
+    seeds = np.random.SeedSequence(seed).spawn(len(plan))
+    batches = [(model, replicas, s) for (model, replicas), s in zip(plan, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(data,)) as pool:
+            results = list(pool.map(_run_batch, batches,
+                                    chunksize=max(1, len(batches) // (4 * workers))))
+    else:
+        _init_worker(data)
+        results = [_run_batch(batch) for batch in batches]
+
+    null = {model: [] for model in models}
+    for (model, _, _), result in zip(batches, results):
+        null[model].append(result)
+
+    report = {
+        'observed': observed,
+        'observed_ci95': [float(np.percentile(boot, 2.5)), float(np.percentile(boot, 97.5))],
+        'pairs': int(len(scores)),
+        'permutations': permutations,
+        'null_models': {},
+    }
+    for model in models:
+        values = np.concatenate(null[model])
+        n = len(values)
+        report['null_models'][model] = {
+            'mean': float(values.mean()),
+            'std': float(values.std(ddof=1)) if n > 1 else 0.0,
+            'ci95': [float(np.percentile(values, 2.5)), float(np.percentile(values, 97.5))],
+            'p_lower': (1 + int((values <= observed).sum())) / (n + 1),
+            'p_upper': (1 + int((values >= observed).sum())) / (n + 1),
+            'z_score': float((observed - values.mean()) / values.std(ddof=1))
+                       if n > 1 and values.std(ddof=1) > 0 else 0.0,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Permutation significance of the Jaccard index")
+    parser.add_argument('filepath', nargs='?', default=str(Path(__file__).with_name('voynich_ZL3b.txt')))
+    parser.add_argument('--permutations', type=int, default=10000)
+    parser.add_argument('--models', default=','.join(NULL_MODELS))
+    parser.add_argument('--section-var', default='I', help="page header variable defining sections")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("JACCARD SIGNIFICANCE (NULL MODELS)")
+    print("=" * 70)
+
+    corpus = load_corpus(args.filepath)
+    models = [m.strip() for m in args.models.split(',') if m.strip()]
+    report = jaccard_significance(corpus, args.permutations, models, args.section_var,
+                                  args.seed, args.workers)
+
+    low, high = report['observed_ci95']
+    print(f"\n    Observed mean Jaccard: {report['observed']:.4f} (95% CI {low:.4f}-{high:.4f})")
+    for model, stats in report['null_models'].items():
+        print(f"    [{model}] null {stats['mean']:.4f} ± {stats['std']:.4f} "
+              f"(95% {stats['ci95'][0]:.4f}-{stats['ci95'][1]:.4f})  "
+              f"p_lower={stats['p_lower']:.4g}  p_upper={stats['p_upper']:.4g}")
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Voynich Line Similarity Matrix
+Vocabulary overlap between lines at every distance, on a sparse backend
+
+Each non-empty line becomes a binary row of a CSR line x word-type matrix.
+Two kinds of comparison are built on it:
+
+    band       lines l and l + k for every lag k = 1..K, one sparse
+               element-wise product per lag
+    all pairs  X @ X.T computed one block of rows at a time; each block's
+               upper triangle is written to disk as a sparse .npz, so memory
+               stays bounded by the block size, not by L^2
+
+Jaccard, cosine and overlap coefficients all follow from the intersection
+size |A & B| and the set sizes |A|, |B|. Pairs without shared words have
+similarity 0 and are not stored.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from voynich_corpus import load_corpus
+
+METRICS = ('jaccard', 'cosine', 'overlap')
+
+
+def line_matrix(corpus):
+    """
+    Binary CSR matrix of word types per non-empty line.
+
+    Returns (X, line_index) where line_index maps each row to its corpus line.
+    """
+    offsets = np.asarray(corpus.line_offsets)
+    lengths = np.diff(offsets)
+    line_index = np.flatnonzero(lengths > 0)
+    rows = np.repeat(np.arange(len(line_index)), lengths[line_index])
+    cols = np.asarray(corpus.subset(line_index).tokens, dtype=np.int64)
+
+    X = sparse.csr_matrix((np.ones(len(cols), dtype=np.int32), (rows, cols)),
+                          shape=(len(line_index), len(corpus.vocab)))
+    X.sum_duplicates()
+    X.data[:] = 1
+    return X, line_index
+
+
+def similarity(inter, size_a, size_b, metric):
+    """Similarity from intersection and set sizes (0 where undefined)"""
+    inter = np.asarray(inter, dtype=np.float64)
+    size_a = np.asarray(size_a, dtype=np.float64)
+    size_b = np.asarray(size_b, dtype=np.float64)
+    if metric == 'jaccard':
+        denom = size_a + size_b - inter
+    elif metric == 'cosine':
+        denom = np.sqrt(size_a * size_b)
+    elif metric == 'overlap':
+        denom = np.minimum(size_a, size_b)
+    else:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {METRICS}")
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denom > 0, inter / np.where(denom > 0, denom, 1), 0.0)
+
+
+def lag_band(X, max_lag=50, metrics=METRICS, line_page=None):
+    """
+    Similarity of every line with the line k positions later, k = 1..max_lag.
+
+    Returns {'lag': [...], metric: (max_lag, L) arrays padded with NaN,
+    and, when line_page is given, per-lag means split into same-page and
+    cross-page pairs}.
+    """
+    n = X.shape[0]
+    sizes = np.asarray(X.sum(axis=1)).ravel()
+    band = {metric: np.full((max_lag, n), np.nan) for metric in metrics}
+    summary = {metric: {'all': [], 'same_page': [], 'cross_page': []} for metric in metrics}
+
+    for k in range(1, max_lag + 1):
+        if k >= n:
+            break
+        inter = np.asarray(X[:-k].multiply(X[k:]).sum(axis=1)).ravel()
+        same = None if line_page is None else (line_page[:-k] == line_page[k:])
+        for metric in metrics:
+            values = similarity(inter, sizes[:-k], sizes[k:], metric)
+            band[metric][k - 1, :n - k] = values
+            summary[metric]['all'].append(float(values.mean()))
+            if same is not None:
+                summary[metric]['same_page'].append(float(values[same].mean()) if same.any() else None)
+                summary[metric]['cross_page'].append(float(values[~same].mean()) if (~same).any() else None)
+
+    band['lag'] = list(range(1, min(max_lag, n - 1) + 1))
+    band['summary'] = summary
+    return band
+
+
+def all_pairs(X, output_dir=None, metric='jaccard', block_rows=512, line_page=None):
+    """
+    Similarity for every pair of lines i < j, one block of rows at a time.
+
+    When output_dir is given each block is saved as block_<start>.npz (CSR,
+    rows = block lines, columns = all lines, upper triangle only) and only
+    the summary is kept in memory. Returns a summary with the mean
+    similarity over all pairs and, with line_page, over same-page and
+    cross-page pairs; without output_dir the full upper-triangular CSR
+    matrix is returned as 'matrix'.
+    """
+    n = X.shape[0]
+    sizes = np.asarray(X.sum(axis=1)).ravel()
+    Xt = X.T.tocsr()
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    total_sum = 0.0
+    same_sum = 0.0
+    same_pairs = 0
+    if line_page is not None:
+        page_counts = np.unique(line_page, return_counts=True)[1]
+        same_pairs = int((page_counts * (page_counts - 1) // 2).sum())
+    blocks = []
+    files = []
+
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        inter = (X[start:stop] @ Xt).tocoo()
+
+        # Upper triangle only (j > i)
+        rows = inter.row + start
+        keep = inter.col > rows
+        rows, cols, counts = rows[keep], inter.col[keep], inter.data[keep]
+        values = similarity(counts, sizes[rows], sizes[cols], metric)
+
+        total_sum += float(values.sum())
+        if line_page is not None:
+            same_sum += float(values[line_page[rows] == line_page[cols]].sum())
+
+        block = sparse.csr_matrix((values, (rows - start, cols)), shape=(stop - start, n))
+        if output_dir is not None:
+            path = output_dir / f"block_{start:06d}.npz"
+            sparse.save_npz(path, block)
+            files.append(str(path))
+        else:
+            blocks.append(block)
+
+    total_pairs = n * (n - 1) // 2
+    summary = {
+        'metric': metric,
+        'lines': n,
+        'pairs': total_pairs,
+        'mean': total_sum / total_pairs if total_pairs else 0.0,
+    }
+    if line_page is not None:
+        cross_pairs = total_pairs - same_pairs
+        summary['same_page_mean'] = same_sum / same_pairs if same_pairs else None
+        summary['cross_page_mean'] = (total_sum - same_sum) / cross_pairs if cross_pairs else None
+    if output_dir is not None:
+        summary['blocks'] = files
+    else:
+        summary['matrix'] = sparse.vstack(blocks).tocsr() if blocks else sparse.csr_matrix((0, n))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Line-to-line vocabulary similarity at every distance")
+    parser.add_argument('filepath', nargs='?', default=str(Path(__file__).with_name('voynich_ZL3b.txt')))
+    parser.add_argument('--max-lag', type=int, default=50)
+    parser.add_argument('--metric', choices=METRICS, default='jaccard',
+                        help="metric for the all-pairs matrix")
+    parser.add_argument('--block-rows', type=int, default=512)
+    parser.add_argument('--output-dir', default='line_similarity')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH LINE SIMILARITY MATRIX")
+    print("=" * 60)
+
+    corpus = load_corpus(args.filepath)
+    X, line_index = line_matrix(corpus)
+    line_page = np.asarray(corpus.line_page)[line_index]
+    print(f"\n[1] {X.shape[0]:,} lines x {X.shape[1]:,} word types, {X.nnz:,} entries")
+
+    print(f"\n[2] Lag band k = 1..{args.max_lag}...")
+    band = lag_band(X, args.max_lag, line_page=line_page)
+    for metric in METRICS:
+        means = band['summary'][metric]['all']
+        if not means:
+            print(f"    {metric:<8} n/a (fewer than two lines)")
+            continue
+        print(f"    {metric:<8} lag 1: {means[0]:.4f}  lag {len(means)}: {means[-1]:.4f}")
+
+    print(f"\n[3] All pairs ({args.metric}), blocks of {args.block_rows} rows...")
+    output_dir = Path(args.output_dir)
+    pairs = all_pairs(X, output_dir, args.metric, args.block_rows, line_page)
+    print(f"    Mean over {pairs['pairs']:,} pairs: {pairs['mean']:.5f}")
+    same, cross = pairs.get('same_page_mean'), pairs.get('cross_page_mean')
+    print(f"    Same page: {'n/a' if same is None else f'{same:.5f}'}  "
+          f"Cross page: {'n/a' if cross is None else f'{cross:.5f}'}")
+
+    summary = {
+        'source': str(args.filepath),
+        'lag_band': {'lag': band['lag'], 'summary': band['summary']},
+        'all_pairs': pairs,
+    }
+    with open(output_dir / 'summary.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    print(f"\n[✓] Results saved to: {output_dir}")
+
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Voynich IVTFF Tokenizer
+Shared single-pass reader for IVTFF transliteration files
+
+Every analysis script reads the same IVTFF markup, so the line scanning and
+markup cleaning live here once. Patterns are compiled at import time and each
+line is scanned with plain string operations wherever a regex is not needed.
+"""
+
+import re
+from collections import namedtuple
+
+# Page header such as <f1r>, <f85r2> or <fRos>: a name without '.', alone on
+# its line or followed by its <! $Q=A $L=B ...> variables
+PAGE_RE = re.compile(r'<([^\s.<>!][^\s.<>]*)>(?=\s*(?:<!\s*\$|$))')
+PAGE_VAR_RE = re.compile(r'\$(\w+)=([^\s>]+)')
+
+# Markup removed from the text part of a locus line, applied in this order
+TAG_RE = re.compile(r'<[^>]*>')          # <%>, <$>, <->, <! ... >
+UNCERTAIN_RE = re.compile(r'\[[^\]]*\]')  # [x:y] alternative readings
+LIGATURE_RE = re.compile(r'\{[^}]*\}')    # {xxx} annotations
+REFERENCE_RE = re.compile(r'@\d+;?')      # @123; rare glyph references
+SPACE_RE = re.compile(r'\s')
+
+# Compact record yielded for every locus line
+IvtffLine = namedtuple('IvtffLine', ['page', 'locus', 'words', 'raw'])
+
+# Most alternative readings expanded within one word in variant mode
+MAX_WORD_READINGS = 256
+
+
+def clean_text(text):
+    """Remove IVTFF markup from the text part of a locus line"""
+    if '<' in text:
+        text = TAG_RE.sub('', text)
+    if '[' in text:
+        text = UNCERTAIN_RE.sub('', text)
+    if '{' in text:
+        text = LIGATURE_RE.sub('', text)
+    if '@' in text:
+        text = REFERENCE_RE.sub('', text)
+    return text
+
+
+def split_words(text):
+    """Split cleaned text on the word separators '.' and ','"""
+    parts = text.replace(',', '.').split('.')
+    if SPACE_RE.search(text):
+        parts = [w.strip() for w in parts]
+    return [w for w in parts if w]
+
+
+def clean_variant_text(text):
+    """clean_text that keeps [a:b] alternatives and the glyphs inside {...} ligatures"""
+    if '<' in text:
+        text = TAG_RE.sub('', text)
+    if '{' in text:
+        text = text.replace('{', '').replace('}', '')
+    if '@' in text:
+        text = REFERENCE_RE.sub('', text)
+    return text
+
+
+def word_readings(word):
+    """
+    Readings of one word with alternatives, as [(reading, weight), ...].
+
+    Each [a:b:c] group splits the weight evenly between its alternatives;
+    groups in the same word combine independently and equal readings are
+    merged, e.g. 'o[k:t]a[r:s]' -> okar, okas, otar, otas at 0.25 each.
+    """
+    readings = {'': 1.0}
+    pos = 0
+    for match in UNCERTAIN_RE.finditer(word):
+        literal = word[pos:match.start()]
+        alternatives = match.group(0)[1:-1].split(':')
+        weight = 1.0 / len(alternatives)
+        expanded = {}
+        for prefix, w in readings.items():
+            for alt in alternatives:
+                key = prefix + literal + alt
+                expanded[key] = expanded.get(key, 0.0) + w * weight
+        if len(expanded) > MAX_WORD_READINGS:
+            raise ValueError(f"Word {word!r} has more than {MAX_WORD_READINGS} readings")
+        readings = expanded
+        pos = match.end()
+    tail = word[pos:].replace('[', '').replace(']', '')
+    return [(prefix + tail, w) for prefix, w in readings.items()]
+
+
+def parse_page_variables(text):
+    """Page header variables, e.g. '<! $Q=A $L=B>' -> {'Q': 'A', 'L': 'B'}"""
+    return dict(PAGE_VAR_RE.findall(text))
+
+
+def page_header_match(line):
+    """PAGE_RE match if a stripped line is a page header such as <f1r>, else None"""
+    end = line.find('>')
+    # Locus markers always contain a '.'
+    if end < 2 or line[0] != '<' or '.' in line[1:end]:
+        return None
+    return PAGE_RE.match(line)
+
+
+def iter_ivtff(filepath, page_meta=None, variants=False):
+    """
+    Stream an IVTFF file, yielding one IvtffLine per locus line.
+
+    Lines that carry a locus but no words after cleaning (e.g. the <fRos>
+    header) are yielded too, with an empty word list. If page_meta is a
+    dict it is filled with the header variables of every page.
+
+    With variants=True alternative readings are kept: each entry of words
+    is then the word_readings() list of one word.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        yield from iter_ivtff_lines(f, page_meta, variants=variants)
+
+
+def iter_ivtff_lines(lines, page_meta=None, current_page=None, variants=False):
+    """iter_ivtff over any iterable of raw IVTFF lines"""
+    for line in lines:
+        line = line.strip()
+
+        # Skip comments, empty lines and anything that is not markup
+        if not line or line[0] != '<':
+            continue
+
+        # Page markers
+        page_match = page_header_match(line)
+        if page_match:
+            current_page = page_match.group(1)
+            if page_meta is not None:
+                page_meta[current_page] = parse_page_variables(line[page_match.end():])
+            continue
+
+        # Locus marker followed by text: <f1r.1,@P0>       text.here
+        end = line.find('>')
+        if end < 2:
+            continue
+        text = line[end + 1:].lstrip()
+        if not text:
+            continue
+
+        if variants:
+            text = clean_variant_text(text)
+            words = [word_readings(w) if '[' in w else [(w, 1.0)] for w in split_words(text)]
+            yield IvtffLine(current_page, line[1:end], words, text)
+            continue
+
+        text = clean_text(text)
+        yield IvtffLine(current_page, line[1:end], split_words(text), text)
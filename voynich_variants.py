@@ -0,0 +1,161 @@
+"""
+Voynich Variant-Aware Statistics
+Expected letter, word and n-gram counts over uncertain readings
+
+The standard parsers delete [a:b] alternative readings and {...} ligature
+annotations, which shortens or merges words ('[cth:oto]res' -> 'res'). Here
+every uncertain word is kept as its small set of readings ('cthres' and
+'otores' at 0.5 each) and statistics are expected counts over all
+readings of the text.
+
+Alternatives in different words are independent, so the expectation never
+expands combinations across a line: each word adds its readings' weights
+to one weighted type table in a single pass, and letter and n-gram counts
+are then computed once per distinct reading, weighted by its expected
+count.
+
+    python voynich_variants.py --file voynich_ZL3b.txt --subset '$L=B'
+"""
+
+import argparse
+import json
+from collections import Counter
+from pathlib import Path
+
+from voynich_analysis import calculate_entropy
+from voynich_corpus import load_corpus
+from voynich_index import parse_query
+from voynich_ngrams import ngram_counts
+from voynich_tokenizer import iter_ivtff
+
+
+def read_variant_lines(filepath, subset=None):
+    """Variant-mode IvtffLine records, optionally restricted by a metadata query"""
+    page_meta = {}
+    lines = list(iter_ivtff(filepath, page_meta, variants=True))
+    if not subset:
+        return lines
+    terms = parse_query(subset)
+    keep = {page for page, meta in page_meta.items()
+            if all(meta.get(var) in values for var, values in terms)}
+    return [line for line in lines if line.page in keep]
+
+
+def expected_word_counts(lines):
+    """
+    Expected count of every word reading, in first-occurrence order.
+
+    Returns (Counter of float counts, number of uncertain words). Readings
+    that leave no glyphs (an empty alternative) do not count as words.
+    """
+    counts = Counter()
+    uncertain = 0
+    for line in lines:
+        for readings in line.words:
+            if len(readings) > 1:
+                uncertain += 1
+            for word, weight in readings:
+                if word:
+                    counts[word] += weight
+    return counts, uncertain
+
+
+def expected_letter_counts(word_counts):
+    """Expected glyph counts from a weighted word table"""
+    letters = Counter()
+    for word, weight in word_counts.items():
+        for ch in word:
+            letters[ch] += weight
+    return letters
+
+
+def expected_ngrams(word_counts, max_n=3, min_n=2):
+    """Expected glyph n-gram Counters, one weighted pass over the distinct readings"""
+    words = list(word_counts)
+    return ngram_counts(words, max_n, min_n, weights=[word_counts[w] for w in words])
+
+
+def expected_statistics(lines, max_n=3, top=20):
+    """Track A style summary with expected counts over all readings"""
+    word_counts, uncertain = expected_word_counts(lines)
+    letters = expected_letter_counts(word_counts)
+    ngrams = expected_ngrams(word_counts, max_n)
+    total_words = sum(word_counts.values())
+    total_letters = sum(letters.values())
+    lengths = Counter()
+    for word, weight in word_counts.items():
+        lengths[len(word)] += weight
+
+    def rounded(counter, n):
+        return {k: round(v, 3) for k, v in counter.most_common(n)}
+
+    return {
+        'summary': {
+            'expected_words': round(total_words, 3),
+            'uncertain_words': uncertain,
+            'expected_types': len(word_counts),
+            'expected_letters': round(total_letters, 3),
+            'letter_entropy': round(calculate_entropy(letters, total_letters), 4),
+            'word_entropy': round(calculate_entropy(word_counts, total_words), 4),
+            'average_word_length': round(total_letters / total_words, 4) if total_words else 0.0,
+        },
+        'letter_frequency': rounded(letters, len(letters)),
+        'top_words': rounded(word_counts, top),
+        'ngrams': {n: rounded(counter, top) for n, counter in ngrams.items()},
+        'word_length_distribution': {k: round(v, 3) for k, v in sorted(lengths.items())},
+    }
+
+
+def deletion_shift(word_counts, corpus, top=15):
+    """Words whose expected count differs most from the deletion-based count"""
+    baseline = corpus.type_counts()
+    words = set(word_counts) | set(baseline)
+    shift = {w: word_counts.get(w, 0.0) - baseline.get(w, 0) for w in words}
+    ranked = sorted(shift.items(), key=lambda x: (-abs(x[1]), x[0]))[:top]
+    return [{'word': w, 'deleted': baseline.get(w, 0), 'expected': round(word_counts.get(w, 0.0), 3)}
+            for w, _ in ranked if abs(shift[w]) > 1e-9]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expected statistics over uncertain readings")
+    parser.add_argument('--file', default=str(Path(__file__).with_name('voynich_ZL3b.txt')))
+    parser.add_argument('--subset', default=None, help="metadata query, e.g. '$L=B'")
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VOYNICH VARIANT-AWARE STATISTICS")
+    print("=" * 60)
+
+    print("\n[1] Parsing with alternative readings...")
+    lines = read_variant_lines(args.file, args.subset)
+    results = expected_statistics(lines, top=args.top)
+    summary = results['summary']
+    print(f"    Expected words: {summary['expected_words']:,.1f} "
+          f"({summary['uncertain_words']:,} uncertain)")
+    print(f"    Distinct readings: {summary['expected_types']:,}")
+
+    print("\n[2] Expected counts...")
+    print(f"    Letter entropy: {summary['letter_entropy']:.3f} bits")
+    print(f"    Word entropy: {summary['word_entropy']:.3f} bits")
+    print(f"    Top 10 words: {list(results['top_words'].items())[:10]}")
+    print(f"    Top 10 bigrams: {list(results['ngrams'][2].items())[:10]}")
+
+    if not args.subset:
+        print("\n[3] Largest shifts against deletion...")
+        word_counts, _ = expected_word_counts(lines)
+        results['deletion_shift'] = deletion_shift(word_counts, load_corpus(args.file))
+        for entry in results['deletion_shift'][:10]:
+            print(f"    {entry['word']:<12} deleted {entry['deleted']:>5}  expected {entry['expected']:>8.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n[✓] Results saved to: {args.output}")
+
+    return results
+
+
+if __name__ == "__main__":
+    main()